@@ -22,6 +22,8 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./oticas.db")
 EXCEL_EXTENSIONS = [".xlsx", ".xls"]
 MAX_FILE_SIZE_MB = 50
 CHUNK_SIZE = 1000
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", os.cpu_count() or 1))
+UPLOAD_CACHE_SIZE = int(os.getenv("UPLOAD_CACHE_SIZE", 256))
 
 # Configurações de deduplicação
 SIMILARITY_THRESHOLD_HIGH = 0.9
@@ -32,6 +34,7 @@ DEDUP_WEIGHTS = {
     "telefone": 0.2,
     "endereco": 0.1
 }
+DEDUP_WORKERS = int(os.getenv("DEDUP_WORKERS", os.cpu_count() or 1))
 
 # Configurações de logging
 LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
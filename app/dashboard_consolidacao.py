@@ -4,15 +4,27 @@ Dashboard Web Interativo para Resultados da Consolidação
 Mostra todos os arquivos, resultados e estatísticas
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 import pandas as pd
 from pathlib import Path
+import hashlib
 import json
+import math
+import re
+import threading
 from datetime import datetime
 
+from app.services.snapshot_dashboard import (
+    DASHBOARD_FILE, SNAPSHOT_DIR, ARQUIVO_RESUMO, versao_arquivo,
+    calcular_totais, resumir_dashboard, carregar_snapshot
+)
+
 app = FastAPI(title="Dashboard - Consolidação por Loja")
 
 # Configurar templates
@@ -24,95 +36,125 @@ try:
 except:
     pass
 
+@dataclass
+class DadosDashboard:
+    """Planilhas do dashboard já lidas, com os totais pré-calculados"""
+    versao: Tuple
+    fonte: str  # 'snapshot' ou 'excel'
+    df_dashboard: pd.DataFrame
+    df_resumo_loja: pd.DataFrame
+    df_stats: pd.DataFrame
+    df_qualidade: Optional[pd.DataFrame]
+    arquivos_data: List[Dict]
+    lojas_data: List[Dict]
+    top_duplicatas: List[Dict]
+    qualidade_por_campo: Dict[str, Dict]
+    metricas: Dict
+    # Índice por loja: arquivos e totais de cada loja, montados uma vez por versão
+    arquivos_por_loja: Dict[str, List[Dict]] = field(default_factory=dict)
+    totais_por_loja: Dict[str, Dict] = field(default_factory=dict)
+    
+    def __post_init__(self):
+        for arquivo in self.arquivos_data:
+            self.arquivos_por_loja.setdefault(arquivo.get('loja'), []).append(arquivo)
+        self.totais_por_loja = {
+            loja: calcular_totais(arquivos) for loja, arquivos in self.arquivos_por_loja.items()
+        }
+
+# Cache em processo: caminho -> dados da última versão (mtime, tamanho) lida
+_cache_dashboard: Dict[str, DadosDashboard] = {}
+_lock_dashboard = threading.Lock()
+
+MAX_POR_PAGINA = 1000
+
+def etag_corresponde(etag: str, if_none_match: str) -> bool:
+    """O If-None-Match (entity tags separadas por vírgula, ou '*') casa com o ETag?
+    
+    Comparação fraca: ignora o prefixo W/, mas a tag precisa ser idêntica.
+    """
+    etiquetas = re.findall(r'\*|(?:W/)?"[^"]*"', if_none_match or '')
+    if '*' in etiquetas:
+        return True
+    opaca = etag[2:] if etag.startswith('W/') else etag
+    return any((e[2:] if e.startswith('W/') else e) == opaca for e in etiquetas)
+
+def dashboard_disponivel(arquivo: Path = DASHBOARD_FILE) -> bool:
+    return arquivo.exists() or (SNAPSHOT_DIR / ARQUIVO_RESUMO).exists()
+
+def _versao_dashboard(arquivo: Path) -> Tuple:
+    """Versão conjunta do Excel e do snapshot; muda quando qualquer um é regravado"""
+    resumo = SNAPSHOT_DIR / ARQUIVO_RESUMO
+    return (
+        tuple(versao_arquivo(arquivo)) if arquivo.exists() else None,
+        tuple(versao_arquivo(resumo)) if resumo.exists() else None
+    )
+
+def ler_dashboard(arquivo: Path, versao: Tuple) -> DadosDashboard:
+    """Lê o snapshot pré-calculado ou, na falta dele, todas as planilhas do Excel"""
+    snapshot = carregar_snapshot(arquivo)
+    if snapshot is not None:
+        planilhas, resumo = snapshot
+        fonte = 'snapshot'
+    else:
+        planilhas = pd.read_excel(arquivo, sheet_name=None)
+        resumo = resumir_dashboard(planilhas)
+        fonte = 'excel'
+    
+    df_dashboard = planilhas['Dashboard_Principal']
+    
+    return DadosDashboard(
+        versao=versao,
+        fonte=fonte,
+        df_dashboard=df_dashboard,
+        df_resumo_loja=planilhas['Resumo_Por_Loja'],
+        df_stats=planilhas['Estatisticas_Gerais'],
+        df_qualidade=planilhas.get('Qualidade_Dados'),
+        arquivos_data=df_dashboard.to_dict('records'),
+        lojas_data=resumo['lojas_data'],
+        top_duplicatas=resumo['top_duplicatas'],
+        qualidade_por_campo=resumo['qualidade_por_campo'],
+        metricas=resumo['metricas']
+    )
+
+def carregar_dashboard(arquivo: Path = DASHBOARD_FILE) -> DadosDashboard:
+    """Dados do dashboard, relidos só quando o Excel ou o snapshot mudam (mtime/tamanho)"""
+    versao = _versao_dashboard(arquivo)
+    chave = str(arquivo.resolve())
+    
+    dados = _cache_dashboard.get(chave)
+    if dados is not None and dados.versao == versao:
+        return dados
+    
+    with _lock_dashboard:
+        # Outra requisição pode ter lido a mesma versão enquanto esperávamos
+        dados = _cache_dashboard.get(chave)
+        if dados is None or dados.versao != versao:
+            dados = ler_dashboard(arquivo, versao)
+            _cache_dashboard[chave] = dados
+    
+    return dados
+
 @app.get("/", response_class=HTMLResponse)
 async def dashboard_principal(request: Request):
     """Dashboard principal com todos os resultados"""
     
-    # Carregar dados do dashboard
-    dashboard_file = Path("data/processed/dashboard_consolidacao_por_loja.xlsx")
-    
-    if not dashboard_file.exists():
+    if not dashboard_disponivel():
         return templates.TemplateResponse("dashboard_vazio.html", {
             "request": request,
             "message": "Execute primeiro a consolidação por loja para ver os resultados!"
         })
     
     try:
-        # Carregar dados
-        excel_file = pd.ExcelFile(dashboard_file)
-        
-        # Dashboard principal
-        df_dashboard = pd.read_excel(dashboard_file, sheet_name='Dashboard_Principal')
-        
-        # Resumo por loja
-        df_resumo_loja = pd.read_excel(dashboard_file, sheet_name='Resumo_Por_Loja')
-        
-        # Estatísticas gerais
-        df_stats = pd.read_excel(dashboard_file, sheet_name='Estatisticas_Gerais')
-        
-        # Qualidade de dados
-        df_qualidade = None
-        try:
-            df_qualidade = pd.read_excel(dashboard_file, sheet_name='Qualidade_Dados')
-        except:
-            pass
-        
-        # Preparar dados para template
-        arquivos_data = df_dashboard.to_dict('records')
-        
-        # Calcular métricas gerais
-        total_arquivos = len(arquivos_data)
-        arquivos_sucesso = len([a for a in arquivos_data if a['status'] == 'sucesso'])
-        arquivos_erro = len([a for a in arquivos_data if a['status'] == 'erro'])
-        
-        # Calcular totais
-        total_originais = sum(a.get('registros_originais', 0) for a in arquivos_data)
-        total_consolidados = sum(a.get('registros_consolidados', 0) for a in arquivos_data)
-        total_duplicatas = sum(a.get('duplicatas_encontradas', 0) for a in arquivos_data)
-        total_os = sum(a.get('total_os', 0) for a in arquivos_data)
-        
-        # Taxa de redução
-        taxa_reducao = 0
-        if total_originais > 0:
-            taxa_reducao = ((total_originais - total_consolidados) / total_originais) * 100
-        
-        # Dados por loja
-        lojas_data = df_resumo_loja.reset_index().to_dict('records')
-        
-        # Top arquivos com mais duplicatas
-        top_duplicatas = sorted(arquivos_data, key=lambda x: x.get('duplicatas_encontradas', 0), reverse=True)[:5]
-        
-        # Qualidade de dados por campo
-        qualidade_por_campo = {}
-        if df_qualidade is not None:
-            for campo in ['nome', 'cpf', 'celular', 'email', 'endereco']:
-                dados_campo = df_qualidade[df_qualidade['campo'] == campo]
-                if not dados_campo.empty:
-                    total_preenchidos = dados_campo['preenchidos'].sum()
-                    total_registros = dados_campo['total'].sum()
-                    percentual = (total_preenchidos / total_registros * 100) if total_registros > 0 else 0
-                    qualidade_por_campo[campo] = {
-                        'preenchidos': total_preenchidos,
-                        'total': total_registros,
-                        'percentual': round(percentual, 1)
-                    }
+        # Carregar dados (planilhas e métricas vêm do cache enquanto o arquivo não muda)
+        dados = carregar_dashboard()
         
         return templates.TemplateResponse("dashboard_consolidacao.html", {
             "request": request,
-            "arquivos": arquivos_data,
-            "lojas": lojas_data,
-            "top_duplicatas": top_duplicatas,
-            "qualidade_campos": qualidade_por_campo,
-            "metricas": {
-                "total_arquivos": total_arquivos,
-                "arquivos_sucesso": arquivos_sucesso,
-                "arquivos_erro": arquivos_erro,
-                "total_originais": total_originais,
-                "total_consolidados": total_consolidados,
-                "total_duplicatas": total_duplicatas,
-                "total_os": total_os,
-                "taxa_reducao": round(taxa_reducao, 1)
-            },
+            "arquivos": dados.arquivos_data,
+            "lojas": dados.lojas_data,
+            "top_duplicatas": dados.top_duplicatas,
+            "qualidade_campos": dados.qualidade_por_campo,
+            "metricas": dados.metricas,
             "ultima_atualizacao": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         })
         
@@ -126,17 +168,15 @@ async def dashboard_principal(request: Request):
 async def detalhes_loja(request: Request, loja_nome: str):
     """Detalhes específicos de uma loja"""
     
-    dashboard_file = Path("data/processed/dashboard_consolidacao_por_loja.xlsx")
-    
-    if not dashboard_file.exists():
+    if not dashboard_disponivel():
         return templates.TemplateResponse("dashboard_vazio.html", {
             "request": request,
             "message": "Execute primeiro a consolidação por loja!"
         })
     
     try:
-        df_dashboard = pd.read_excel(dashboard_file, sheet_name='Dashboard_Principal')
-        arquivos_loja = df_dashboard[df_dashboard['loja'] == loja_nome].to_dict('records')
+        dados = carregar_dashboard()
+        arquivos_loja = dados.arquivos_por_loja.get(loja_nome)
         
         if not arquivos_loja:
             return templates.TemplateResponse("loja_nao_encontrada.html", {
@@ -144,24 +184,11 @@ async def detalhes_loja(request: Request, loja_nome: str):
                 "loja_nome": loja_nome
             })
         
-        # Calcular totais da loja
-        total_arquivos = len(arquivos_loja)
-        total_originais = sum(a.get('registros_originais', 0) for a in arquivos_loja)
-        total_consolidados = sum(a.get('registros_consolidados', 0) for a in arquivos_loja)
-        total_duplicatas = sum(a.get('duplicatas_encontradas', 0) for a in arquivos_loja)
-        total_os = sum(a.get('total_os', 0) for a in arquivos_loja)
-        
         return templates.TemplateResponse("detalhes_loja.html", {
             "request": request,
             "loja_nome": loja_nome,
             "arquivos": arquivos_loja,
-            "totais": {
-                "arquivos": total_arquivos,
-                "originais": total_originais,
-                "consolidados": total_consolidados,
-                "duplicatas": total_duplicatas,
-                "os": total_os
-            }
+            "totais": dados.totais_por_loja[loja_nome]
         })
         
     except Exception as e:
@@ -171,23 +198,55 @@ async def detalhes_loja(request: Request, loja_nome: str):
         })
 
 @app.get("/api/dados")
-async def api_dados():
-    """API para dados em JSON"""
+async def api_dados(
+    request: Request,
+    pagina: int = Query(1, ge=1),
+    por_pagina: int = Query(100, ge=1, le=MAX_POR_PAGINA),
+    campos: Optional[str] = None,
+    loja: Optional[str] = None
+):
+    """API para dados em JSON (paginada, com seleção de campos e ETag)
     
-    dashboard_file = Path("data/processed/dashboard_consolidacao_por_loja.xlsx")
+    campos: lista separada por vírgula das colunas de cada arquivo
+    loja: restringe os arquivos a uma loja (usa o índice por loja)
+    """
     
-    if not dashboard_file.exists():
+    if not dashboard_disponivel():
         return {"erro": "Dashboard não encontrado"}
     
     try:
-        df_dashboard = pd.read_excel(dashboard_file, sheet_name='Dashboard_Principal')
-        df_resumo = pd.read_excel(dashboard_file, sheet_name='Resumo_Por_Loja')
+        dados = carregar_dashboard()
+        
+        # A resposta só depende da versão dos dados e dos parâmetros: o ETag é
+        # calculado antes de montar o payload para responder 304 sem custo
+        assinatura = json.dumps([dados.versao, pagina, por_pagina, campos, loja], default=str)
+        etag = f'W/"{hashlib.md5(assinatura.encode()).hexdigest()}"'
+        cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_corresponde(etag, request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=cabecalhos)
         
-        return {
-            "arquivos": df_dashboard.to_dict('records'),
-            "resumo_lojas": df_resumo.reset_index().to_dict('records'),
+        arquivos = dados.arquivos_data if loja is None else dados.arquivos_por_loja.get(loja, [])
+        inicio = (pagina - 1) * por_pagina
+        pagina_arquivos = arquivos[inicio:inicio + por_pagina]
+        
+        if campos:
+            selecionados = [c.strip() for c in campos.split(',') if c.strip()]
+            pagina_arquivos = [
+                {c: arquivo[c] for c in selecionados if c in arquivo} for arquivo in pagina_arquivos
+            ]
+        
+        return JSONResponse(jsonable_encoder({
+            "arquivos": pagina_arquivos,
+            "resumo_lojas": dados.lojas_data,
+            "paginacao": {
+                "pagina": pagina,
+                "por_pagina": por_pagina,
+                "total": len(arquivos),
+                "total_paginas": math.ceil(len(arquivos) / por_pagina)
+            },
+            "fonte": dados.fonte,
             "timestamp": datetime.now().isoformat()
-        }
+        }), headers=cabecalhos)
         
     except Exception as e:
         return {"erro": str(e)}
@@ -1,9 +1,16 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-import pandas as pd
-import io
-from pathlib import Path
+from fastapi.responses import HTMLResponse, StreamingResponse
+import asyncio
+import json
+import time
+
+from app.services.processamento_planilhas import (
+    EXTENSOES_PLANILHA, ArquivoGrandeDemais, gravar_upload, promover_upload,
+    analisar_uploads, obter_pool, encerrar_pool
+)
+from app.services.perfil_planilhas import localizar_arquivo, carregar_perfil, gerar_perfil
+from app.services.tarefas_deduplicacao import gerenciador_tarefas
 
 app = FastAPI(
     title="Sistema de Gestão de Óticas - Carne Fácil",
@@ -14,6 +21,11 @@ app = FastAPI(
 # Servir arquivos estáticos
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+@app.on_event("shutdown")
+def encerrar_processamento():
+    """Libera o pool de processos usado na leitura das planilhas"""
+    encerrar_pool()
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Página inicial do sistema"""
@@ -100,7 +112,7 @@ async def read_root():
                         // Mostrar detalhes por arquivo
                         if (result.detalhes_por_arquivo && result.detalhes_por_arquivo.length > 0) {
                             let detalhesHtml = '<table style="width: 100%; border-collapse: collapse; margin: 10px 0;">';
-                            detalhesHtml += '<tr style="background: #f8f9fa;"><th style="padding: 10px; border: 1px solid #dee2e6;">Arquivo</th><th style="padding: 10px; border: 1px solid #dee2e6;">Linhas Total</th><th style="padding: 10px; border: 1px solid #dee2e6;">OS Lancaster</th><th style="padding: 10px; border: 1px solid #dee2e6;">OS OTM</th><th style="padding: 10px; border: 1px solid #dee2e6;">Total OS</th></tr>';
+                            detalhesHtml += '<tr style="background: #f8f9fa;"><th style="padding: 10px; border: 1px solid #dee2e6;">Arquivo</th><th style="padding: 10px; border: 1px solid #dee2e6;">Linhas Total</th><th style="padding: 10px; border: 1px solid #dee2e6;">OS Lancaster</th><th style="padding: 10px; border: 1px solid #dee2e6;">OS OTM</th><th style="padding: 10px; border: 1px solid #dee2e6;">Total OS</th><th style="padding: 10px; border: 1px solid #dee2e6;">Tempo (s)</th></tr>';
                             
                             result.detalhes_por_arquivo.forEach(arquivo => {
                                 detalhesHtml += `<tr>
@@ -109,6 +121,7 @@ async def read_root():
                                     <td style="padding: 10px; border: 1px solid #dee2e6; text-align: center;">${arquivo.os_lancaster}</td>
                                     <td style="padding: 10px; border: 1px solid #dee2e6; text-align: center;">${arquivo.os_otm}</td>
                                     <td style="padding: 10px; border: 1px solid #dee2e6; text-align: center; font-weight: bold;">${arquivo.total_os}</td>
+                                    <td style="padding: 10px; border: 1px solid #dee2e6; text-align: center;">${arquivo.cache_hit ? 'cache' : arquivo.tempo_total_s}</td>
                                 </tr>`;
                             });
                             
@@ -131,6 +144,7 @@ async def read_root():
 @app.post("/upload")
 async def upload_files(files: list[UploadFile] = File(...)):
     """Upload e processamento de planilhas"""
+    planilhas = []
     try:
         results = {
             "clientes": 0,
@@ -140,89 +154,131 @@ async def upload_files(files: list[UploadFile] = File(...)):
             "detalhes_por_arquivo": []
         }
         
+        # Aceitar arquivos Excel (.xlsx, .xls, .xlsm) e gravar em disco por blocos
         for file in files:
-            # Aceitar arquivos Excel (.xlsx, .xls, .xlsm)
-            if not file.filename.lower().endswith(('.xlsx', '.xls', '.xlsm')):
+            if not file.filename.lower().endswith(EXTENSOES_PLANILHA):
                 continue
-                
-            # Ler planilha com suporte a macros
-            content = await file.read()
-            try:
-                # Para arquivos XLSM, usar engine='openpyxl' que suporta macros
-                if file.filename.lower().endswith('.xlsm'):
-                    df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
-                else:
-                    df = pd.read_excel(io.BytesIO(content))
-            except Exception as e:
+            temporario, sha256 = await gravar_upload(file)
+            planilhas.append((file.filename, temporario, sha256))
+        
+        # Planilhas já vistas (mesmo SHA-256) vêm do cache; as demais são lidas em paralelo
+        inicio = time.perf_counter()
+        analises = await analisar_uploads(planilhas)
+        results["cache_hits"] = 0
+        
+        for (filename, temporario, sha256), (analise, cache_hit) in zip(planilhas, analises):
+            if analise is None:
                 continue
             
-            # Extrair OS corretamente das colunas específicas
-            os_count = 0
-            detalhes_arquivo = {
-                "nome": file.filename,
-                "linhas_total": len(df),
-                "os_lancaster": 0,
-                "os_otm": 0
-            }
-            
-            # Verificar coluna OS LANCASTER
-            if 'OS LANCASTER' in df.columns:
-                os_lancaster = pd.to_numeric(df['OS LANCASTER'], errors='coerce').dropna()
-                detalhes_arquivo["os_lancaster"] = len(os_lancaster)
-                os_count += len(os_lancaster)
-            
-            # Verificar coluna OS OTM
-            if 'OS OTM' in df.columns:
-                os_otm = pd.to_numeric(df['OS OTM'], errors='coerce').dropna()
-                detalhes_arquivo["os_otm"] = len(os_otm)
-                os_count += len(os_otm)
-            
-            # Se não encontrou colunas específicas, tentar outras variações
-            if os_count == 0:
-                colunas_os = [col for col in df.columns if 'OS' in str(col).upper()]
-                for col in colunas_os:
-                    valores_os = pd.to_numeric(df[col], errors='coerce').dropna()
-                    os_count += len(valores_os)
-            
-            results["ordens_servico"] += os_count
-            detalhes_arquivo["total_os"] = os_count
-            results["detalhes_por_arquivo"].append(detalhes_arquivo)
-            
-            # Tentar identificar clientes (buscar colunas de nomes)
-            colunas_nome = [col for col in df.columns if any(termo in col.lower() for termo in ['nome', 'cliente', 'paciente'])]
-            if colunas_nome:
-                nome_col = colunas_nome[0]
-                clientes_unicos = df[nome_col].nunique()
-                results["clientes"] += clientes_unicos
-                
-                # Detectar duplicatas potenciais
-                total_nomes = len(df[nome_col].dropna())
-                results["duplicatas"] += max(0, total_nomes - clientes_unicos)
-            
-            results["arquivos_processados"].append(file.filename)
+            results["ordens_servico"] += analise["ordens_servico"]
+            results["clientes"] += analise["clientes"]
+            results["duplicatas"] += analise["duplicatas"]
+            results["detalhes_por_arquivo"].append(
+                dict(analise["detalhes"], nome=filename, sha256=sha256, cache_hit=cache_hit)
+            )
+            results["arquivos_processados"].append(filename)
+            results["cache_hits"] += int(cache_hit)
             
             # Salvar arquivo processado
-            save_path = Path(f"data/raw/{file.filename}")
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(save_path, "wb") as f:
-                f.write(content)
+            promover_upload(temporario, filename)
         
+        results["tempo_processamento_s"] = round(time.perf_counter() - inicio, 3)
         return results
         
+    except ArquivoGrandeDemais as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao processar arquivos: {str(e)}")
+    finally:
+        # Remover temporários de arquivos ilegíveis ou de uploads interrompidos
+        for _, temporario, _ in planilhas:
+            temporario.unlink(missing_ok=True)
 
 @app.get("/api/analyze/{file_id}")
 async def analyze_file(file_id: str):
-    """Análise detalhada de um arquivo específico"""
-    # TODO: Implementar análise detalhada
-    return {"message": f"Análise do arquivo {file_id} em desenvolvimento"}
+    """Análise detalhada de um arquivo específico (perfil das colunas)"""
+    caminho = localizar_arquivo(file_id)
+    if caminho is None:
+        raise HTTPException(status_code=404, detail=f"Arquivo {file_id} não encontrado em data/raw")
+    
+    # Perfil calculado uma vez por versão do arquivo e servido do sidecar JSON
+    perfil = carregar_perfil(caminho)
+    if perfil is not None:
+        return dict(perfil, cache=True)
+    
+    try:
+        loop = asyncio.get_running_loop()
+        perfil = await loop.run_in_executor(obter_pool(), gerar_perfil, str(caminho))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erro ao analisar {file_id}: {str(e)}")
+    
+    return dict(perfil, cache=False)
+
+def _resposta_tarefa(tarefa, criada: bool) -> dict:
+    return {
+        "job_id": tarefa.id,
+        "status": tarefa.status,
+        "criada": criada,
+        "progresso_url": f"/api/deduplicate/{tarefa.id}",
+        "eventos_url": f"/api/deduplicate/{tarefa.id}/eventos"
+    }
+
+@app.post("/api/deduplicate")
+async def deduplicate_clients(incremental: bool = True):
+    """Inicia a deduplicação em segundo plano e devolve o ID da tarefa
+    
+    Se já houver uma deduplicação do mesmo modo na fila ou executando, devolve
+    essa tarefa em vez de enfileirar outra.
+    """
+    tarefa, criada = gerenciador_tarefas.iniciar(incremental=incremental)
+    return _resposta_tarefa(tarefa, criada)
 
 @app.get("/api/deduplicate")
-async def deduplicate_clients():
-    """Executar processo de deduplicação"""
-    # TODO: Implementar deduplicação inteligente
-    return {"message": "Deduplicação em desenvolvimento"}
+async def deduplicate_atual():
+    """Compatibilidade com o GET antigo: só consulta, nunca inicia uma deduplicação
+    
+    Devolve a tarefa em andamento ou, se não houver, a mais recente.
+    """
+    tarefa = gerenciador_tarefas.ativa() or gerenciador_tarefas.ultima()
+    if tarefa is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Nenhuma deduplicação registrada; use POST /api/deduplicate para iniciar"
+        )
+    return _resposta_tarefa(tarefa, False)
+
+@app.get("/api/deduplicate/{job_id}")
+async def deduplicate_status(job_id: str):
+    """Progresso (pares pontuados, lotes, ETA) e resultado de uma deduplicação"""
+    tarefa = gerenciador_tarefas.obter(job_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail=f"Tarefa {job_id} não encontrada")
+    
+    return tarefa.progresso()
+
+@app.get("/api/deduplicate/{job_id}/eventos")
+async def deduplicate_eventos(job_id: str, intervalo: float = 1.0):
+    """Progresso da deduplicação via Server-Sent Events até a tarefa terminar"""
+    tarefa = gerenciador_tarefas.obter(job_id)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail=f"Tarefa {job_id} não encontrada")
+    
+    async def gerar_eventos():
+        while True:
+            progresso = tarefa.progresso()
+            finalizada = tarefa.status in ('concluida', 'erro')
+            evento = 'fim' if finalizada else 'progresso'
+            yield f"event: {evento}\ndata: {json.dumps(progresso, ensure_ascii=False, default=str)}\n\n"
+            
+            if finalizada:
+                break
+            await asyncio.sleep(max(intervalo, 0.2))
+    
+    return StreamingResponse(
+        gerar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -2,17 +2,121 @@
 Serviço de deduplicação inteligente de clientes
 """
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator, Callable
+import numpy as np
 import pandas as pd
-from fuzzywuzzy import fuzz, process
+from fuzzywuzzy import fuzz, process, utils as fuzz_utils
 from unidecode import unidecode
 import re
+import heapq
 import logging
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Pesos para diferentes campos no score final
+PESOS_CAMPOS = {
+    'nome': 0.4,
+    'cpf': 0.3,
+    'telefone': 0.2,
+    'endereco': 0.1
+}
+
+# Score mínimo (nome e final) para um par ser considerado duplicata
+SCORE_MINIMO = 0.6
+
+# Colunas do relatório de duplicatas (mesma ordem dos campos de ClienteMatch)
+COLUNAS_RELATORIO = [
+    'ID_1', 'ID_2', 'Nome_1', 'Nome_2', 'Score_Nome', 'Score_CPF',
+    'Score_Telefone', 'Score_Endereco', 'Score_Final', 'Confianca', 'Recomendacao'
+]
+CAMPOS_SCORE = ['score_nome', 'score_cpf', 'score_telefone', 'score_endereco', 'score_final']
+
+# Quantidade de pares pontuados por lote no motor vetorizado
+TAMANHO_LOTE_PARES = 20000
+
+# Normalização de nomes
+TITULOS_NOME = frozenset(['DR', 'DRA', 'SR', 'SRA', 'SRTA', 'PROF', 'ENG'])
+CONECTORES_NOME = frozenset(['DE', 'DA', 'DO', 'DAS', 'DOS', 'E'])
+
+# Normalização de endereços (abreviação -> forma completa)
+ABREVIACOES_ENDERECO = {
+    'R': 'RUA',
+    'AV': 'AVENIDA',
+    'TRAV': 'TRAVESSA',
+    'AL': 'ALAMEDA',
+    'PCA': 'PRACA',
+    'EST': 'ESTRADA',
+    'ROD': 'RODOVIA',
+    'APT': 'APARTAMENTO',
+    'CONJ': 'CONJUNTO',
+    'BL': 'BLOCO',
+    'QD': 'QUADRA',
+    'LT': 'LOTE'
+}
+
+# Regexes pré-compiladas
+RE_NAO_DIGITO = re.compile(r'\D')
+RE_ABREVIACOES_ENDERECO = re.compile(r'\b(' + '|'.join(ABREVIACOES_ENDERECO) + r')\b\.?')
+
+# Regras fonéticas para nomes em pt-BR, aplicadas em ordem sobre o token já em
+# maiúsculas e sem acentos (Thaís/Tais, Luiz/Luis, Sousa/Souza, Philippe/Felipe...)
+REGRAS_FONETICAS = [
+    (re.compile(r'[^A-Z]'), ''),
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'TH'), 'T'),
+    (re.compile(r'[CS]H'), 'X'),
+    (re.compile(r'LH'), 'L'),
+    (re.compile(r'NH'), 'N'),
+    (re.compile(r'Y'), 'I'),
+    (re.compile(r'W'), 'V'),
+    (re.compile(r'QU?|CK'), 'K'),
+    (re.compile(r'G(?=[EI])'), 'J'),
+    (re.compile(r'GU(?=[EI])'), 'G'),
+    (re.compile(r'[SX]?C(?=[EI])'), 'S'),
+    (re.compile(r'C'), 'K'),
+    (re.compile(r'Z'), 'S'),
+    (re.compile(r'H'), ''),
+    (re.compile(r'(?<=.)[AEIOU]'), ''),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+
+# Fração mínima dos códigos fonéticos do nome mais curto que o outro nome precisa ter
+SOBREPOSICAO_FONETICA_MINIMA = 0.5
+
+def chave_fonetica(nome_normalizado: str) -> str:
+    """Gera a chave fonética pt-BR de um nome já normalizado (um código por token)
+    
+    Inspirada no Metaphone/BuscaBR: colapsa dígrafos e letras de mesmo som e remove
+    vogais depois da primeira letra, de modo que variantes de grafia geram o mesmo código.
+    """
+    codigos = []
+    for token in nome_normalizado.split():
+        for padrao, substituto in REGRAS_FONETICAS:
+            token = padrao.sub(substituto, token)
+        if token:
+            codigos.append(token)
+    return ' '.join(codigos)
+
+def _sobreposicao_fonetica(chave1: str, chave2: str) -> float:
+    """Fração dos códigos fonéticos do nome mais curto presentes no outro nome"""
+    codigos1, codigos2 = set(chave1.split()), set(chave2.split())
+    if not codigos1 or not codigos2:
+        return 0.0
+    return len(codigos1 & codigos2) / min(len(codigos1), len(codigos2))
 
 @dataclass
 class ClienteMatch:
     """Representa um match entre dois clientes"""
+    # Sem __dict__ por instância: execuções grandes criam milhões de matches
+    __slots__ = (
+        'cliente_id_1', 'cliente_id_2', 'nome_1', 'nome_2', 'score_nome', 'score_cpf',
+        'score_telefone', 'score_endereco', 'score_final', 'confianca', 'recomendacao'
+    )
+    
     cliente_id_1: int
     cliente_id_2: int
     nome_1: str
@@ -25,27 +129,145 @@ class ClienteMatch:
     confianca: str  # alta, media, baixa
     recomendacao: str  # merge, revisar, ignorar
 
+class CacheLRU:
+    """Cache LRU limitado com contadores de acerto, erro e descarte"""
+    
+    def __init__(self, tamanho_maximo: int = 100000):
+        self.tamanho_maximo = tamanho_maximo
+        self.dados: OrderedDict = OrderedDict()
+        self.zerar_estatisticas()
+    
+    def __len__(self) -> int:
+        return len(self.dados)
+    
+    def obter(self, chave, calcular):
+        """Devolve o valor em cache ou calcula, guarda e devolve calcular(chave)"""
+        try:
+            valor = self.dados[chave]
+        except KeyError:
+            self.erros += 1
+            valor = calcular(chave)
+            self.dados[chave] = valor
+            if len(self.dados) > self.tamanho_maximo:
+                self.dados.popitem(last=False)
+                self.descartes += 1
+            return valor
+        
+        self.acertos += 1
+        self.dados.move_to_end(chave)
+        return valor
+    
+    def consultar(self, chave, padrao=None):
+        """Como obter, mas sem calcular: devolve padrao quando a chave não está em cache"""
+        try:
+            valor = self.dados[chave]
+        except KeyError:
+            self.erros += 1
+            return padrao
+        
+        self.acertos += 1
+        self.dados.move_to_end(chave)
+        return valor
+    
+    def guardar(self, chave, valor):
+        """Guarda um valor calculado fora do cache (ex.: de forma assíncrona)"""
+        self.dados[chave] = valor
+        self.dados.move_to_end(chave)
+        if len(self.dados) > self.tamanho_maximo:
+            self.dados.popitem(last=False)
+            self.descartes += 1
+    
+    def zerar_estatisticas(self):
+        self.acertos = 0
+        self.erros = 0
+        self.descartes = 0
+    
+    def estatisticas(self) -> Dict[str, float]:
+        consultas = self.acertos + self.erros
+        return {
+            'consultas': consultas,
+            'acertos': self.acertos,
+            'descartes': self.descartes,
+            'tamanho': len(self.dados),
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0
+        }
+    
+    def limpar(self):
+        self.dados.clear()
+        self.zerar_estatisticas()
+
+class UniaoDisjunta:
+    """Conjuntos disjuntos (union-find) com compressão de caminho e união por tamanho"""
+    
+    def __init__(self, total: int = 0):
+        self.pai = list(range(total))
+        self.tamanho = [1] * total
+    
+    def adicionar(self) -> int:
+        """Cria um novo elemento isolado e devolve sua posição"""
+        self.pai.append(len(self.pai))
+        self.tamanho.append(1)
+        return len(self.pai) - 1
+    
+    def encontrar(self, x: int) -> int:
+        """Raiz do conjunto de x (com compressão de caminho por halving)"""
+        pai = self.pai
+        while pai[x] != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+    
+    def unir(self, a: int, b: int) -> int:
+        """Une os conjuntos de a e b e devolve a nova raiz"""
+        raiz_a, raiz_b = self.encontrar(a), self.encontrar(b)
+        if raiz_a == raiz_b:
+            return raiz_a
+        if self.tamanho[raiz_a] < self.tamanho[raiz_b]:
+            raiz_a, raiz_b = raiz_b, raiz_a
+        self.pai[raiz_b] = raiz_a
+        self.tamanho[raiz_a] += self.tamanho[raiz_b]
+        return raiz_a
+
 class DeduplicadorClientes:
-    def __init__(self, threshold_alto: float = 0.9, threshold_medio: float = 0.75):
+    def __init__(self, threshold_alto: float = 0.9, threshold_medio: float = 0.75,
+                 max_tamanho_bloco: int = 1000, workers: int = 1,
+                 tamanho_cache: int = 100000, prefiltro_fonetico: bool = True,
+                 callback_progresso: Optional[Callable[[Dict[str, int]], None]] = None):
         self.threshold_alto = threshold_alto
         self.threshold_medio = threshold_medio
-        
+        # Número de processos usados na pontuação (1 = sem paralelismo)
+        self.workers = workers
+        # Blocos maiores que isso (ex.: token "MARIA", telefone genérico) são descartados
+        self.max_tamanho_bloco = max_tamanho_bloco
+        self.estatisticas_blocagem: Dict[str, int] = {}
+        self.estatisticas_agrupamento: Dict[str, int] = {}
+        self.estatisticas_exportacao: Dict[str, object] = {}
+        # Descarta, antes das métricas fuzzy, pares foneticamente distantes sem CPF/telefone em comum
+        self.prefiltro_fonetico = prefiltro_fonetico
+        # Chamado a cada lote pontuado com pares_processados/total_pares/lotes_concluidos/total_lotes
+        self.callback_progresso = callback_progresso
+        # Caches LRU das normalizações (cada valor distinto é normalizado uma vez)
+        self.cache_nome = CacheLRU(tamanho_cache)
+        self.cache_telefone = CacheLRU(tamanho_cache)
+        self.cache_endereco = CacheLRU(tamanho_cache)
+    
     def normalizar_nome(self, nome: str) -> str:
-        """Normaliza nome para comparação"""
+        """Normaliza nome para comparação (com cache)"""
         if pd.isna(nome):
             return ""
         
+        return self.cache_nome.obter(nome, self._normalizar_nome)
+    
+    def _normalizar_nome(self, nome) -> str:
         nome = str(nome).strip().upper()
         nome = unidecode(nome)
         
         # Remover títulos comuns
-        titulos = ['DR', 'DRA', 'SR', 'SRA', 'SRTA', 'PROF', 'ENG']
-        palavras = nome.split()
-        palavras = [p for p in palavras if p not in titulos]
+        palavras = [p for p in nome.split() if p not in TITULOS_NOME]
         
         # Remover conectores
-        conectores = ['DE', 'DA', 'DO', 'DAS', 'DOS', 'E']
-        palavras = [p for p in palavras if p not in conectores or len(palavras) <= 2]
+        if len(palavras) > 2:
+            palavras = [p for p in palavras if p not in CONECTORES_NOME]
         
         return ' '.join(palavras)
     
@@ -54,14 +276,17 @@ class DeduplicadorClientes:
         if pd.isna(cpf):
             return ""
         
-        return re.sub(r'\D', '', str(cpf))
+        return RE_NAO_DIGITO.sub('', str(cpf))
     
     def normalizar_telefone(self, telefone: str) -> str:
-        """Normaliza telefone removendo formatação"""
+        """Normaliza telefone removendo formatação (com cache)"""
         if pd.isna(telefone):
             return ""
         
-        tel = re.sub(r'\D', '', str(telefone))
+        return self.cache_telefone.obter(telefone, self._normalizar_telefone)
+    
+    def _normalizar_telefone(self, telefone) -> str:
+        tel = RE_NAO_DIGITO.sub('', str(telefone))
         
         # Remover código do país se presente
         if len(tel) > 11 and tel.startswith('55'):
@@ -76,33 +301,38 @@ class DeduplicadorClientes:
         return tel
     
     def normalizar_endereco(self, endereco: str) -> str:
-        """Normaliza endereço para comparação"""
+        """Normaliza endereço para comparação (com cache)"""
         if pd.isna(endereco):
             return ""
         
+        return self.cache_endereco.obter(endereco, self._normalizar_endereco)
+    
+    def _normalizar_endereco(self, endereco) -> str:
         endereco = str(endereco).strip().upper()
         endereco = unidecode(endereco)
         
-        # Padronizar abreviações
-        substituicoes = {
-            r'\bR\b\.?': 'RUA',
-            r'\bAV\b\.?': 'AVENIDA',
-            r'\bTRAV\b\.?': 'TRAVESSA',
-            r'\bAL\b\.?': 'ALAMEDA',
-            r'\bPCA\b\.?': 'PRACA',
-            r'\bEST\b\.?': 'ESTRADA',
-            r'\bROD\b\.?': 'RODOVIA',
-            r'\bAPT\b\.?': 'APARTAMENTO',
-            r'\bCONJ\b\.?': 'CONJUNTO',
-            r'\bBL\b\.?': 'BLOCO',
-            r'\bQD\b\.?': 'QUADRA',
-            r'\bLT\b\.?': 'LOTE'
+        # Padronizar abreviações (uma única passada com a regex combinada)
+        return RE_ABREVIACOES_ENDERECO.sub(lambda m: ABREVIACOES_ENDERECO[m.group(1)], endereco)
+    
+    def estatisticas_cache(self) -> Dict[str, Dict[str, float]]:
+        """Estatísticas dos caches de normalização desde o último zerar_estatisticas_cache"""
+        return {
+            'nome': self.cache_nome.estatisticas(),
+            'telefone': self.cache_telefone.estatisticas(),
+            'endereco': self.cache_endereco.estatisticas()
         }
-        
-        for padrao, substituto in substituicoes.items():
-            endereco = re.sub(padrao, substituto, endereco)
-        
-        return endereco
+    
+    def zerar_estatisticas_cache(self):
+        """Zera os contadores (o conteúdo dos caches é mantido entre execuções)"""
+        for cache in (self.cache_nome, self.cache_telefone, self.cache_endereco):
+            cache.zerar_estatisticas()
+    
+    def _reportar_cache(self):
+        """Imprime a taxa de acerto dos caches na execução atual"""
+        for campo, stats in self.estatisticas_cache().items():
+            if stats['consultas']:
+                print(f"Cache {campo}: {stats['taxa_acerto']:.1%} de acerto "
+                      f"({stats['acertos']}/{stats['consultas']}, {stats['descartes']} descartes)")
     
     def calcular_score_nome(self, nome1: str, nome2: str) -> float:
         """Calcula score de similaridade entre nomes"""
@@ -165,20 +395,12 @@ class DeduplicadorClientes:
     
     def calcular_score_final(self, scores: Dict[str, float]) -> Tuple[float, str]:
         """Calcula score final e determina confiança"""
-        # Pesos para diferentes campos
-        pesos = {
-            'nome': 0.4,
-            'cpf': 0.3,
-            'telefone': 0.2,
-            'endereco': 0.1
-        }
-        
         # Se CPF é igual, alta confiança
         if scores.get('cpf', 0) == 1.0:
             return 1.0, 'alta'
         
         # Calcular score ponderado
-        score_final = sum(scores.get(campo, 0) * peso for campo, peso in pesos.items())
+        score_final = sum(scores.get(campo, 0) * peso for campo, peso in PESOS_CAMPOS.items())
         
         # Determinar confiança
         if score_final >= self.threshold_alto:
@@ -208,13 +430,132 @@ class DeduplicadorClientes:
         else:
             return 'ignorar'
     
-    def encontrar_duplicatas(self, df: pd.DataFrame) -> List[ClienteMatch]:
-        """Encontra todas as duplicatas no DataFrame"""
-        duplicatas = []
+    def gerar_chaves_bloco(self, nome: str, cpf: str = None, telefone: str = None) -> List[str]:
+        """Gera as chaves de bloco (CPF, sufixo do telefone, tokens/prefixos/fonética do nome) de um registro"""
+        nome_norm = self.normalizar_nome(nome)
+        return self._chaves_bloco(
+            nome_norm, self.normalizar_cpf(cpf), self.normalizar_telefone(telefone), chave_fonetica(nome_norm)
+        )
+    
+    def _chaves_bloco(self, nome_norm: str, cpf_norm: str, tel_norm: str, nome_fonetico: str = '') -> List[str]:
+        """Gera as chaves de bloco a partir dos valores já normalizados"""
+        chaves = []
         
+        if len(cpf_norm) == 11:
+            chaves.append(f"cpf:{cpf_norm}")
+        
+        # Últimos 8 dígitos = número sem DDD
+        if len(tel_norm) >= 8:
+            chaves.append(f"tel:{tel_norm[-8:]}")
+        
+        palavras = nome_norm.split()
+        if palavras:
+            # Prefixo do primeiro nome + inicial do sobrenome cobre tokens muito comuns
+            chaves.append(f"pref:{palavras[0][:4]}{palavras[-1][:1]}")
+            for palavra in palavras:
+                if len(palavra) >= 3:
+                    chaves.append(f"tok:{palavra}")
+        
+        # Primeiro + último código fonético agrupa variantes de grafia (Thaís/Tais, Luiz/Luis)
+        codigos = nome_fonetico.split()
+        if codigos:
+            chaves.append(f"fon:{codigos[0]}|{codigos[-1]}")
+        
+        # Remover chaves repetidas mantendo a ordem
+        return list(dict.fromkeys(chaves))
+    
+    def gerar_pares_candidatos(self, registros: pd.DataFrame, inicio_novos: int = 0,
+                               blocos_existentes: Optional[Dict[str, List[int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Gera os pares (posições i < j) que compartilham pelo menos um bloco
+        
+        No modo incremental, registros[:inicio_novos] já estão indexados em
+        blocos_existentes e só são gerados pares que envolvem algum registro novo.
+        """
+        blocos_existentes = blocos_existentes or {}
+        blocos = defaultdict(list)
+        
+        novos = registros.iloc[inicio_novos:]
+        colunas = zip(novos['nome_norm'], novos['cpf_norm'], novos['tel_norm'], novos['nome_fonetico'])
+        for pos, (nome_norm, cpf_norm, tel_norm, nome_fonetico) in enumerate(colunas, start=inicio_novos):
+            for chave in self._chaves_bloco(nome_norm, cpf_norm, tel_norm, nome_fonetico):
+                blocos[chave].append(pos)
+        
+        total_registros = len(registros)
+        codigos = []
+        blocos_usados = 0
+        blocos_descartados = 0
+        
+        for chave, membros in blocos.items():
+            existentes = blocos_existentes.get(chave, [])
+            tamanho = len(existentes) + len(membros)
+            if tamanho < 2:
+                continue
+            if tamanho > self.max_tamanho_bloco:
+                blocos_descartados += 1
+                continue
+            
+            blocos_usados += 1
+            # Membros já estão em ordem crescente de posição (existentes antes dos novos)
+            membros = np.asarray(existentes + membros, dtype=np.int64)
+            a, b = np.triu_indices(len(membros), k=1)
+            # Pares só entre registros existentes já foram avaliados antes
+            manter = b >= len(existentes)
+            codigos.append(membros[a[manter]] * total_registros + membros[b[manter]])
+        
+        # Pares repetidos entre blocos são removidos; np.unique já devolve em ordem (i, j)
+        if codigos:
+            codigos = np.unique(np.concatenate(codigos))
+        else:
+            codigos = np.empty(0, dtype=np.int64)
+        
+        total_novos = total_registros - inicio_novos
+        self.estatisticas_blocagem = {
+            'total_registros': total_registros,
+            'total_blocos': len(blocos),
+            'blocos_usados': blocos_usados,
+            'blocos_descartados': blocos_descartados,
+            'pares_exaustivos': inicio_novos * total_novos + total_novos * (total_novos - 1) // 2,
+            'pares_candidatos': len(codigos)
+        }
+        
+        return codigos // max(total_registros, 1), codigos % max(total_registros, 1)
+    
+    def _faixas_lotes_exaustivos(self, total_registros: int) -> List[Tuple[int, int]]:
+        """Faixas [inicio, fim) de linhas i de cada lote exaustivo (pares i < j)
+        
+        Um lote junta linhas inteiras até somar pelo menos TAMANHO_LOTE_PARES pares.
+        """
+        faixas = []
+        inicio, tamanho = 0, 0
+        
+        for i in range(total_registros - 1):
+            tamanho += total_registros - 1 - i
+            if tamanho >= TAMANHO_LOTE_PARES:
+                faixas.append((inicio, i + 1))
+                inicio, tamanho = i + 1, 0
+        
+        if tamanho:
+            faixas.append((inicio, total_registros - 1))
+        return faixas
+    
+    def _iterar_pares_exaustivos(self, total_registros: int,
+                                 faixas: Optional[List[Tuple[int, int]]] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Gera todos os pares i < j em lotes, sem materializar os n² pares"""
+        if faixas is None:
+            faixas = self._faixas_lotes_exaustivos(total_registros)
+        
+        for inicio, fim in faixas:
+            lote_i, lote_j = [], []
+            for i in range(inicio, fim):
+                j = np.arange(i + 1, total_registros, dtype=np.int64)
+                lote_i.append(np.full(len(j), i, dtype=np.int64))
+                lote_j.append(j)
+            yield np.concatenate(lote_i), np.concatenate(lote_j)
+    
+    def _preparar_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Valida colunas, garante coluna de ID e remove registros sem nome"""
         # Campos necessários
         campos_obrigatorios = ['nome']
-        campos_opcionais = ['cpf', 'telefone', 'endereco']
         
         # Verificar se pelo menos nome existe
         if not all(campo in df.columns for campo in campos_obrigatorios):
@@ -225,87 +566,660 @@ class DeduplicadorClientes:
             df = df.reset_index()
             df = df.rename(columns={'index': 'id'})
         
-        # Remover registros sem nome
-        df_limpo = df.dropna(subset=['nome']).copy()
+        # Remover registros sem nome (posições passam a ser 0..n-1)
+        return df.dropna(subset=['nome']).reset_index(drop=True)
+    
+    def preparar_registros(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normaliza cada registro uma única vez em um frame colunar
+        
+        Além das formas normalizadas, guarda as formas já processadas pelo fuzzywuzzy
+        (minúsculas, só alfanuméricos, tokens ordenados) para que as métricas de token
+        não reprocessem as strings a cada par.
+        """
+        df_limpo = self._preparar_dataframe(df)
+        vazio = [None] * len(df_limpo)
+        
+        cpfs = df_limpo['cpf'].tolist() if 'cpf' in df_limpo.columns else vazio
+        telefones = df_limpo['telefone'].tolist() if 'telefone' in df_limpo.columns else vazio
+        enderecos = df_limpo['endereco'].tolist() if 'endereco' in df_limpo.columns else vazio
+        
+        nomes_norm = [self.normalizar_nome(nome) for nome in df_limpo['nome']]
+        nomes_proc = [fuzz_utils.full_process(nome, force_ascii=True) for nome in nomes_norm]
+        enderecos_norm = [self.normalizar_endereco(end) for end in enderecos]
+        
+        return pd.DataFrame({
+            'id': df_limpo['id'].values,
+            'nome': df_limpo['nome'].values,
+            'nome_norm': nomes_norm,
+            'nome_fonetico': [chave_fonetica(nome) for nome in nomes_norm],
+            'nome_proc': nomes_proc,
+            'nome_ordenado': [' '.join(sorted(nome.split())) for nome in nomes_proc],
+            'cpf_norm': [self.normalizar_cpf(cpf) for cpf in cpfs],
+            'tel_norm': [self.normalizar_telefone(tel) for tel in telefones],
+            'end_proc': [fuzz_utils.full_process(end, force_ascii=True) if end else '' for end in enderecos_norm]
+        })
+    
+    def pontuar_pares(self, registros: pd.DataFrame, idx1: np.ndarray, idx2: np.ndarray,
+                      filtrar: bool = True) -> Dict[str, np.ndarray]:
+        """Pontua um lote de pares de uma vez e devolve os scores como arrays NumPy
+        
+        Equivalente a chamar calcular_score_* / calcular_score_final /
+        determinar_recomendacao par a par. Com filtrar=True, só devolve os pares com
+        score de nome e score final >= SCORE_MINIMO (e, com prefiltro_fonetico, descarta
+        antes das métricas fuzzy os pares sem CPF/telefone em comum cujos nomes
+        compartilham menos de SOBREPOSICAO_FONETICA_MINIMA dos códigos fonéticos).
+        """
+        idx1 = np.asarray(idx1, dtype=np.int64)
+        idx2 = np.asarray(idx2, dtype=np.int64)
+        
+        cpf_norm = registros['cpf_norm'].to_numpy()
+        tel_norm = registros['tel_norm'].to_numpy()
+        tel_len = registros['tel_norm'].str.len().to_numpy()
+        tel_sufixo = registros['tel_norm'].str[-8:].to_numpy()
+        
+        if filtrar and self.prefiltro_fonetico:
+            fonetico = registros['nome_fonetico'].to_numpy()
+            fonetico_comum = np.fromiter(
+                (_sobreposicao_fonetica(a, b) for a, b in zip(fonetico[idx1], fonetico[idx2])),
+                dtype=np.float64, count=len(idx1)
+            ) >= SOBREPOSICAO_FONETICA_MINIMA
+            cpf_comum = (cpf_norm[idx1] == cpf_norm[idx2]) & (cpf_norm[idx1] != '')
+            tel_comum = (tel_len[idx1] >= 8) & (tel_len[idx2] >= 8) & (tel_sufixo[idx1] == tel_sufixo[idx2])
+            manter = fonetico_comum | cpf_comum | tel_comum
+            idx1, idx2 = idx1[manter], idx2[manter]
+        
+        # Métricas de nome (sempre calculadas, servem de filtro)
+        nome_norm = registros['nome_norm'].to_numpy()
+        nome_proc = registros['nome_proc'].to_numpy()
+        nome_ordenado = registros['nome_ordenado'].to_numpy()
+        
+        a_norm, b_norm = nome_norm[idx1], nome_norm[idx2]
+        a_proc, b_proc = nome_proc[idx1], nome_proc[idx2]
+        a_ord, b_ord = nome_ordenado[idx1], nome_ordenado[idx2]
+        total = len(idx1)
+        
+        ratio = np.fromiter((fuzz.ratio(a, b) for a, b in zip(a_norm, b_norm)), dtype=np.float64, count=total)
+        partial = np.fromiter((fuzz.partial_ratio(a, b) for a, b in zip(a_norm, b_norm)), dtype=np.float64, count=total)
+        token_sort = np.fromiter((fuzz.ratio(a, b) for a, b in zip(a_ord, b_ord)), dtype=np.float64, count=total)
+        token_set = np.fromiter(
+            (fuzz.token_set_ratio(a, b, full_process=False) for a, b in zip(a_proc, b_proc)),
+            dtype=np.float64, count=total
+        )
+        
+        nome_vazio = (registros['nome_norm'].str.len().to_numpy() == 0)
+        score_nome = (ratio * 0.3 + partial * 0.2 + token_sort * 0.25 + token_set * 0.25) / 100
+        score_nome[nome_vazio[idx1] | nome_vazio[idx2]] = 0.0
+        
+        # Demais campos só para os pares que passaram no filtro de nome
+        if filtrar:
+            manter = score_nome >= SCORE_MINIMO
+            idx1, idx2, score_nome = idx1[manter], idx2[manter], score_nome[manter]
+        
+        cpf1, cpf2 = cpf_norm[idx1], cpf_norm[idx2]
+        score_cpf = ((cpf1 == cpf2) & (cpf1 != '')).astype(np.float64)
+        
+        tel1, tel2 = tel_norm[idx1], tel_norm[idx2]
+        score_telefone = np.fromiter(
+            (fuzz.ratio(a, b) / 100 if a and b else 0.0 for a, b in zip(tel1, tel2)),
+            dtype=np.float64, count=len(idx1)
+        )
+        sufixo_igual = (tel_len[idx1] >= 8) & (tel_len[idx2] >= 8) & (tel_sufixo[idx1] == tel_sufixo[idx2])
+        score_telefone[sufixo_igual] = 0.8
+        score_telefone[(tel1 == tel2) & (tel1 != '')] = 1.0
+        
+        end_proc = registros['end_proc'].to_numpy()
+        end1, end2 = end_proc[idx1], end_proc[idx2]
+        score_endereco = np.fromiter(
+            (fuzz.token_set_ratio(a, b, full_process=False) / 100 if a and b else 0.0 for a, b in zip(end1, end2)),
+            dtype=np.float64, count=len(idx1)
+        )
+        
+        # Score final ponderado (CPF igual força 1.0)
+        cpf_igual = score_cpf == 1.0
+        score_final = (
+            score_nome * PESOS_CAMPOS['nome'] +
+            score_cpf * PESOS_CAMPOS['cpf'] +
+            score_telefone * PESOS_CAMPOS['telefone'] +
+            score_endereco * PESOS_CAMPOS['endereco']
+        )
+        score_final[cpf_igual] = 1.0
+        
+        confianca = np.select(
+            [cpf_igual | (score_final >= self.threshold_alto), score_final >= self.threshold_medio],
+            ['alta', 'media'],
+            default='baixa'
+        ).astype(object)
+        
+        recomendacao = np.select(
+            [cpf_igual | ((score_nome >= 0.9) & (score_telefone >= 0.8)) | (confianca == 'alta'),
+             confianca == 'media'],
+            ['merge', 'revisar'],
+            default='ignorar'
+        ).astype(object)
+        
+        resultado = {
+            'idx1': idx1,
+            'idx2': idx2,
+            'score_nome': score_nome,
+            'score_cpf': score_cpf,
+            'score_telefone': score_telefone,
+            'score_endereco': score_endereco,
+            'score_final': score_final,
+            'confianca': confianca,
+            'recomendacao': recomendacao
+        }
+        
+        if filtrar:
+            manter = score_final >= SCORE_MINIMO
+            resultado = {campo: valores[manter] for campo, valores in resultado.items()}
+        
+        return resultado
+    
+    def _criar_matches(self, registros: pd.DataFrame, pontuados: Dict[str, np.ndarray]) -> List[ClienteMatch]:
+        """Converte o resultado de pontuar_pares em objetos ClienteMatch"""
+        ids = registros['id'].to_numpy()
+        nomes = registros['nome'].to_numpy()
+        idx1, idx2 = pontuados['idx1'], pontuados['idx2']
+        
+        return [
+            ClienteMatch(*campos)
+            for campos in zip(
+                ids[idx1].tolist(), ids[idx2].tolist(), nomes[idx1].tolist(), nomes[idx2].tolist(),
+                pontuados['score_nome'].tolist(), pontuados['score_cpf'].tolist(),
+                pontuados['score_telefone'].tolist(), pontuados['score_endereco'].tolist(),
+                pontuados['score_final'].tolist(), pontuados['confianca'].tolist(),
+                pontuados['recomendacao'].tolist()
+            )
+        ]
+    
+    def _notificar_progresso(self, processados: int, total_pares: int, lotes_concluidos: int,
+                             total_lotes: int):
+        """Registra o progresso no log e repassa ao callback_progresso, se houver"""
+        logger.debug("Processados: %d/%d", processados, total_pares)
+        
+        if self.callback_progresso is not None:
+            self.callback_progresso({
+                'pares_processados': processados,
+                'total_pares': total_pares,
+                'lotes_concluidos': lotes_concluidos,
+                'total_lotes': total_lotes
+            })
+    
+    def _pontuar_lotes(self, registros: pd.DataFrame, lotes,
+                       workers: int) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """Pontua os lotes de pares, em processos separados quando workers > 1
+        
+        Os registros normalizados são enviados a cada processo uma única vez (no
+        initializer); cada tarefa recebe só os arrays de índices do lote. Os resultados
+        são devolvidos na mesma ordem dos lotes, independente do número de workers,
+        junto com o tamanho de cada lote.
+        """
+        if workers <= 1:
+            for idx1, idx2 in lotes:
+                yield len(idx1), self.pontuar_pares(registros, idx1, idx2)
+            return
+        
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_inicializar_worker,
+            initargs=(registros, self.threshold_alto, self.threshold_medio, self.prefiltro_fonetico)
+        ) as executor:
+            # Limitar tarefas pendentes para não materializar todos os lotes em memória
+            pendentes = deque()
+            for idx1, idx2 in lotes:
+                pendentes.append((len(idx1), executor.submit(_pontuar_lote_worker, idx1, idx2)))
+                if len(pendentes) >= workers * 2:
+                    tamanho, futuro = pendentes.popleft()
+                    yield tamanho, futuro.result()
+            
+            while pendentes:
+                tamanho, futuro = pendentes.popleft()
+                yield tamanho, futuro.result()
+    
+    def _iterar_pontuados(self, registros: pd.DataFrame, modo: str,
+                          workers: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Gera os pares do modo escolhido e devolve, lote a lote, os pares pontuados"""
+        if modo not in ('blocagem', 'exaustivo'):
+            raise ValueError(f"Modo inválido: {modo}. Use 'blocagem' ou 'exaustivo'")
+        
+        total_registros = len(registros)
+        
+        if modo == 'blocagem':
+            idx1, idx2 = self.gerar_pares_candidatos(registros)
+            total_pares = len(idx1)
+            total_lotes = -(-total_pares // TAMANHO_LOTE_PARES)
+            lotes = (
+                (idx1[inicio:inicio + TAMANHO_LOTE_PARES], idx2[inicio:inicio + TAMANHO_LOTE_PARES])
+                for inicio in range(0, total_pares, TAMANHO_LOTE_PARES)
+            )
+        else:
+            # Lotes exaustivos juntam linhas inteiras e passam de TAMANHO_LOTE_PARES
+            total_pares = total_registros * (total_registros - 1) // 2
+            faixas = self._faixas_lotes_exaustivos(total_registros)
+            total_lotes = len(faixas)
+            lotes = self._iterar_pares_exaustivos(total_registros, faixas)
+        
+        # Não vale a pena subir processos para poucos lotes
+        if total_pares <= TAMANHO_LOTE_PARES:
+            workers = 1
         
-        total_registros = len(df_limpo)
         processados = 0
+        for lote, (tamanho, pontuados) in enumerate(self._pontuar_lotes(registros, lotes, workers), start=1):
+            processados += tamanho
+            self._notificar_progresso(processados, total_pares, lote, total_lotes)
+            yield pontuados
+    
+    def iterar_duplicatas(self, df: pd.DataFrame, modo: str = 'blocagem',
+                          workers: Optional[int] = None) -> Iterator[ClienteMatch]:
+        """Gera as duplicatas à medida que cada lote de pares é pontuado (sem ordenar)"""
+        workers = self.workers if workers is None else workers
+        self.zerar_estatisticas_cache()
+        registros = self.preparar_registros(df)
         
-        for i, row1 in df_limpo.iterrows():
-            for j, row2 in df_limpo.iloc[i+1:].iterrows():
-                processados += 1
-                
-                if processados % 1000 == 0:
-                    print(f"Processados: {processados}/{total_registros*(total_registros-1)//2}")
-                
-                # Calcular scores
-                scores = {
-                    'nome': self.calcular_score_nome(row1['nome'], row2['nome'])
-                }
-                
-                # Só continuar se nome tem similaridade mínima
-                if scores['nome'] < 0.6:
+        for pontuados in self._iterar_pontuados(registros, modo, workers):
+            yield from self._criar_matches(registros, pontuados)
+        
+        self._reportar_cache()
+    
+    def encontrar_duplicatas(self, df: pd.DataFrame, modo: str = 'blocagem',
+                             workers: Optional[int] = None) -> List[ClienteMatch]:
+        """Encontra todas as duplicatas no DataFrame
+        
+        modo='blocagem' compara apenas pares que compartilham CPF, sufixo de telefone
+        ou tokens/prefixos do nome; modo='exaustivo' compara todos os pares (O(n²)).
+        workers sobrescreve o número de processos definido no construtor.
+        Para bases grandes, prefira iterar_duplicatas ou exportar_duplicatas.
+        """
+        duplicatas = list(self.iterar_duplicatas(df, modo, workers))
+        
+        # Ordenar por score final decrescente (estável: empates seguem a ordem dos pares)
+        duplicatas.sort(key=lambda x: x.score_final, reverse=True)
+        
+        return duplicatas
+    
+    def exportar_duplicatas(self, df: pd.DataFrame, caminho, modo: str = 'blocagem',
+                            workers: Optional[int] = None, top_k: int = 100) -> pd.DataFrame:
+        """Grava as duplicatas em CSV/Parquet lote a lote e devolve só o top_k para exibição
+        
+        O formato vem da extensão do arquivo (.csv ou .parquet). A memória fica limitada
+        ao lote atual mais um heap com os top_k maiores scores.
+        """
+        caminho = Path(caminho)
+        formato = caminho.suffix.lower()
+        if formato not in ('.csv', '.parquet'):
+            raise ValueError(f"Formato não suportado: {formato}. Use .csv ou .parquet")
+        
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        workers = self.workers if workers is None else workers
+        self.zerar_estatisticas_cache()
+        registros = self.preparar_registros(df)
+        ids = registros['id'].to_numpy()
+        nomes = registros['nome'].to_numpy()
+        
+        # Heap mínimo de (score, -ordem, linha): o topo é o pior dos top_k
+        top = []
+        ordem = 0
+        escritor_parquet = None
+        esquema_parquet = None
+        total = 0
+        
+        try:
+            for pontuados in self._iterar_pontuados(registros, modo, workers):
+                idx1, idx2 = pontuados['idx1'], pontuados['idx2']
+                lote = self._montar_relatorio(
+                    ids[idx1].tolist(), ids[idx2].tolist(), nomes[idx1].tolist(), nomes[idx2].tolist(),
+                    *(pontuados[campo].tolist() for campo in CAMPOS_SCORE),
+                    pontuados['confianca'].tolist(), pontuados['recomendacao'].tolist()
+                )
+                if lote.empty:
                     continue
                 
-                if 'cpf' in df.columns:
-                    scores['cpf'] = self.calcular_score_cpf(row1.get('cpf'), row2.get('cpf'))
-                
-                if 'telefone' in df.columns:
-                    scores['telefone'] = self.calcular_score_telefone(row1.get('telefone'), row2.get('telefone'))
-                
-                if 'endereco' in df.columns:
-                    scores['endereco'] = self.calcular_score_endereco(row1.get('endereco'), row2.get('endereco'))
-                
-                # Calcular score final
-                score_final, confianca = self.calcular_score_final(scores)
-                
-                # Só incluir se score final é significativo
-                if score_final >= 0.6:
-                    recomendacao = self.determinar_recomendacao(score_final, confianca, scores)
+                if formato == '.csv':
+                    lote.to_csv(caminho, mode='w' if total == 0 else 'a', header=(total == 0),
+                                index=False, encoding='utf-8')
+                else:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
                     
-                    match = ClienteMatch(
-                        cliente_id_1=row1['id'],
-                        cliente_id_2=row2['id'],
-                        nome_1=row1['nome'],
-                        nome_2=row2['nome'],
-                        score_nome=scores['nome'],
-                        score_cpf=scores.get('cpf', 0),
-                        score_telefone=scores.get('telefone', 0),
-                        score_endereco=scores.get('endereco', 0),
-                        score_final=score_final,
-                        confianca=confianca,
-                        recomendacao=recomendacao
+                    if escritor_parquet is None:
+                        esquema_parquet = pa.Table.from_pandas(lote, preserve_index=False).schema
+                        escritor_parquet = pq.ParquetWriter(caminho, esquema_parquet)
+                    escritor_parquet.write_table(
+                        pa.Table.from_pandas(lote, schema=esquema_parquet, preserve_index=False)
                     )
-                    
-                    duplicatas.append(match)
+                total += len(lote)
+                
+                for linha, score in zip(lote.itertuples(index=False), pontuados['score_final'].tolist()):
+                    item = (score, -ordem, tuple(linha))
+                    ordem += 1
+                    if len(top) < top_k:
+                        heapq.heappush(top, item)
+                    elif item > top[0]:
+                        heapq.heapreplace(top, item)
+        finally:
+            if escritor_parquet is not None:
+                escritor_parquet.close()
+        
+        if total == 0:
+            vazio = self._montar_relatorio(*([[]] * 11))
+            if formato == '.csv':
+                vazio.to_csv(caminho, index=False, encoding='utf-8')
+            else:
+                vazio.to_parquet(caminho, index=False)
+        
+        self._reportar_cache()
+        self.estatisticas_exportacao = {'total_duplicatas': total, 'arquivo': str(caminho)}
+        print(f"Duplicatas exportadas: {total} → {caminho}")
+        
+        melhores = [linha for _, _, linha in sorted(top, reverse=True)]
+        return pd.DataFrame(melhores, columns=COLUNAS_RELATORIO)
+    
+    def deduplicar_incremental(self, df: pd.DataFrame, indice,
+                               workers: Optional[int] = None) -> List[ClienteMatch]:
+        """Deduplica apenas os registros novos contra um índice persistido
+        
+        `indice` é um IndiceClientes (app/services/indice_clientes.py). Registros cujo
+        ID já está no índice são ignorados; os novos são comparados só com os blocos
+        existentes e entre si, recebem um cluster_id e são gravados no índice.
+        
+        Exige uma coluna 'id' derivada do conteúdo da linha (ver
+        tarefas_deduplicacao.ids_por_conteudo): IDs posicionais colidiriam entre
+        lotes e deixariam passar linhas editadas. Com a coluna opcional 'origem'
+        (arquivo), os registros indexados dessa origem que não vieram no lote são
+        removidos antes, como num reenvio do arquivo corrigido.
+        """
+        if 'id' not in df.columns or df['id'].isna().any():
+            raise ValueError("Deduplicação incremental exige a coluna 'id' preenchida e estável entre uploads")
+        
+        workers = self.workers if workers is None else workers
+        self.zerar_estatisticas_cache()
+        
+        removidos = indice.remover_ausentes(df['origem'], df['id']) if 'origem' in df.columns else 0
+        
+        novos = self.preparar_registros(df)
+        novos = novos[~indice.contem_ids(novos['id'])]
+        novos = novos.drop_duplicates(subset=['id']).reset_index(drop=True)
+        
+        if novos.empty:
+            if removidos:
+                indice.salvar()
+            return []
         
-        # Ordenar por score final decrescente
+        inicio_novos = len(indice)
+        registros = indice.concatenar(novos)
+        
+        idx1, idx2 = self.gerar_pares_candidatos(registros, inicio_novos, indice.blocos)
+        total_pares = len(idx1)
+        total_lotes = -(-total_pares // TAMANHO_LOTE_PARES)
+        lotes = (
+            (idx1[inicio:inicio + TAMANHO_LOTE_PARES], idx2[inicio:inicio + TAMANHO_LOTE_PARES])
+            for inicio in range(0, total_pares, TAMANHO_LOTE_PARES)
+        )
+        
+        if total_pares <= TAMANHO_LOTE_PARES:
+            workers = 1
+        
+        duplicatas = []
+        merges = []
+        processados = 0
+        
+        for lote, (tamanho, pontuados) in enumerate(self._pontuar_lotes(registros, lotes, workers), start=1):
+            duplicatas.extend(self._criar_matches(registros, pontuados))
+            
+            eh_merge = pontuados['recomendacao'] == 'merge'
+            merges.extend(zip(
+                pontuados['score_final'][eh_merge].tolist(),
+                pontuados['idx1'][eh_merge].tolist(),
+                pontuados['idx2'][eh_merge].tolist()
+            ))
+            
+            processados += tamanho
+            self._notificar_progresso(processados, total_pares, lote, total_lotes)
+        
+        # Clusters transitivos: novos registros e clusters existentes ligados por merge
+        clusters_existentes = indice.registros['cluster_id'].tolist() if inicio_novos else []
+        uniao = UniaoDisjunta(len(novos))
+        nos_clusters: Dict[int, int] = {}
+        
+        def no_da_posicao(pos: int) -> int:
+            if pos >= inicio_novos:
+                return pos - inicio_novos
+            cluster = clusters_existentes[pos]
+            if cluster not in nos_clusters:
+                nos_clusters[cluster] = uniao.adicionar()
+            return nos_clusters[cluster]
+        
+        for _, i, j in merges:
+            uniao.unir(no_da_posicao(i), no_da_posicao(j))
+        
+        # Componente com clusters existentes mantém o menor deles; os demais são fundidos
+        cluster_componente: Dict[int, int] = {}
+        fusoes: Dict[int, int] = {}
+        for cluster, no in sorted(nos_clusters.items()):
+            raiz = uniao.encontrar(no)
+            if raiz in cluster_componente:
+                fusoes[cluster] = cluster_componente[raiz]
+            else:
+                cluster_componente[raiz] = cluster
+        
+        clusters_novos = []
+        for pos in range(len(novos)):
+            raiz = uniao.encontrar(pos)
+            if raiz not in cluster_componente:
+                cluster_componente[raiz] = indice.novo_cluster()
+            clusters_novos.append(cluster_componente[raiz])
+        
+        indice.fundir_clusters(fusoes)
+        
+        chaves = [
+            self._chaves_bloco(*valores)
+            for valores in zip(novos['nome_norm'], novos['cpf_norm'], novos['tel_norm'], novos['nome_fonetico'])
+        ]
+        origens = None
+        if 'origem' in df.columns:
+            origens = novos['id'].map(dict(zip(df['id'], df['origem']))).tolist()
+        indice.adicionar(novos, chaves, clusters_novos, origens)
+        indice.salvar()
+        
+        self._reportar_cache()
+        
+        # Ordenar por score final decrescente (estável: empates seguem a ordem dos pares)
         duplicatas.sort(key=lambda x: x.score_final, reverse=True)
         
         return duplicatas
     
+    def avaliar_recall_blocagem(self, df: pd.DataFrame) -> Dict[str, float]:
+        """Compara a blocagem (e o pré-filtro fonético) com o modo exaustivo e mede o recall"""
+        # Referência sem nenhum atalho: todos os pares e sem pré-filtro fonético
+        prefiltro_fonetico = self.prefiltro_fonetico
+        self.prefiltro_fonetico = False
+        try:
+            exaustivo = self.encontrar_duplicatas(df, modo='exaustivo')
+        finally:
+            self.prefiltro_fonetico = prefiltro_fonetico
+        blocagem = self.encontrar_duplicatas(df, modo='blocagem')
+        
+        pares_exaustivo = {(m.cliente_id_1, m.cliente_id_2) for m in exaustivo}
+        pares_blocagem = {(m.cliente_id_1, m.cliente_id_2) for m in blocagem}
+        merges_exaustivo = {(m.cliente_id_1, m.cliente_id_2) for m in exaustivo if m.recomendacao == 'merge'}
+        
+        encontrados = len(pares_exaustivo & pares_blocagem)
+        merges_encontrados = len(merges_exaustivo & pares_blocagem)
+        
+        stats = self.estatisticas_blocagem
+        reducao = 0.0
+        if stats['pares_exaustivos'] > 0:
+            reducao = (1 - stats['pares_candidatos'] / stats['pares_exaustivos']) * 100
+        
+        return {
+            **stats,
+            'reducao_pares_pct': round(reducao, 2),
+            'duplicatas_exaustivo': len(pares_exaustivo),
+            'duplicatas_blocagem': len(pares_blocagem),
+            'recall': round(encontrados / len(pares_exaustivo), 4) if pares_exaustivo else 1.0,
+            'recall_merge': round(merges_encontrados / len(merges_exaustivo), 4) if merges_exaustivo else 1.0
+        }
+    
+    def _diametro(self, membros: List[int], vizinhos: Dict[int, List[int]]) -> int:
+        """Diâmetro (em saltos) do grafo de links de merge de um cluster, via BFS"""
+        diametro = 0
+        for origem in membros:
+            distancias = {origem: 0}
+            fila = deque([origem])
+            while fila:
+                atual = fila.popleft()
+                for proximo in vizinhos[atual]:
+                    if proximo not in distancias:
+                        distancias[proximo] = distancias[atual] + 1
+                        fila.append(proximo)
+            diametro = max(diametro, max(distancias.values()))
+        return diametro
+    
+    def agrupar_duplicatas(self, duplicatas: List[ClienteMatch], ids: Optional[List] = None,
+                           diametro_maximo: Optional[int] = None) -> pd.DataFrame:
+        """Agrupa transitivamente os pares de merge (A~B, B~C) em clusters
+        
+        Usa union-find sobre as recomendações 'merge', processando os links do mais
+        forte para o mais fraco. Com diametro_maximo, um link só é aceito se o cluster
+        resultante não ultrapassar esse número de saltos entre quaisquer dois clientes,
+        evitando que um único link ruim junte duas famílias.
+        
+        Retorna uma linha por cliente com cluster_id, id_principal (registro de ouro:
+        primeiro cliente do cluster na ordem de entrada) e tamanho_cluster.
+        """
+        # Posições dos clientes (ids informados primeiro, depois os que só aparecem nos matches)
+        posicoes: Dict = {}
+        for cliente_id in (ids if ids is not None else []):
+            posicoes.setdefault(cliente_id, len(posicoes))
+        for match in duplicatas:
+            posicoes.setdefault(match.cliente_id_1, len(posicoes))
+            posicoes.setdefault(match.cliente_id_2, len(posicoes))
+        
+        uniao = UniaoDisjunta(len(posicoes))
+        merges = sorted(
+            (m for m in duplicatas if m.recomendacao == 'merge'),
+            key=lambda m: m.score_final, reverse=True
+        )
+        
+        # Estruturas só necessárias quando há limite de diâmetro
+        vizinhos: Dict[int, List[int]] = defaultdict(list)
+        membros: Dict[int, List[int]] = {}
+        diametros: Dict[int, int] = {}
+        links_rejeitados = 0
+        
+        for match in merges:
+            a, b = posicoes[match.cliente_id_1], posicoes[match.cliente_id_2]
+            
+            if diametro_maximo is None:
+                uniao.unir(a, b)
+                continue
+            
+            raiz_a, raiz_b = uniao.encontrar(a), uniao.encontrar(b)
+            if raiz_a == raiz_b:
+                # Link interno só encurta caminhos; o diâmetro guardado continua sendo um limite superior
+                vizinhos[a].append(b)
+                vizinhos[b].append(a)
+                continue
+            
+            membros_a = membros.get(raiz_a, [raiz_a])
+            membros_b = membros.get(raiz_b, [raiz_b])
+            diametro_a = diametros.get(raiz_a, 0)
+            diametro_b = diametros.get(raiz_b, 0)
+            
+            vizinhos[a].append(b)
+            vizinhos[b].append(a)
+            
+            # Limite superior barato; só calcula o diâmetro exato quando ele estoura
+            novo_diametro = diametro_a + diametro_b + 1
+            if novo_diametro > diametro_maximo:
+                novo_diametro = self._diametro(membros_a + membros_b, vizinhos)
+            
+            if novo_diametro > diametro_maximo:
+                vizinhos[a].pop()
+                vizinhos[b].pop()
+                links_rejeitados += 1
+                continue
+            
+            raiz = uniao.unir(a, b)
+            membros[raiz] = membros_a + membros_b
+            diametros[raiz] = novo_diametro
+            membros.pop(raiz_b if raiz == raiz_a else raiz_a, None)
+        
+        # Cluster numerado pela ordem do primeiro cliente (registro de ouro)
+        lista_ids = list(posicoes)
+        raizes = [uniao.encontrar(pos) for pos in range(len(lista_ids))]
+        cluster_da_raiz: Dict[int, int] = {}
+        principal_da_raiz: Dict[int, object] = {}
+        for pos, raiz in enumerate(raizes):
+            if raiz not in cluster_da_raiz:
+                cluster_da_raiz[raiz] = len(cluster_da_raiz)
+                principal_da_raiz[raiz] = lista_ids[pos]
+        
+        resultado = pd.DataFrame({
+            'id': lista_ids,
+            'cluster_id': [cluster_da_raiz[raiz] for raiz in raizes],
+            'id_principal': [principal_da_raiz[raiz] for raiz in raizes]
+        })
+        resultado['tamanho_cluster'] = resultado.groupby('cluster_id')['id'].transform('size')
+        
+        self.estatisticas_agrupamento = {
+            'total_clientes': len(resultado),
+            'total_clusters': len(cluster_da_raiz),
+            'clusters_com_duplicatas': int((resultado.groupby('cluster_id').size() > 1).sum()),
+            'maior_cluster': int(resultado['tamanho_cluster'].max()) if len(resultado) else 0,
+            'links_merge': len(merges),
+            'links_rejeitados': links_rejeitados
+        }
+        
+        return resultado
+    
+    def _montar_relatorio(self, ids_1, ids_2, nomes_1, nomes_2, scores_nome, scores_cpf,
+                          scores_telefone, scores_endereco, scores_final, confiancas,
+                          recomendacoes) -> pd.DataFrame:
+        """Monta o DataFrame do relatório direto das colunas (scores com 3 casas)"""
+        def arredondar(valores):
+            return [round(v, 3) for v in valores]
+        
+        return pd.DataFrame({
+            'ID_1': ids_1,
+            'ID_2': ids_2,
+            'Nome_1': nomes_1,
+            'Nome_2': nomes_2,
+            'Score_Nome': arredondar(scores_nome),
+            'Score_CPF': arredondar(scores_cpf),
+            'Score_Telefone': arredondar(scores_telefone),
+            'Score_Endereco': arredondar(scores_endereco),
+            'Score_Final': arredondar(scores_final),
+            'Confianca': confiancas,
+            'Recomendacao': recomendacoes
+        }, columns=COLUNAS_RELATORIO)
+    
     def gerar_relatorio_duplicatas(self, duplicatas: List[ClienteMatch]) -> pd.DataFrame:
         """Gera relatório das duplicatas encontradas"""
         if not duplicatas:
             return pd.DataFrame()
         
-        dados = []
-        for match in duplicatas:
-            dados.append({
-                'ID_1': match.cliente_id_1,
-                'ID_2': match.cliente_id_2,
-                'Nome_1': match.nome_1,
-                'Nome_2': match.nome_2,
-                'Score_Nome': round(match.score_nome, 3),
-                'Score_CPF': round(match.score_cpf, 3),
-                'Score_Telefone': round(match.score_telefone, 3),
-                'Score_Endereco': round(match.score_endereco, 3),
-                'Score_Final': round(match.score_final, 3),
-                'Confianca': match.confianca,
-                'Recomendacao': match.recomendacao
-            })
-        
-        return pd.DataFrame(dados)
+        return self._montar_relatorio(*(
+            [getattr(match, campo) for match in duplicatas]
+            for campo in ClienteMatch.__slots__
+        ))
+
+# Estado de cada processo de trabalho, preenchido uma única vez pelo initializer
+_registros_worker: Optional[pd.DataFrame] = None
+_deduplicador_worker: Optional[DeduplicadorClientes] = None
+
+def _inicializar_worker(registros: pd.DataFrame, threshold_alto: float, threshold_medio: float,
+                        prefiltro_fonetico: bool):
+    """Recebe os registros normalizados uma vez por processo"""
+    global _registros_worker, _deduplicador_worker
+    _registros_worker = registros
+    _deduplicador_worker = DeduplicadorClientes(
+        threshold_alto, threshold_medio, prefiltro_fonetico=prefiltro_fonetico
+    )
+
+def _pontuar_lote_worker(idx1: np.ndarray, idx2: np.ndarray) -> Dict[str, np.ndarray]:
+    """Pontua um lote de pares dentro do processo de trabalho"""
+    return _deduplicador_worker.pontuar_pares(_registros_worker, idx1, idx2)
 
 if __name__ == "__main__":
     # Exemplo de uso
@@ -322,4 +1236,15 @@ if __name__ == "__main__":
     relatorio = deduplicador.gerar_relatorio_duplicatas(duplicatas)
     
     print("Duplicatas encontradas:")
-    print(relatorio)
\ No newline at end of file
+    print(relatorio)
+    
+    # Clusters transitivos (um registro de ouro por cliente)
+    clusters = deduplicador.agrupar_duplicatas(duplicatas, ids=list(range(len(dados_exemplo))))
+    print("\nClusters:")
+    print(clusters)
+    
+    # Recall da blocagem contra o modo exaustivo
+    avaliacao = deduplicador.avaliar_recall_blocagem(dados_exemplo)
+    print("\nAvaliação da blocagem:")
+    for chave, valor in avaliacao.items():
+        print(f"  {chave}: {valor}")
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Índice persistente de clientes para deduplicação incremental
+"""
+
+from typing import List, Dict, Optional
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.services.deduplicacao import chave_fonetica
+
+class IndiceClientes:
+    """Índice em disco dos clientes já deduplicados
+    
+    Guarda, para cada cliente, as formas normalizadas geradas por
+    DeduplicadorClientes.preparar_registros, as chaves de bloco e o cluster_id.
+    Novos uploads são comparados apenas com os blocos existentes
+    (DeduplicadorClientes.deduplicar_incremental), então o custo cresce com o
+    delta e não com a base inteira.
+    """
+    
+    ARQUIVO_REGISTROS = "registros.pkl"
+    ARQUIVO_META = "meta.json"
+    
+    def __init__(self, diretorio: Path = Path("data/processed/indice_clientes")):
+        self.diretorio = Path(diretorio)
+        self.registros = pd.DataFrame()
+        self.blocos: Dict[str, List[int]] = defaultdict(list)
+        self.proximo_cluster = 0
+        self.data_atualizacao: Optional[str] = None
+        self.carregar()
+    
+    def __len__(self) -> int:
+        return len(self.registros)
+    
+    def carregar(self):
+        """Carrega o índice do disco, se existir"""
+        arquivo_registros = self.diretorio / self.ARQUIVO_REGISTROS
+        arquivo_meta = self.diretorio / self.ARQUIVO_META
+        
+        if not arquivo_registros.exists() or not arquivo_meta.exists():
+            return
+        
+        self.registros = pd.read_pickle(arquivo_registros)
+        if 'nome_fonetico' not in self.registros.columns and len(self.registros):
+            # Índices gravados antes das chaves fonéticas
+            self.registros.insert(
+                self.registros.columns.get_loc('nome_norm') + 1,
+                'nome_fonetico',
+                self.registros['nome_norm'].map(chave_fonetica)
+            )
+        with open(arquivo_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        self.proximo_cluster = meta.get('proximo_cluster', 0)
+        self.data_atualizacao = meta.get('data_atualizacao')
+        self._reconstruir_blocos()
+    
+    def salvar(self):
+        """Grava o índice no disco (escrita atômica via arquivo temporário)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.data_atualizacao = datetime.now().isoformat()
+        
+        temp_registros = self.diretorio / f"{self.ARQUIVO_REGISTROS}.tmp"
+        self.registros.to_pickle(temp_registros)
+        temp_registros.replace(self.diretorio / self.ARQUIVO_REGISTROS)
+        
+        temp_meta = self.diretorio / f"{self.ARQUIVO_META}.tmp"
+        with open(temp_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'total_clientes': len(self.registros),
+                'total_clusters': int(self.registros['cluster_id'].nunique()) if len(self.registros) else 0,
+                'total_blocos': len(self.blocos),
+                'proximo_cluster': self.proximo_cluster,
+                'data_atualizacao': self.data_atualizacao
+            }, f, ensure_ascii=False, indent=2)
+        temp_meta.replace(self.diretorio / self.ARQUIVO_META)
+    
+    def _reconstruir_blocos(self):
+        """Reconstrói o índice invertido chave de bloco -> posições"""
+        self.blocos = defaultdict(list)
+        for pos, chaves in enumerate(self.registros['chaves_bloco']):
+            for chave in chaves.split():
+                self.blocos[chave].append(pos)
+    
+    def contem_ids(self, ids: pd.Series) -> np.ndarray:
+        """Máscara dos IDs que já estão no índice"""
+        if self.registros.empty:
+            return np.zeros(len(ids), dtype=bool)
+        return ids.isin(self.registros['id']).to_numpy()
+    
+    def remover_ausentes(self, origens: pd.Series, ids: pd.Series) -> int:
+        """Remove os registros das origens reenviadas cujo ID não veio no novo envio
+        
+        Linhas editadas ou apagadas de um arquivo reenviado deixam o índice; as
+        linhas inalteradas mantêm o ID (e o cluster). Devolve quantos saíram.
+        """
+        if self.registros.empty or 'origem' not in self.registros.columns:
+            return 0
+        
+        remover = self.registros['origem'].isin(set(origens)) & ~self.registros['id'].isin(ids)
+        if not remover.any():
+            return 0
+        
+        self.registros = self.registros[~remover.to_numpy()].reset_index(drop=True)
+        self._reconstruir_blocos()
+        return int(remover.sum())
+    
+    def concatenar(self, novos: pd.DataFrame) -> pd.DataFrame:
+        """Frame com os registros do índice seguidos dos novos (mesmas colunas dos novos)"""
+        if self.registros.empty:
+            return novos.reset_index(drop=True)
+        return pd.concat([self.registros[novos.columns], novos], ignore_index=True)
+    
+    def novo_cluster(self) -> int:
+        """Reserva um novo cluster_id"""
+        cluster_id = self.proximo_cluster
+        self.proximo_cluster += 1
+        return cluster_id
+    
+    def fundir_clusters(self, fusoes: Dict[int, int]):
+        """Renomeia clusters que passaram a ser o mesmo cliente (antigo -> destino)"""
+        if not fusoes or self.registros.empty:
+            return
+        self.registros['cluster_id'] = self.registros['cluster_id'].replace(fusoes)
+    
+    def adicionar(self, novos: pd.DataFrame, chaves: List[List[str]], clusters: List[int],
+                  origens: Optional[List] = None):
+        """Adiciona registros já normalizados ao índice (em memória; use salvar() para gravar)
+        
+        origens: arquivo de cada registro, usado por remover_ausentes nos reenvios.
+        """
+        inicio = len(self.registros)
+        novos = novos.assign(
+            chaves_bloco=[' '.join(lista) for lista in chaves],
+            cluster_id=clusters,
+            origem=origens
+        )
+        
+        if self.registros.empty:
+            self.registros = novos.reset_index(drop=True)
+        else:
+            self.registros = pd.concat([self.registros, novos], ignore_index=True)
+        
+        for pos, lista in enumerate(chaves, start=inicio):
+            for chave in lista:
+                self.blocos[chave].append(pos)
+    
+    def clusters(self) -> pd.DataFrame:
+        """Tabela ID -> cluster_id de todos os clientes indexados"""
+        if self.registros.empty:
+            return pd.DataFrame(columns=['id', 'nome', 'cluster_id'])
+        return self.registros[['id', 'nome', 'cluster_id']].copy()
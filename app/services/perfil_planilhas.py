@@ -0,0 +1,161 @@
+"""
+Perfil das colunas das planilhas de data/raw (usado pelo /api/analyze)
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import re
+
+import pandas as pd
+from unidecode import unidecode
+
+from app.core.config import COLUMN_MAPPING
+from app.services.processamento_planilhas import UPLOAD_DIR, EXTENSOES_PLANILHA, ler_planilha
+
+PERFIS_DIR = Path("data/processed/perfis")
+TOTAL_VALORES_TOPO = 5
+# Papéis verificados primeiro; os demais seguem a ordem de COLUMN_MAPPING
+PAPEIS_PRIORITARIOS = ('nome', 'cpf', 'telefone', 'numero_os')
+RE_SEPARADORES = re.compile(r'[^a-z0-9]+')
+
+def normalizar_coluna(coluna) -> str:
+    """'Nome do Cliente' -> 'nome_do_cliente'"""
+    return RE_SEPARADORES.sub('_', unidecode(str(coluna)).lower()).strip('_')
+
+def _aliases_por_papel() -> Dict[str, List[str]]:
+    papeis = list(PAPEIS_PRIORITARIOS) + [p for p in COLUMN_MAPPING if p not in PAPEIS_PRIORITARIOS]
+    return {papel: [normalizar_coluna(a) for a in COLUMN_MAPPING[papel]] for papel in papeis}
+
+ALIASES_POR_PAPEL = _aliases_por_papel()
+
+def detectar_papel(coluna) -> Optional[str]:
+    """Papel da coluna pelos aliases de COLUMN_MAPPING
+    
+    Nome exato tem precedência; depois vale um alias como palavra do nome da
+    coluna ('OS LANCASTER' -> numero_os, 'Nome Cliente' -> nome).
+    """
+    normalizada = normalizar_coluna(coluna)
+    if not normalizada:
+        return None
+    
+    for papel, aliases in ALIASES_POR_PAPEL.items():
+        if normalizada in aliases:
+            return papel
+    
+    palavras = set(normalizada.split('_'))
+    for papel, aliases in ALIASES_POR_PAPEL.items():
+        if palavras.intersection(aliases):
+            return papel
+    
+    return None
+
+def inferir_tipo(serie: pd.Series) -> str:
+    """Tipo dominante da coluna: vazio, booleano, inteiro, decimal, data ou texto"""
+    valores = serie.dropna()
+    if valores.empty:
+        return 'vazio'
+    if pd.api.types.is_bool_dtype(valores):
+        return 'booleano'
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return 'data'
+    if pd.api.types.is_numeric_dtype(valores):
+        return 'inteiro' if (valores % 1 == 0).all() else 'decimal'
+    
+    # Colunas object: números gravados como texto ou datas vindas do openpyxl
+    numericos = pd.to_numeric(valores, errors='coerce')
+    if numericos.notna().mean() >= 0.95:
+        return 'inteiro' if (numericos.dropna() % 1 == 0).all() else 'decimal'
+    if valores.map(lambda v: isinstance(v, (datetime, pd.Timestamp))).mean() >= 0.95:
+        return 'data'
+    return 'texto'
+
+def perfilar_coluna(coluna, serie: pd.Series) -> Dict:
+    """Tipo, nulos, cardinalidade, valores mais frequentes e papel de uma coluna"""
+    # Strings vazias também contam como nulo
+    if serie.dtype == object:
+        serie = serie.mask(serie.astype(str).str.strip() == '')
+    
+    total = len(serie)
+    nulos = int(serie.isna().sum())
+    valores = serie.dropna()
+    # Floats inteiros (telefones, OS com nulos) sem o '.0' nos valores exibidos
+    if pd.api.types.is_float_dtype(valores) and (valores % 1 == 0).all():
+        valores = valores.astype('int64')
+    topo = valores.astype(str).value_counts().head(TOTAL_VALORES_TOPO)
+    
+    return {
+        'coluna': str(coluna),
+        'tipo': inferir_tipo(serie),
+        'papel': detectar_papel(coluna),
+        'nulos': nulos,
+        'taxa_nulos': round(nulos / total, 4) if total else 0.0,
+        'cardinalidade': int(serie.nunique()),
+        'valores_mais_frequentes': [
+            {'valor': valor, 'ocorrencias': int(ocorrencias)} for valor, ocorrencias in topo.items()
+        ]
+    }
+
+def versao_arquivo(caminho: Path) -> Dict[str, int]:
+    """Identifica a versão do arquivo por tamanho e data de modificação"""
+    stat = caminho.stat()
+    return {'tamanho': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def caminho_perfil(caminho: Path) -> Path:
+    return PERFIS_DIR / f"{caminho.name}.json"
+
+def carregar_perfil(caminho: Path) -> Optional[Dict]:
+    """Perfil em cache, se o sidecar existir e for da versão atual do arquivo"""
+    sidecar = caminho_perfil(caminho)
+    if not sidecar.exists():
+        return None
+    
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            perfil = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if perfil.get('versao') != versao_arquivo(caminho):
+        return None
+    return perfil
+
+def gerar_perfil(caminho: str) -> Dict:
+    """Lê a planilha, perfila todas as colunas e grava o sidecar JSON
+    
+    Roda no pool de processos do upload; a escrita do sidecar é atômica.
+    """
+    caminho = Path(caminho)
+    versao = versao_arquivo(caminho)
+    df = ler_planilha(caminho, caminho.name)
+    
+    perfil = {
+        'arquivo': caminho.name,
+        'versao': versao,
+        'linhas': len(df),
+        'total_colunas': len(df.columns),
+        'colunas': [perfilar_coluna(col, df[col]) for col in df.columns],
+        'gerado_em': datetime.now().isoformat()
+    }
+    # Primeira coluna encontrada para cada papel
+    perfil['papeis'] = {}
+    for coluna in perfil['colunas']:
+        if coluna['papel']:
+            perfil['papeis'].setdefault(coluna['papel'], coluna['coluna'])
+    
+    sidecar = caminho_perfil(caminho)
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    temp = sidecar.with_name(f"{sidecar.name}.tmp")
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(perfil, f, ensure_ascii=False, indent=2, default=str)
+    temp.replace(sidecar)
+    
+    return perfil
+
+def localizar_arquivo(file_id: str, diretorio: Path = UPLOAD_DIR) -> Optional[Path]:
+    """Arquivo de data/raw pelo nome (sem permitir sair do diretório)"""
+    caminho = diretorio / Path(file_id).name
+    if caminho.suffix.lower() not in EXTENSOES_PLANILHA or not caminho.is_file():
+        return None
+    return caminho
@@ -0,0 +1,202 @@
+"""
+Análise das planilhas enviadas no /upload (executada em pool de processos)
+"""
+
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from app.core.config import MAX_FILE_SIZE_MB, UPLOAD_CACHE_SIZE, UPLOAD_WORKERS
+from app.services.deduplicacao import CacheLRU
+
+EXTENSOES_PLANILHA = ('.xlsx', '.xls', '.xlsm')
+TERMOS_NOME = ('nome', 'cliente', 'paciente')
+UPLOAD_DIR = Path("data/raw")
+TAMANHO_BLOCO_UPLOAD = 1024 * 1024  # 1 MB por leitura
+
+class ArquivoGrandeDemais(Exception):
+    """Upload excedeu MAX_FILE_SIZE_MB"""
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Resultado de analisar_planilha por SHA-256 do conteúdo: reenvios da mesma
+# planilha não são lidos de novo
+cache_resultados = CacheLRU(tamanho_maximo=UPLOAD_CACHE_SIZE)
+
+def obter_pool() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado, criado no primeiro upload"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=UPLOAD_WORKERS)
+    return _pool
+
+def encerrar_pool():
+    """Encerra o pool de processos (shutdown da aplicação)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def gravar_upload(arquivo, diretorio: Path = UPLOAD_DIR,
+                        limite_mb: float = MAX_FILE_SIZE_MB) -> Tuple[Path, str]:
+    """Grava o upload em um arquivo temporário no disco, em blocos
+    
+    Devolve o caminho temporário e o SHA-256 do conteúdo, calculado durante a
+    própria cópia. A memória usada fica limitada a TAMANHO_BLOCO_UPLOAD,
+    independente do tamanho da planilha. O arquivo temporário fica no próprio diretório de
+    destino (com sufixo .parte, ignorado por quem lê data/raw) para que a
+    promoção final seja um os.replace.
+    """
+    limite_bytes = int(limite_mb * 1024 * 1024)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    descritor, caminho = tempfile.mkstemp(prefix='.upload_', suffix='.parte', dir=diretorio)
+    caminho = Path(caminho)
+    sha256 = hashlib.sha256()
+    total = 0
+    
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            while True:
+                bloco = await arquivo.read(TAMANHO_BLOCO_UPLOAD)
+                if not bloco:
+                    break
+                total += len(bloco)
+                if total > limite_bytes:
+                    raise ArquivoGrandeDemais(
+                        f"{arquivo.filename} excede o limite de {limite_mb} MB"
+                    )
+                sha256.update(bloco)
+                destino.write(bloco)
+    except BaseException:
+        caminho.unlink(missing_ok=True)
+        raise
+    
+    return caminho, sha256.hexdigest()
+
+def promover_upload(temporario: Path, nome_arquivo: str, diretorio: Path = UPLOAD_DIR) -> Path:
+    """Move o arquivo temporário já processado para o nome definitivo"""
+    destino = diretorio / Path(nome_arquivo).name
+    os.replace(temporario, destino)
+    return destino
+
+def ler_planilha(origem, nome_arquivo: str) -> pd.DataFrame:
+    """Lê a planilha; XLSM usa engine='openpyxl', que suporta macros"""
+    if nome_arquivo.lower().endswith('.xlsm'):
+        return pd.read_excel(origem, engine='openpyxl')
+    return pd.read_excel(origem)
+
+def contar_os(df: pd.DataFrame, detalhes: Dict) -> int:
+    """Conta OS nas colunas OS LANCASTER/OS OTM (ou em outras colunas com 'OS')"""
+    os_count = 0
+    
+    # Verificar coluna OS LANCASTER
+    if 'OS LANCASTER' in df.columns:
+        os_lancaster = pd.to_numeric(df['OS LANCASTER'], errors='coerce').dropna()
+        detalhes["os_lancaster"] = len(os_lancaster)
+        os_count += len(os_lancaster)
+    
+    # Verificar coluna OS OTM
+    if 'OS OTM' in df.columns:
+        os_otm = pd.to_numeric(df['OS OTM'], errors='coerce').dropna()
+        detalhes["os_otm"] = len(os_otm)
+        os_count += len(os_otm)
+    
+    # Se não encontrou colunas específicas, tentar outras variações
+    if os_count == 0:
+        colunas_os = [col for col in df.columns if 'OS' in str(col).upper()]
+        for col in colunas_os:
+            valores_os = pd.to_numeric(df[col], errors='coerce').dropna()
+            os_count += len(valores_os)
+    
+    return os_count
+
+def analisar_planilha(caminho: str, nome_arquivo: str) -> Optional[Dict]:
+    """Lê e resume uma planilha (OS, clientes e duplicatas potenciais)
+    
+    Roda dentro do pool de processos, por isso recebe o caminho no disco (e
+    não o conteúdo) e devolve apenas tipos serializáveis. Retorna None quando
+    o arquivo não pode ser lido.
+    """
+    inicio = time.perf_counter()
+    
+    try:
+        df = ler_planilha(caminho, nome_arquivo)
+    except Exception:
+        return None
+    
+    tempo_leitura = time.perf_counter() - inicio
+    
+    detalhes = {
+        "nome": nome_arquivo,
+        "linhas_total": len(df),
+        "os_lancaster": 0,
+        "os_otm": 0
+    }
+    os_count = contar_os(df, detalhes)
+    detalhes["total_os"] = os_count
+    
+    # Tentar identificar clientes (buscar colunas de nomes)
+    clientes = 0
+    duplicatas = 0
+    colunas_nome = [col for col in df.columns if any(termo in str(col).lower() for termo in TERMOS_NOME)]
+    if colunas_nome:
+        nome_col = colunas_nome[0]
+        clientes = int(df[nome_col].nunique())
+        
+        # Detectar duplicatas potenciais
+        total_nomes = len(df[nome_col].dropna())
+        duplicatas = max(0, total_nomes - clientes)
+    
+    detalhes["tempo_leitura_s"] = round(tempo_leitura, 3)
+    detalhes["tempo_total_s"] = round(time.perf_counter() - inicio, 3)
+    
+    return {
+        "detalhes": detalhes,
+        "ordens_servico": os_count,
+        "clientes": clientes,
+        "duplicatas": duplicatas,
+        "colunas_nome": [str(col) for col in colunas_nome]
+    }
+
+async def analisar_uploads(planilhas: List[Tuple[str, Path, str]]) -> List[Tuple[Optional[Dict], bool]]:
+    """Analisa os uploads (nome, caminho temporário, sha256) usando o cache por conteúdo
+    
+    Só as planilhas cujo hash não está em cache_resultados vão para o pool de
+    processos, todas em paralelo; conteúdos repetidos no mesmo envio são lidos
+    uma vez. Devolve, na ordem de entrada, a análise (ou None se ilegível) e se
+    ela veio do cache.
+    """
+    resultados: Dict[str, Optional[Dict]] = {}
+    pendentes: Dict[str, Tuple[str, str]] = {}
+    
+    for nome_arquivo, caminho, sha256 in planilhas:
+        if sha256 in resultados or sha256 in pendentes:
+            continue
+        em_cache = cache_resultados.consultar(sha256)
+        if em_cache is not None:
+            resultados[sha256] = em_cache
+        else:
+            pendentes[sha256] = (str(caminho), nome_arquivo)
+    
+    # Ler as planilhas novas em paralelo no pool de processos, sem bloquear o event loop
+    loop = asyncio.get_running_loop()
+    pool = obter_pool()
+    calculadas = await asyncio.gather(*[
+        loop.run_in_executor(pool, analisar_planilha, caminho, nome_arquivo)
+        for caminho, nome_arquivo in pendentes.values()
+    ])
+    
+    for sha256, analise in zip(pendentes, calculadas):
+        # Arquivos ilegíveis não entram no cache
+        if analise is not None:
+            cache_resultados.guardar(sha256, analise)
+        resultados[sha256] = analise
+    
+    return [(resultados[sha256], sha256 not in pendentes) for _, _, sha256 in planilhas]
@@ -0,0 +1,158 @@
+"""
+Snapshot pré-calculado do dashboard de consolidação (Parquet + JSON)
+
+O dashboard lê dashboard_consolidacao_por_loja.xlsx; abrir esse arquivo com
+openpyxl é a parte mais lenta de cada carregamento. Quem produz os dados grava
+também este snapshot: cada planilha em Parquet e as métricas que a página
+principal exibe (totais, taxa_reducao, top_duplicatas, qualidade_por_campo) já
+calculadas em JSON.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD_FILE = Path("data/processed/dashboard_consolidacao_por_loja.xlsx")
+SNAPSHOT_DIR = Path("data/processed/dashboard_snapshot")
+ARQUIVO_RESUMO = "resumo.json"
+PLANILHAS_SNAPSHOT = {
+    'Dashboard_Principal': 'dashboard_principal.parquet',
+    'Resumo_Por_Loja': 'resumo_por_loja.parquet',
+    'Estatisticas_Gerais': 'estatisticas_gerais.parquet',
+    'Qualidade_Dados': 'qualidade_dados.parquet'
+}
+CAMPOS_QUALIDADE = ['nome', 'cpf', 'celular', 'email', 'endereco']
+
+def versao_arquivo(caminho: Path) -> List[int]:
+    """Versão do arquivo por data de modificação e tamanho"""
+    stat = caminho.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+def calcular_totais(arquivos: List[Dict]) -> Dict:
+    """Soma registros, duplicatas e OS de uma lista de arquivos"""
+    return {
+        "arquivos": len(arquivos),
+        "originais": sum(a.get('registros_originais', 0) for a in arquivos),
+        "consolidados": sum(a.get('registros_consolidados', 0) for a in arquivos),
+        "duplicatas": sum(a.get('duplicatas_encontradas', 0) for a in arquivos),
+        "os": sum(a.get('total_os', 0) for a in arquivos)
+    }
+
+def calcular_qualidade(df_qualidade: Optional[pd.DataFrame]) -> Dict[str, Dict]:
+    """Qualidade de dados por campo (preenchidos/total)"""
+    qualidade_por_campo = {}
+    if df_qualidade is not None:
+        for campo in CAMPOS_QUALIDADE:
+            dados_campo = df_qualidade[df_qualidade['campo'] == campo]
+            if not dados_campo.empty:
+                total_preenchidos = dados_campo['preenchidos'].sum()
+                total_registros = dados_campo['total'].sum()
+                percentual = (total_preenchidos / total_registros * 100) if total_registros > 0 else 0
+                qualidade_por_campo[campo] = {
+                    'preenchidos': total_preenchidos,
+                    'total': total_registros,
+                    'percentual': round(percentual, 1)
+                }
+    return qualidade_por_campo
+
+def resumir_dashboard(planilhas: Dict[str, pd.DataFrame]) -> Dict:
+    """Métricas da página principal a partir das planilhas do dashboard"""
+    arquivos_data = planilhas['Dashboard_Principal'].to_dict('records')
+    totais = calcular_totais(arquivos_data)
+    
+    # Taxa de redução
+    taxa_reducao = 0
+    if totais["originais"] > 0:
+        taxa_reducao = ((totais["originais"] - totais["consolidados"]) / totais["originais"]) * 100
+    
+    return {
+        "lojas_data": planilhas['Resumo_Por_Loja'].reset_index().to_dict('records'),
+        # Top arquivos com mais duplicatas
+        "top_duplicatas": sorted(arquivos_data, key=lambda x: x.get('duplicatas_encontradas', 0), reverse=True)[:5],
+        "qualidade_por_campo": calcular_qualidade(planilhas.get('Qualidade_Dados')),
+        "metricas": {
+            "total_arquivos": totais["arquivos"],
+            "arquivos_sucesso": len([a for a in arquivos_data if a['status'] == 'sucesso']),
+            "arquivos_erro": len([a for a in arquivos_data if a['status'] == 'erro']),
+            "total_originais": totais["originais"],
+            "total_consolidados": totais["consolidados"],
+            "total_duplicatas": totais["duplicatas"],
+            "total_os": totais["os"],
+            "taxa_reducao": round(taxa_reducao, 1)
+        }
+    }
+
+def _valor_json(valor):
+    """Converte tipos numpy/pandas para o json.dump"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+def _preparar_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas object com tipos misturados (comum no Excel) viram texto para o Parquet"""
+    df = df.copy()
+    for coluna in df.columns[df.dtypes == object]:
+        valores = df[coluna].dropna()
+        if valores.map(type).nunique() > 1:
+            df[coluna] = df[coluna].map(lambda v: v if pd.isna(v) else str(v))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+def gerar_snapshot(arquivo: Path = DASHBOARD_FILE, destino: Path = SNAPSHOT_DIR) -> Path:
+    """Lê o Excel do dashboard uma vez e grava o snapshot (Parquet + resumo JSON)
+    
+    O resumo JSON é gravado por último e registra a versão do Excel de origem,
+    então um snapshot parcial ou de outra versão nunca é servido.
+    """
+    versao = versao_arquivo(arquivo)
+    planilhas = pd.read_excel(arquivo, sheet_name=None)
+    destino.mkdir(parents=True, exist_ok=True)
+    
+    for planilha, nome_parquet in PLANILHAS_SNAPSHOT.items():
+        if planilha not in planilhas:
+            (destino / nome_parquet).unlink(missing_ok=True)
+            continue
+        temp = destino / f"{nome_parquet}.tmp"
+        _preparar_parquet(planilhas[planilha]).to_parquet(temp, index=False)
+        temp.replace(destino / nome_parquet)
+    
+    resumo = resumir_dashboard(planilhas)
+    resumo['origem'] = {'arquivo': str(arquivo), 'versao': versao}
+    resumo['planilhas'] = [p for p in PLANILHAS_SNAPSHOT if p in planilhas]
+    resumo['gerado_em'] = datetime.now().isoformat()
+    
+    temp = destino / f"{ARQUIVO_RESUMO}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False, default=_valor_json)
+    temp.replace(destino / ARQUIVO_RESUMO)
+    
+    return destino / ARQUIVO_RESUMO
+
+def carregar_snapshot(arquivo: Path = DASHBOARD_FILE,
+                      destino: Path = SNAPSHOT_DIR) -> Optional[Tuple[Dict[str, pd.DataFrame], Dict]]:
+    """Planilhas e resumo do snapshot, ou None se ele não existir ou estiver defasado
+    
+    O snapshot vale enquanto o Excel de origem não mudar; sem o Excel, vale
+    sozinho.
+    """
+    caminho_resumo = destino / ARQUIVO_RESUMO
+    if not caminho_resumo.exists():
+        return None
+    
+    with open(caminho_resumo, 'r', encoding='utf-8') as f:
+        resumo = json.load(f)
+    
+    if arquivo.exists() and resumo.get('origem', {}).get('versao') != versao_arquivo(arquivo):
+        return None
+    
+    planilhas = {
+        planilha: pd.read_parquet(destino / PLANILHAS_SNAPSHOT[planilha])
+        for planilha in resumo['planilhas']
+    }
+    return planilhas, resumo
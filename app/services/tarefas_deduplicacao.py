@@ -0,0 +1,221 @@
+"""
+Tarefas de deduplicação em segundo plano (usadas pelo /api/deduplicate)
+"""
+
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from app.core.config import COLUMN_MAPPING, DEDUP_WORKERS
+from app.services.deduplicacao import DeduplicadorClientes
+from app.services.indice_clientes import IndiceClientes
+from app.services.processamento_planilhas import UPLOAD_DIR, EXTENSOES_PLANILHA
+
+RELATORIOS_DIR = Path("data/processed/deduplicacao")
+CAMPOS_CLIENTE = ['nome', 'cpf', 'telefone', 'endereco']
+
+@dataclass
+class TarefaDeduplicacao:
+    """Estado de uma execução de deduplicação"""
+    id: str
+    incremental: bool
+    status: str = 'na_fila'  # na_fila, executando, concluida, erro
+    fase: str = 'aguardando'  # aguardando, carregando, pontuando, finalizando, finalizada
+    pares_processados: int = 0
+    total_pares: int = 0
+    lotes_concluidos: int = 0
+    total_lotes: int = 0
+    criada_em: str = field(default_factory=lambda: datetime.now().isoformat())
+    inicio: Optional[float] = None
+    fim: Optional[float] = None
+    erro: Optional[str] = None
+    resultado: Optional[Dict] = None
+    
+    def progresso(self) -> Dict:
+        """Resumo serializável com percentual e ETA"""
+        decorrido = None
+        eta = None
+        percentual = 0.0
+        
+        if self.inicio is not None:
+            decorrido = (self.fim or time.time()) - self.inicio
+        if self.total_pares:
+            percentual = self.pares_processados / self.total_pares * 100
+        if self.status == 'executando' and self.pares_processados and decorrido:
+            eta = decorrido / self.pares_processados * (self.total_pares - self.pares_processados)
+        
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'fase': self.fase,
+            'incremental': self.incremental,
+            'pares_processados': self.pares_processados,
+            'total_pares': self.total_pares,
+            'lotes_concluidos': self.lotes_concluidos,
+            'total_lotes': self.total_lotes,
+            'percentual': round(percentual, 1),
+            'decorrido_s': round(decorrido, 1) if decorrido is not None else None,
+            'eta_s': round(eta, 1) if eta is not None else None,
+            'criada_em': self.criada_em,
+            'erro': self.erro,
+            'resultado': self.resultado
+        }
+
+def mapear_colunas_cliente(colunas) -> Dict[str, str]:
+    """Mapeia colunas da planilha para nome/cpf/telefone/endereco usando COLUMN_MAPPING"""
+    mapeamento = {}
+    normalizadas = {str(col).strip().lower(): col for col in colunas}
+    
+    for campo in CAMPOS_CLIENTE:
+        for alias in COLUMN_MAPPING.get(campo, []):
+            if alias in normalizadas:
+                mapeamento[normalizadas[alias]] = campo
+                break
+    
+    return mapeamento
+
+def ids_por_conteudo(df: pd.DataFrame, origem: str) -> list:
+    """IDs "arquivo:hash:n" derivados do conteúdo de cada linha
+    
+    Linhas inalteradas mantêm o ID mesmo com linhas inseridas ou apagadas antes
+    delas; uma linha editada ganha ID novo. n separa linhas idênticas no arquivo.
+    """
+    hashes = pd.Series(pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy(), index=df.index)
+    ocorrencias = hashes.groupby(hashes, sort=False).cumcount()
+    return [f"{origem}:{h:016x}:{n}" for h, n in zip(hashes, ocorrencias)]
+
+def carregar_clientes(diretorio: Path = UPLOAD_DIR) -> pd.DataFrame:
+    """Carrega os clientes de todas as planilhas de data/raw com colunas padronizadas"""
+    frames = []
+    
+    for arquivo in sorted(diretorio.glob('*')):
+        if arquivo.suffix.lower() not in EXTENSOES_PLANILHA:
+            continue
+        
+        try:
+            df = pd.read_excel(arquivo, engine='openpyxl' if arquivo.suffix.lower() == '.xlsm' else None)
+        except Exception:
+            continue
+        
+        mapeamento = mapear_colunas_cliente(df.columns)
+        if 'nome' not in mapeamento.values():
+            continue
+        
+        df = df[list(mapeamento)].rename(columns=mapeamento)
+        df.insert(0, 'id', ids_por_conteudo(df, arquivo.name))
+        df.insert(1, 'origem', arquivo.name)
+        frames.append(df)
+    
+    if not frames:
+        return pd.DataFrame(columns=['id', 'origem'] + CAMPOS_CLIENTE)
+    
+    return pd.concat(frames, ignore_index=True)
+
+class GerenciadorTarefas:
+    """Executa deduplicações fora do event loop e guarda o progresso de cada uma
+    
+    As tarefas rodam uma por vez em uma thread dedicada (o índice persistido não
+    aceita escritas concorrentes); a pontuação em si usa o pool de processos do
+    DeduplicadorClientes (workers).
+    """
+    
+    def __init__(self, workers: int = DEDUP_WORKERS, max_tarefas_guardadas: int = 50):
+        self.workers = workers
+        self.max_tarefas_guardadas = max_tarefas_guardadas
+        self.tarefas: Dict[str, TarefaDeduplicacao] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='deduplicacao')
+        self._lock = threading.Lock()
+    
+    def iniciar(self, incremental: bool = True) -> Tuple[TarefaDeduplicacao, bool]:
+        """Enfileira uma deduplicação e devolve (tarefa, criada) imediatamente
+        
+        Se já houver uma tarefa do mesmo modo na fila ou executando, ela é
+        devolvida (criada=False) em vez de enfileirar outra execução igual.
+        """
+        with self._lock:
+            ativa = self.ativa(incremental)
+            if ativa is not None:
+                return ativa, False
+            
+            tarefa = TarefaDeduplicacao(id=uuid.uuid4().hex, incremental=incremental)
+            self.tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+        
+        self._executor.submit(self._executar, tarefa)
+        return tarefa, True
+    
+    def obter(self, job_id: str) -> Optional[TarefaDeduplicacao]:
+        return self.tarefas.get(job_id)
+    
+    def ativa(self, incremental: Optional[bool] = None) -> Optional[TarefaDeduplicacao]:
+        """Tarefa na fila ou executando (do modo pedido, se informado)"""
+        for tarefa in list(self.tarefas.values()):
+            if tarefa.status in ('na_fila', 'executando') and incremental in (None, tarefa.incremental):
+                return tarefa
+        return None
+    
+    def ultima(self) -> Optional[TarefaDeduplicacao]:
+        """Tarefa mais recente, ativa ou não"""
+        tarefas = list(self.tarefas.values())
+        return tarefas[-1] if tarefas else None
+    
+    def _descartar_antigas(self):
+        """Mantém só as últimas tarefas finalizadas em memória"""
+        finalizadas = [t for t in self.tarefas.values() if t.status in ('concluida', 'erro')]
+        for tarefa in finalizadas[:max(0, len(self.tarefas) - self.max_tarefas_guardadas)]:
+            del self.tarefas[tarefa.id]
+    
+    def _executar(self, tarefa: TarefaDeduplicacao):
+        tarefa.status = 'executando'
+        tarefa.inicio = time.time()
+        
+        def atualizar(progresso: Dict[str, int]):
+            tarefa.fase = 'pontuando'
+            tarefa.pares_processados = progresso['pares_processados']
+            tarefa.total_pares = progresso['total_pares']
+            tarefa.lotes_concluidos = progresso['lotes_concluidos']
+            tarefa.total_lotes = progresso['total_lotes']
+        
+        try:
+            tarefa.fase = 'carregando'
+            df = carregar_clientes()
+            
+            deduplicador = DeduplicadorClientes(workers=self.workers, callback_progresso=atualizar)
+            RELATORIOS_DIR.mkdir(parents=True, exist_ok=True)
+            arquivo_relatorio = RELATORIOS_DIR / f"duplicatas_{tarefa.id}.csv"
+            
+            if tarefa.incremental:
+                duplicatas = deduplicador.deduplicar_incremental(df, IndiceClientes())
+                tarefa.fase = 'finalizando'
+                relatorio = deduplicador.gerar_relatorio_duplicatas(duplicatas)
+                relatorio.to_csv(arquivo_relatorio, index=False, encoding='utf-8')
+                total_duplicatas = len(relatorio)
+                top = relatorio.head(50)
+            else:
+                top = deduplicador.exportar_duplicatas(df, arquivo_relatorio, top_k=50)
+                tarefa.fase = 'finalizando'
+                total_duplicatas = deduplicador.estatisticas_exportacao['total_duplicatas']
+            
+            tarefa.resultado = {
+                'total_registros': len(df),
+                'total_duplicatas': total_duplicatas,
+                'arquivo_relatorio': str(arquivo_relatorio),
+                'estatisticas_blocagem': deduplicador.estatisticas_blocagem,
+                'top_duplicatas': top.to_dict('records')
+            }
+            tarefa.status = 'concluida'
+        except Exception as e:
+            tarefa.erro = str(e)
+            tarefa.status = 'erro'
+        finally:
+            tarefa.fim = time.time()
+            tarefa.fase = 'finalizada'
+
+gerenciador_tarefas = GerenciadorTarefas()
@@ -5,7 +5,6 @@ Sistema Carne Fácil - Análise de layouts e células específicas
 """
 
 import pandas as pd
-import openpyxl
 from pathlib import Path
 import json
 from datetime import datetime
@@ -13,19 +12,30 @@ import os
 import warnings
 warnings.filterwarnings('ignore')
 
-def extrair_valor_celula(worksheet, celula):
+from leitor_caixa import (
+    ESTRUTURAS_CAIXA, abrir_caixa, ler_aba, ler_abas, localizar_estruturas, LINHAS_LEITURA, COLUNAS_BUSCA
+)
+
+def formatar_celula(valor):
+    """
+    Valor de uma célula como texto
+    """
+    return str(valor).strip() if valor else ""
+
+def extrair_valor_celula(folha, celula):
     """
     Extrai valor de uma célula específica
     """
     try:
-        valor = worksheet[celula].value
-        return str(valor).strip() if valor else ""
+        return formatar_celula(folha.celula(celula))
     except Exception:
         return ""
 
-def analisar_estrutura_dinamica(caminho_arquivo, nome_aba):
+def analisar_estrutura_dinamica(caminho_arquivo, nome_aba, folha=None):
     """
     Análise específica da estrutura dinâmica de uma aba de caixa
+    
+    folha: aba já lida por leitor_caixa.ler_abas (evita reabrir o arquivo a cada aba)
     """
     resultado = {
         'arquivo': os.path.basename(caminho_arquivo),
@@ -39,42 +49,20 @@ def analisar_estrutura_dinamica(caminho_arquivo, nome_aba):
     }
     
     try:
-        # Carregar workbook
-        workbook = openpyxl.load_workbook(caminho_arquivo, data_only=True)
-        worksheet = workbook[nome_aba]
+        # Carregar a aba (read-only, uma única passada de iter_rows)
+        if folha is None:
+            workbook = abrir_caixa(caminho_arquivo)
+            try:
+                folha = ler_aba(workbook, nome_aba, LINHAS_LEITURA, COLUNAS_BUSCA)
+            finally:
+                workbook.close()
         
         # Extrair data (B1) e loja (L1)
-        resultado['data_movimento'] = extrair_valor_celula(worksheet, 'B1')
-        resultado['loja'] = extrair_valor_celula(worksheet, 'L1')
+        resultado['data_movimento'] = extrair_valor_celula(folha, 'B1')
+        resultado['loja'] = extrair_valor_celula(folha, 'L1')
         
-        # Estruturas fixas identificadas pelo usuário
-        estruturas_caixa = {
-            'VENDAS': {
-                'celula_inicio': 'E5',
-                'titulo_esperado': 'Nº Venda',
-                'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-            },
-            'RESTANTE_ENTRADA': {
-                'celula_inicio': 'E25', 
-                'titulo_esperado': 'Nº Venda',
-                'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-            },
-            'RECEBIMENTO_CARNE': {
-                'celula_inicio': 'E34',
-                'titulo_esperado': 'OS',
-                'colunas': ['OS', 'Cliente', 'Forma de Pgto', 'Valor Parcela', 'Nº Parcela']
-            },
-            'OS_ENTREGUES_DIA': {
-                'celula_inicio': 'K14',
-                'titulo_esperado': 'OS',
-                'colunas': ['OS', 'Vendedor', 'CARNÊ']
-            },
-            'ENTREGA_CARNE': {
-                'celula_inicio': 'K34',
-                'titulo_esperado': 'OS',
-                'colunas': ['OS', 'Parcelas', 'Valor Total']
-            }
-        }
+        # Estruturas localizadas pelos rótulos do cabeçalho (células fixas como referência)
+        estruturas_caixa = localizar_estruturas(folha)
         
         # Analisar cada estrutura
         for nome_estrutura, config in estruturas_caixa.items():
@@ -82,28 +70,29 @@ def analisar_estrutura_dinamica(caminho_arquivo, nome_aba):
                 celula_inicio = config['celula_inicio']
                 
                 # Verificar se existe conteúdo na célula de início
-                valor_celula = extrair_valor_celula(worksheet, celula_inicio)
+                valor_celula = formatar_celula(folha.cabecalho(config))
                 
                 if valor_celula and config['titulo_esperado'].lower() in valor_celula.lower():
                     # Estrutura encontrada
                     resultado['estruturas_identificadas'][nome_estrutura] = {
                         'encontrada': True,
                         'celula_inicio': celula_inicio,
+                        'celula_fixa': ESTRUTURAS_CAIXA[nome_estrutura]['celula_inicio'],
+                        'deslocada': celula_inicio != ESTRUTURAS_CAIXA[nome_estrutura]['celula_inicio'],
                         'valor_celula': valor_celula
                     }
                     
-                    # Extrair cabeçalhos das colunas
-                    linha_inicio = int(celula_inicio[1:])
+                    # Extrair cabeçalhos das colunas (linha do título, fatiada da matriz)
+                    linha_inicio = config['linha_inicio']
                     coluna_inicio_letra = celula_inicio[0]
-                    coluna_inicio_num = ord(coluna_inicio_letra.upper()) - ord('A') + 1
+                    cabecalhos = folha.linha(linha_inicio, config['coluna_inicio'], len(config['colunas']))
                     
                     colunas_encontradas = []
-                    for i, col_esperada in enumerate(config['colunas']):
+                    for i, (col_esperada, valor_bruto) in enumerate(zip(config['colunas'], cabecalhos)):
                         col_letra = chr(ord(coluna_inicio_letra.upper()) + i)
-                        celula_col = f"{col_letra}{linha_inicio}"
-                        valor_col = extrair_valor_celula(worksheet, celula_col)
+                        valor_col = formatar_celula(valor_bruto)
                         colunas_encontradas.append({
-                            'celula': celula_col,
+                            'celula': f"{col_letra}{linha_inicio}",
                             'esperado': col_esperada,
                             'encontrado': valor_col,
                             'match': col_esperada.lower() in valor_col.lower() if valor_col else False
@@ -111,22 +100,12 @@ def analisar_estrutura_dinamica(caminho_arquivo, nome_aba):
                     
                     resultado['colunas_por_estrutura'][nome_estrutura] = colunas_encontradas
                     
-                    # Contar linhas com dados (procurar até 20 linhas abaixo)
+                    # Contar linhas com dados (até a próxima estrutura abaixo)
                     linhas_dados = []
-                    for linha_offset in range(1, 21):  # Verificar até 20 linhas
-                        linha_atual = linha_inicio + linha_offset
-                        primeira_coluna = f"{coluna_inicio_letra}{linha_atual}"
-                        valor_linha = extrair_valor_celula(worksheet, primeira_coluna)
+                    for linha_atual, valores in folha.linhas_estrutura(config):
+                        dados_linha = [formatar_celula(v) for v in valores]
                         
-                        if valor_linha and valor_linha.strip():
-                            # Extrair dados de todas as colunas desta linha
-                            dados_linha = []
-                            for i in range(len(config['colunas'])):
-                                col_letra = chr(ord(coluna_inicio_letra.upper()) + i)
-                                celula_dados = f"{col_letra}{linha_atual}"
-                                valor_dados = extrair_valor_celula(worksheet, celula_dados)
-                                dados_linha.append(valor_dados)
-                            
+                        if dados_linha[0]:
                             linhas_dados.append({
                                 'linha': linha_atual,
                                 'dados': dados_linha
@@ -150,8 +129,6 @@ def analisar_estrutura_dinamica(caminho_arquivo, nome_aba):
                     'erro': str(e)
                 }
         
-        workbook.close()
-        
     except Exception as e:
         resultado['erro'] = str(e)
     
@@ -198,10 +175,17 @@ def analisar_padroes_caixa_profundo():
             'abas_analisadas': {}
         }
         
+        # Abrir o arquivo uma vez só para todas as abas de teste
+        try:
+            folhas = ler_abas(caminho_arquivo, abas_teste, LINHAS_LEITURA, COLUNAS_BUSCA)
+        except Exception as e:
+            print(f"   ❌ Erro ao abrir {os.path.basename(caminho_arquivo)}: {str(e)}")
+            folhas = {}
+        
         for nome_aba in abas_teste:
             try:
                 print(f"   📄 Análise profunda da aba: {nome_aba}")
-                resultado_aba = analisar_estrutura_dinamica(caminho_arquivo, nome_aba)
+                resultado_aba = analisar_estrutura_dinamica(caminho_arquivo, nome_aba, folhas.get(nome_aba))
                 resultado_geral['analise_profunda'][nome_loja]['abas_analisadas'][nome_aba] = resultado_aba
                 
                 # Coletar estatísticas
@@ -270,7 +254,9 @@ def main():
             
             for estrutura in estruturas_encontradas:
                 linhas_dados = len(dados_aba.get('linhas_dados_por_estrutura', {}).get(estrutura, []))
-                print(f"            • {estrutura}: {linhas_dados} registros")
+                dados_estrutura = dados_aba['estruturas_identificadas'][estrutura]
+                posicao = f" (em {dados_estrutura['celula_inicio']}, fixa {dados_estrutura['celula_fixa']})" if dados_estrutura.get('deslocada') else ""
+                print(f"            • {estrutura}: {linhas_dados} registros{posicao}")
     
     print("\n✅ Análise profunda concluída!")
     return resultado
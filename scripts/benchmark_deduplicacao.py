@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark da Deduplicação Paralela
+==================================
+
+Gera uma base sintética de clientes (com variações de grafia, CPF e telefone
+repetidos) e mede o tempo de DeduplicadorClientes.encontrar_duplicatas com
+diferentes números de workers, conferindo que o resultado é idêntico ao serial.
+
+Cada execução acrescenta suas medições (CPUs da máquina, workers, tempo,
+pares/s) em benchmark_deduplicacao_resultados.csv, ao lado deste script, para
+que os números fiquem versionados junto com o código.
+
+Uso: python scripts/benchmark_deduplicacao.py [total_clientes] [workers...]
+Ex.: python scripts/benchmark_deduplicacao.py 50000 1 4 8 16
+
+O ganho da paralelização NÃO foi verificado: a única medição registrada é de
+uma máquina de 1 CPU, onde os workers disputam o mesmo núcleo. Por isso o
+arquivo não traz coluna de speedup; o escalonamento em 4/8/16 núcleos ainda
+precisa ser medido em máquina com esses núcleos, rodando o exemplo acima.
+"""
+
+import sys
+import os
+import csv
+import time
+import random
+import platform
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.deduplicacao import DeduplicadorClientes
+
+ARQUIVO_RESULTADOS = Path(__file__).resolve().parent / "benchmark_deduplicacao_resultados.csv"
+COLUNAS_RESULTADOS = [
+    'data', 'maquina', 'cpus', 'total_clientes', 'pares_candidatos', 'workers',
+    'tempo_s', 'pares_por_s', 'identico'
+]
+
+PRIMEIROS_NOMES = [
+    'MARIA', 'JOSE', 'ANA', 'JOAO', 'ANTONIO', 'FRANCISCO', 'CARLOS', 'PAULO', 'PEDRO', 'LUCAS',
+    'LUIZ', 'MARCOS', 'LUIS', 'GABRIEL', 'RAFAEL', 'FRANCISCA', 'DANIEL', 'MARCELO', 'BRUNO', 'EDUARDO',
+    'FELIPE', 'RAIMUNDO', 'RODRIGO', 'ANTONIA', 'ADRIANA', 'JULIANA', 'MARCIA', 'FERNANDA', 'PATRICIA', 'ALINE',
+    'THAIS', 'TAIS', 'SANDRA', 'CAMILA', 'AMANDA', 'BRUNA', 'JESSICA', 'LETICIA', 'JULIA', 'LUCIANA'
+]
+
+SOBRENOMES = [
+    'SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'RODRIGUES', 'FERREIRA', 'ALVES', 'PEREIRA', 'LIMA', 'GOMES',
+    'COSTA', 'RIBEIRO', 'MARTINS', 'CARVALHO', 'ALMEIDA', 'LOPES', 'SOARES', 'FERNANDES', 'VIEIRA', 'BARBOSA',
+    'ROCHA', 'DIAS', 'NASCIMENTO', 'ANDRADE', 'MOREIRA', 'NUNES', 'MARQUES', 'MACHADO', 'MENDES', 'FREITAS'
+]
+
+def gerar_base_sintetica(total: int, taxa_duplicatas: float = 0.1, semente: int = 42) -> pd.DataFrame:
+    """Gera clientes sintéticos com uma fração de duplicatas com variações de grafia"""
+    rng = random.Random(semente)
+    registros = []
+    
+    for i in range(total):
+        if registros and rng.random() < taxa_duplicatas:
+            # Duplicata de um cliente anterior com pequenas variações
+            original = rng.choice(registros)
+            nome = original['nome']
+            if rng.random() < 0.5:
+                nome = nome.replace('S', 'Z', 1)
+            if rng.random() < 0.3:
+                nome = nome.replace(' ', ' DA ', 1)
+            registros.append({
+                'id': i,
+                'nome': nome,
+                'cpf': original['cpf'] if rng.random() < 0.3 else None,
+                'telefone': original['telefone'] if rng.random() < 0.6 else None,
+                'endereco': original['endereco']
+            })
+            continue
+        
+        nome = ' '.join([rng.choice(PRIMEIROS_NOMES)] + rng.sample(SOBRENOMES, rng.randint(1, 3)))
+        registros.append({
+            'id': i,
+            'nome': nome,
+            'cpf': f"{rng.randint(0, 99999999999):011d}" if rng.random() < 0.4 else None,
+            'telefone': f"119{rng.randint(0, 99999999):08d}" if rng.random() < 0.8 else None,
+            'endereco': f"RUA {rng.choice(SOBRENOMES)} {rng.randint(1, 2000)}"
+        })
+    
+    return pd.DataFrame(registros)
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lista_workers = [int(w) for w in sys.argv[2:]] or [1, 4, 8, 16]
+    if 1 not in lista_workers:
+        lista_workers = [1] + lista_workers
+    
+    print(f"🖥️  CPUs disponíveis: {os.cpu_count()}")
+    print(f"👥 Gerando base sintética com {total:,} clientes...")
+    df = gerar_base_sintetica(total)
+    
+    deduplicador = DeduplicadorClientes()
+    resultados = {}
+    
+    for workers in lista_workers:
+        inicio = time.perf_counter()
+        duplicatas = deduplicador.encontrar_duplicatas(df, workers=workers)
+        tempo = time.perf_counter() - inicio
+        resultados[workers] = (tempo, duplicatas)
+    
+    tempo_serial, duplicatas_serial = resultados[1]
+    chave_serial = [(m.cliente_id_1, m.cliente_id_2, m.score_final) for m in duplicatas_serial]
+    pares = deduplicador.estatisticas_blocagem.get('pares_candidatos', 0)
+    
+    print(f"\n📊 Pares candidatos: {pares:,} | Duplicatas: {len(duplicatas_serial):,}")
+    print(f"{'Workers':>8} {'Tempo (s)':>10} {'Pares/s':>12} {'Speedup':>8} {'Idêntico':>9}")
+    
+    data = datetime.now().isoformat(timespec='seconds')
+    linhas = []
+    for workers, (tempo, duplicatas) in resultados.items():
+        identico = [(m.cliente_id_1, m.cliente_id_2, m.score_final) for m in duplicatas] == chave_serial
+        print(f"{workers:>8} {tempo:>10.2f} {pares / tempo:>12,.0f} {tempo_serial / tempo:>8.2f} {'✅' if identico else '❌':>9}")
+        linhas.append({
+            'data': data,
+            'maquina': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'total_clientes': total,
+            'pares_candidatos': pares,
+            'workers': workers,
+            'tempo_s': round(tempo, 3),
+            'pares_por_s': round(pares / tempo),
+            'identico': identico
+        })
+    
+    novo = not ARQUIVO_RESULTADOS.exists()
+    with open(ARQUIVO_RESULTADOS, 'a', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_RESULTADOS)
+        if novo:
+            escritor.writeheader()
+        escritor.writerows(linhas)
+    print(f"\n💾 Medições acrescentadas em {ARQUIVO_RESULTADOS}")
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,14 @@ Isso criará uma base sólida por loja para posterior normalização.
 
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import logging
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.snapshot_dashboard import DASHBOARD_FILE, gerar_snapshot
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -145,6 +149,19 @@ class ConsolidadorPorLoja:
             logger.info("")  # Linha em branco entre lojas
         
         self.gerar_relatorio()
+        self.gerar_snapshot_dashboard()
+    
+    def gerar_snapshot_dashboard(self):
+        """Grava o snapshot pré-calculado (Parquet + JSON) servido pelo dashboard"""
+        if not DASHBOARD_FILE.exists():
+            logger.info(f"ℹ️ {DASHBOARD_FILE} não encontrado - snapshot do dashboard não gerado")
+            return
+        
+        try:
+            destino = gerar_snapshot(DASHBOARD_FILE)
+            logger.info(f"📸 Snapshot do dashboard salvo em: {destino.parent}")
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar snapshot do dashboard: {e}")
     
     def gerar_relatorio(self):
         """Gera relatório da consolidação"""
@@ -2,9 +2,21 @@
 # -*- coding: utf-8 -*-
 
 import pandas as pd
-import re
 from datetime import datetime
 
+from vinculo_clientes import TabelaVinculos, preparar_chaves, vincular_relacao
+
+# Etapas do cruzamento VIXEN x OSS, da mais para a menos precisa
+ETAPAS_CRUZAMENTO = [
+    ('email', 'EMAIL', 'HIGH'),
+    ('telefone', 'PHONE', 'MEDIUM'),
+    ('nome', 'NAME', 'LOW'),
+]
+
+# Colunas de origem de cada chave
+CHAVES_VIXEN = {'email': 'E-mail', 'telefone': 'Fone', 'nome': 'Nome Completo'}
+CHAVES_OSS = {'email': 'EMAIL:', 'telefone': 'CELULAR:', 'nome': 'NOME:'}
+
 def criar_base_clientes_vixen_centric():
     """Cria base de clientes usando VIXEN como master (tem ID) e mapeando OSS"""
     
@@ -16,26 +28,7 @@ def criar_base_clientes_vixen_centric():
     print('   3️⃣ OSS unmatched = Next phase (new IDs)')
     print('=' * 60)
     
-    def normalizar_email(email):
-        if pd.isna(email) or email == '':
-            return None
-        return str(email).lower().strip()
-    
-    def normalizar_telefone(fone):
-        if pd.isna(fone) or fone == '':
-            return None
-        numeros = re.sub(r'[^0-9]', '', str(fone))
-        if len(numeros) >= 8:
-            return numeros[-9:] if len(numeros) >= 11 else numeros[-8:]
-        return None
-    
-    def normalizar_nome(nome):
-        if pd.isna(nome) or nome == '':
-            return None
-        nome_limpo = str(nome).upper().strip()
-        nome_limpo = re.sub(r'[^A-Z\s]', '', nome_limpo)
-        nome_limpo = re.sub(r'\s+', ' ', nome_limpo)
-        return nome_limpo
+    tabela_vinculos = TabelaVinculos()
     
     def processar_loja(loja_nome):
         print(f'\n🏪 PROCESSANDO: {loja_nome}')
@@ -52,102 +45,44 @@ def criar_base_clientes_vixen_centric():
         print(f'📊 OSS: {len(oss)} OS')
         
         # Preparar dados para cruzamento
-        vixen_prep = vixen.copy()
-        vixen_prep['email_norm'] = vixen_prep['E-mail'].apply(normalizar_email)
-        vixen_prep['telefone_norm'] = vixen_prep['Fone'].apply(normalizar_telefone)
-        vixen_prep['nome_norm'] = vixen_prep['Nome Completo'].apply(normalizar_nome)
-        
-        oss_prep = oss.copy()
-        oss_prep['email_norm'] = oss_prep['EMAIL:'].apply(normalizar_email)
-        oss_prep['telefone_norm'] = oss_prep['CELULAR:'].apply(normalizar_telefone)
-        oss_prep['nome_norm'] = oss_prep['NOME:'].apply(normalizar_nome)
-        
-        # Executar cruzamentos
-        matches = []
-        oss_matched = set()
+        vixen_prep = vixen.join(preparar_chaves(vixen, CHAVES_VIXEN))
+        oss_prep = oss.join(preparar_chaves(oss, CHAVES_OSS))
         
+        # Executar cruzamentos: hash join em cascata (email -> telefone -> nome),
+        # cada etapa só com as OS ainda sem cliente; reaproveita a tabela de
+        # vínculos se VIXEN e OSS não mudaram
         print(f'\n🔍 EXECUTANDO CRUZAMENTOS:')
         
-        # 1. Email (alta precisão)
-        email_matches = 0
-        for idx, vixen_row in vixen_prep.iterrows():
-            if vixen_row['email_norm']:
-                oss_match = oss_prep[
-                    (oss_prep['email_norm'] == vixen_row['email_norm']) & 
-                    (~oss_prep.index.isin(oss_matched))
-                ]
-                if not oss_match.empty:
-                    for _, oss_row in oss_match.iterrows():
-                        matches.append({
-                            'cliente_id': vixen_row['ID'],
-                            'vixen_nome': vixen_row['Nome Completo'],
-                            'oss_index': oss_row.name,
-                            'oss_nome': oss_row['NOME:'],
-                            'oss_numero': oss_row.get('OS N°', 'N/A'),
-                            'data_compra': oss_row.get('data_compra', 'N/A'),
-                            'total_os': oss_row.get('TOTAL', 0),
-                            'match_method': 'EMAIL',
-                            'confidence': 'HIGH'
-                        })
-                        oss_matched.add(oss_row.name)
-                        email_matches += 1
-        
-        print(f'   📧 Email: {email_matches} matches')
-        
-        # 2. Telefone (média precisão)
-        telefone_matches = 0
-        for idx, vixen_row in vixen_prep.iterrows():
-            if vixen_row['telefone_norm']:
-                oss_match = oss_prep[
-                    (oss_prep['telefone_norm'] == vixen_row['telefone_norm']) & 
-                    (~oss_prep.index.isin(oss_matched))
-                ]
-                if not oss_match.empty:
-                    for _, oss_row in oss_match.iterrows():
-                        matches.append({
-                            'cliente_id': vixen_row['ID'],
-                            'vixen_nome': vixen_row['Nome Completo'],
-                            'oss_index': oss_row.name,
-                            'oss_nome': oss_row['NOME:'],
-                            'oss_numero': oss_row.get('OS N°', 'N/A'),
-                            'data_compra': oss_row.get('data_compra', 'N/A'),
-                            'total_os': oss_row.get('TOTAL', 0),
-                            'match_method': 'PHONE',
-                            'confidence': 'MEDIUM'
-                        })
-                        oss_matched.add(oss_row.name)
-                        telefone_matches += 1
-        
-        print(f'   📞 Telefone: {telefone_matches} matches')
-        
-        # 3. Nome (baixa precisão)
-        nome_matches = 0
-        for idx, vixen_row in vixen_prep.iterrows():
-            if vixen_row['nome_norm']:
-                oss_match = oss_prep[
-                    (oss_prep['nome_norm'] == vixen_row['nome_norm']) & 
-                    (~oss_prep.index.isin(oss_matched))
-                ]
-                if not oss_match.empty:
-                    for _, oss_row in oss_match.iterrows():
-                        matches.append({
-                            'cliente_id': vixen_row['ID'],
-                            'vixen_nome': vixen_row['Nome Completo'],
-                            'oss_index': oss_row.name,
-                            'oss_nome': oss_row['NOME:'],
-                            'oss_numero': oss_row.get('OS N°', 'N/A'),
-                            'data_compra': oss_row.get('data_compra', 'N/A'),
-                            'total_os': oss_row.get('TOTAL', 0),
-                            'match_method': 'NAME',
-                            'confidence': 'LOW'
-                        })
-                        oss_matched.add(oss_row.name)
-                        nome_matches += 1
-        
-        print(f'   👤 Nome: {nome_matches} matches')
+        pares = vincular_relacao(
+            tabela_vinculos, f'vixen_oss_{loja_nome.lower()}', vixen_prep, oss_prep,
+            ETAPAS_CRUZAMENTO, id_esquerda='ID', origens=(vixen_file, oss_file)
+        )
+        vixen_par = vixen_prep.iloc[pares['pos_esquerda'].to_numpy()]
+        oss_par = oss_prep.iloc[pares['pos_direita'].to_numpy()]
+        
+        def coluna_oss(coluna, padrao):
+            return oss_par[coluna].to_numpy() if coluna in oss_par.columns else padrao
+        
+        matches = pd.DataFrame({
+            'cliente_id': vixen_par['ID'].to_numpy(),
+            'vixen_nome': vixen_par['Nome Completo'].to_numpy(),
+            'oss_index': oss_par.index.to_numpy(),
+            'oss_nome': oss_par['NOME:'].to_numpy(),
+            'oss_numero': coluna_oss('OS N°', 'N/A'),
+            'data_compra': coluna_oss('data_compra', 'N/A'),
+            'total_os': coluna_oss('TOTAL', 0),
+            'match_method': pares['match_method'].to_numpy(),
+            'confidence': pares['confidence'].to_numpy()
+        })
+        oss_matched = set(matches['oss_index'])
+        
+        por_metodo = matches['match_method'].value_counts()
+        print(f'   📧 Email: {por_metodo.get("EMAIL", 0)} matches')
+        print(f'   📞 Telefone: {por_metodo.get("PHONE", 0)} matches')
+        print(f'   👤 Nome: {por_metodo.get("NAME", 0)} matches')
         
         # Criar DataFrames de resultado
-        matches_df = pd.DataFrame(matches)
+        matches_df = matches
         
         # Estatísticas
         total_matches = len(matches_df)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cruzamento em cascata por hash join
+Sistema Carne Fácil - Vincular registros de duas bases por chaves normalizadas
+
+Cada etapa (email, depois telefone, depois nome...) é um hash join entre a
+base da esquerda (ex.: VIXEN) e os registros da direita (ex.: OSS) que ainda
+não foram vinculados; os vinculados saem da etapa seguinte (anti-join). Custo
+linear no tamanho das bases, em vez de uma máscara sobre a direita inteira
+para cada registro da esquerda. Chaves inteiras (IDs) usam sort-merge
+(argsort + searchsorted), sem montar tabela hash.
+
+Regra de cada etapa (a mesma dos loops originais): o registro da direita vai
+para o PRIMEIRO registro da esquerda com a mesma chave; um registro da
+esquerda pode levar vários da direita (cliente com várias OS).
+
+Uso nos scripts (rodando de scripts/):
+    from cruzamento_cascata import cruzar_em_cascata
+    pares = cruzar_em_cascata(vixen_prep, oss_prep, [
+        ('email_norm', 'EMAIL', 'HIGH'),
+        ('telefone_norm', 'PHONE', 'MEDIUM'),
+        ('nome_norm', 'NAME', 'LOW'),
+    ])
+"""
+
+from typing import Dict, List, Optional, Tuple
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_PARES = ['pos_esquerda', 'pos_direita', 'match_method', 'confidence']
+
+def chaves_validas(serie: pd.Series) -> np.ndarray:
+    """Máscara das chaves utilizáveis (nem nulas nem texto vazio)"""
+    return (serie.notna() & (serie.astype(str) != '')).to_numpy()
+
+def chaves_inteiras(*series: pd.Series) -> bool:
+    """Todas as chaves são inteiras (IDs), aptas ao sort-merge"""
+    return all(pd.api.types.is_integer_dtype(serie.dtype) for serie in series)
+
+def juntar_ordenado(lado_esquerdo: pd.DataFrame, lado_direito: pd.DataFrame) -> pd.DataFrame:
+    """Sort-merge de chaves inteiras já únicas na esquerda (mesmo resultado do merge inner)"""
+    chaves = lado_esquerdo['chave'].to_numpy(dtype=np.int64)
+    ordem = np.argsort(chaves, kind='stable')
+    chaves_ordenadas = chaves[ordem]
+    
+    procuradas = lado_direito['chave'].to_numpy(dtype=np.int64)
+    posicoes = np.searchsorted(chaves_ordenadas, procuradas)
+    achadas = posicoes < len(chaves_ordenadas)
+    achadas[achadas] = chaves_ordenadas[posicoes[achadas]] == procuradas[achadas]
+    
+    return pd.DataFrame({
+        'pos_direita': lado_direito['pos_direita'].to_numpy()[achadas],
+        'pos_esquerda': lado_esquerdo['pos_esquerda'].to_numpy()[ordem][posicoes[achadas]]
+    })
+
+def cruzar_em_cascata(esquerda: pd.DataFrame, direita: pd.DataFrame,
+                      etapas: List[Tuple], coluna_direita: Optional[dict] = None,
+                      estatisticas: Optional[List[Dict]] = None) -> pd.DataFrame:
+    """
+    Pares (pos_esquerda, pos_direita, match_method, confidence) em cascata
+    
+    etapas: (coluna, match_method, confidence), na ordem de precisão.
+    coluna_direita: nome da coluna na direita quando difere ({'email_norm': 'email'}).
+    estatisticas: lista que recebe, por etapa, candidatos, vínculos e tempo.
+    As posições são posicionais (iloc). Os pares saem por etapa e, dentro de cada
+    uma, na ordem da esquerda e depois da direita.
+    """
+    coluna_direita = coluna_direita or {}
+    livres = np.ones(len(direita), dtype=bool)
+    resultados = []
+    
+    for coluna, metodo, confianca in etapas:
+        inicio = time.perf_counter()
+        chaves_esquerda = esquerda[coluna]
+        chaves_direita = direita[coluna_direita.get(coluna, coluna)]
+        
+        # Primeira ocorrência de cada chave na esquerda leva os registros da direita
+        validas = chaves_validas(chaves_esquerda)
+        lado_esquerdo = pd.DataFrame({
+            'chave': chaves_esquerda.array[validas],
+            'pos_esquerda': np.flatnonzero(validas)
+        }).drop_duplicates('chave', keep='first')
+        
+        # Anti-join: só os registros da direita ainda sem vínculo
+        candidatas = livres & chaves_validas(chaves_direita)
+        lado_direito = pd.DataFrame({
+            'chave': chaves_direita.array[candidatas],
+            'pos_direita': np.flatnonzero(candidatas)
+        })
+        
+        ordenado = chaves_inteiras(lado_esquerdo['chave'], lado_direito['chave'])
+        if ordenado:
+            pares = juntar_ordenado(lado_esquerdo, lado_direito)
+        else:
+            pares = lado_direito.merge(lado_esquerdo, on='chave', how='inner')
+        pares = pares.sort_values(['pos_esquerda', 'pos_direita'], kind='stable')
+        livres[pares['pos_direita'].to_numpy()] = False
+        
+        resultados.append(pd.DataFrame({
+            'pos_esquerda': pares['pos_esquerda'].to_numpy(),
+            'pos_direita': pares['pos_direita'].to_numpy(),
+            'match_method': metodo,
+            'confidence': confianca
+        }, columns=COLUNAS_PARES))
+        
+        if estatisticas is not None:
+            estatisticas.append({
+                'coluna': coluna,
+                'match_method': metodo,
+                'confidence': confianca,
+                'juncao': 'sort-merge' if ordenado else 'hash',
+                'chaves_esquerda': len(lado_esquerdo),
+                'candidatos_direita': len(lado_direito),
+                'vinculados': len(pares),
+                'registros_esquerda': int(pares['pos_esquerda'].nunique()),
+                'segundos': round(time.perf_counter() - inicio, 4)
+            })
+    
+    if not resultados:
+        return pd.DataFrame(columns=COLUNAS_PARES)
+    return pd.concat(resultados, ignore_index=True)
@@ -9,6 +9,13 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from vinculo_clientes import TabelaVinculos, preparar_chaves, vincular_relacao
+
+# Trans Financ (ID.2) e master (VIXEN) compartilham o ID do cliente
+ETAPAS_CRUZAMENTO = [
+    ('id', 'ID_DIRETO', 'HIGH'),
+]
+
 def cruzar_trans_financ_clientes_master():
     """Cruza clientes Trans Financ com clientes master"""
     
@@ -44,11 +51,15 @@ def cruzar_trans_financ_clientes_master():
     return resultado_cruzamento
 
 def carregar_clientes_trans_financ(pasta_trans):
-    """Carrega e analisa clientes do Trans Financ"""
+    """Carrega e analisa clientes do Trans Financ
+    
+    Devolve um registro por cliente, indexado por ID.2 (nome_trans, cpf_cnpj,
+    total_transacoes, valor_total, arquivo_origem).
+    """
     
     print("🔍 Analisando clientes Trans Financ...")
     
-    clientes_consolidados = {}
+    partes = []
     total_registros_analisados = 0
     
     # Processar todos os arquivos Trans Financ
@@ -60,39 +71,25 @@ def carregar_clientes_trans_financ(pasta_trans):
         try:
             df = pd.read_csv(arquivo, encoding='utf-8', low_memory=False)
             
-            # Analisar clientes por ID.2
+            # Transações por ID.2 (0 é registro de sistema)
             if 'ID.2' in df.columns:
-                for _, row in df.iterrows():
-                    cliente_id = row.get('ID.2')
-                    
-                    if pd.notna(cliente_id) and cliente_id != 0:
-                        cliente_id = int(cliente_id)
-                        
-                        if cliente_id not in clientes_consolidados:
-                            clientes_consolidados[cliente_id] = {
-                                'nome_trans': row.get('Cliente.1', ''),
-                                'cpf_cnpj': row.get('CPF/CNPJ', ''),
-                                'transacoes': [],
-                                'total_transacoes': 0,
-                                'valor_total': 0.0,
-                                'arquivo_origem': []
-                            }
-                        
-                        # Adicionar informações da transação
-                        transacao = {
-                            'origem': row.get('Origem', ''),
-                            'valor': float(row.get('Vl.líquido', 0) or 0),
-                            'data_emissao': row.get('Dh.emissão', ''),
-                            'pagamento': row.get('Pagamento', ''),
-                            'arquivo': arquivo.name
-                        }
-                        
-                        clientes_consolidados[cliente_id]['transacoes'].append(transacao)
-                        clientes_consolidados[cliente_id]['total_transacoes'] += 1
-                        clientes_consolidados[cliente_id]['valor_total'] += transacao['valor']
-                        
-                        if arquivo.name not in clientes_consolidados[cliente_id]['arquivo_origem']:
-                            clientes_consolidados[cliente_id]['arquivo_origem'].append(arquivo.name)
+                ids = pd.to_numeric(df['ID.2'])
+                validos = ids.notna() & (ids != 0)
+                com_cliente = df[validos]
+                
+                def coluna(nome, padrao=''):
+                    return com_cliente[nome].to_numpy() if nome in com_cliente.columns else padrao
+                
+                partes.append(pd.DataFrame({
+                    'cliente_id': ids[validos].astype('int64').to_numpy(),
+                    'nome_trans': coluna('Cliente.1'),
+                    'cpf_cnpj': coluna('CPF/CNPJ'),
+                    'origem': coluna('Origem'),
+                    'valor': pd.to_numeric(coluna('Vl.líquido', 0.0)),
+                    'data_emissao': coluna('Dh.emissão'),
+                    'pagamento': coluna('Pagamento'),
+                    'arquivo': arquivo.name
+                }))
             
             total_registros_analisados += len(df)
             print(f"      ✅ {len(df):,} registros analisados")
@@ -100,22 +97,38 @@ def carregar_clientes_trans_financ(pasta_trans):
         except Exception as e:
             print(f"      ❌ Erro: {e}")
     
+    if partes:
+        transacoes = pd.concat(partes, ignore_index=True)
+    else:
+        transacoes = pd.DataFrame(columns=[
+            'cliente_id', 'nome_trans', 'cpf_cnpj', 'origem', 'valor', 'data_emissao', 'pagamento', 'arquivo'
+        ]).astype({'cliente_id': 'int64', 'valor': float})
+    transacoes['valor'] = transacoes['valor'].fillna(0.0)
+    transacoes = transacoes.set_index('cliente_id')
+    
+    # Um registro por cliente, na ordem em que aparece: nome/CPF da primeira
+    # transação, contagem, soma dos valores e arquivos de origem
+    por_cliente = transacoes.groupby(level='cliente_id', sort=False)
+    clientes = transacoes.loc[~transacoes.index.duplicated(), ['nome_trans', 'cpf_cnpj']].copy()
+    clientes['total_transacoes'] = por_cliente.size()
+    clientes['valor_total'] = por_cliente['valor'].sum()
+    clientes['arquivo_origem'] = por_cliente['arquivo'].unique().map(list)
+    
     print(f"\n📊 RESUMO TRANS FINANC:")
-    print(f"   👥 Clientes únicos: {len(clientes_consolidados)}")
+    print(f"   👥 Clientes únicos: {len(clientes)}")
     print(f"   📄 Total registros: {total_registros_analisados:,}")
     
     # Top 5 clientes por valor
-    top_clientes = sorted(clientes_consolidados.items(), 
-                         key=lambda x: x[1]['valor_total'], reverse=True)[:5]
+    top_clientes = clientes.sort_values('valor_total', ascending=False, kind='stable').head(5)
     
     print(f"\n🏆 TOP 5 CLIENTES POR VALOR:")
-    for i, (cliente_id, dados) in enumerate(top_clientes, 1):
+    for i, (cliente_id, dados) in enumerate(top_clientes.iterrows(), 1):
         nome = str(dados['nome_trans'] or 'SEM NOME')
         valor = dados['valor_total']
-        transacoes = dados['total_transacoes']
-        print(f"   {i}. ID {cliente_id}: {nome[:25]} - R$ {valor:,.2f} ({transacoes} trans.)")
+        transacoes_cliente = dados['total_transacoes']
+        print(f"   {i}. ID {cliente_id}: {nome[:25]} - R$ {valor:,.2f} ({transacoes_cliente} trans.)")
     
-    return clientes_consolidados
+    return clientes
 
 def carregar_clientes_master(pasta_master):
     """Carrega clientes master do VIXEN/OSS"""
@@ -217,16 +230,27 @@ def fazer_cruzamento_master(clientes_trans, clientes_master):
         }
     }
     
-    # 1. Buscar matches diretos (mesmo ID)
-    for trans_id, dados_trans in clientes_trans.items():
-        if trans_id in clientes_master:
+    # 1. Buscar matches diretos (mesmo ID): tabela de vínculos 'trans_financ_master'
+    trans = pd.DataFrame({'ID.2': clientes_trans.index})
+    master = pd.DataFrame({'ID': list(clientes_master.keys())})
+    vinculos = vincular_relacao(
+        TabelaVinculos(), 'trans_financ_master',
+        trans.join(preparar_chaves(trans, {'id': 'ID.2'})),
+        master.join(preparar_chaves(master, {'id': 'ID'})),
+        ETAPAS_CRUZAMENTO, id_esquerda='ID.2', id_direita='ID',
+        origens=('trans_financ_*.csv', 'clientes_master_*.csv')
+    )
+    vinculo_por_trans = dict(zip(vinculos['pos_esquerda'], zip(vinculos['id_direita'], vinculos['match_method'])))
+    
+    for pos, (trans_id, dados_trans) in enumerate(clientes_trans.to_dict('index').items()):
+        if pos in vinculo_por_trans:
             # Match encontrado!
-            dados_master = clientes_master[trans_id]
+            master_id, tipo_match = vinculo_por_trans[pos]
             
             resultado['matches_encontrados'][trans_id] = {
                 'trans_financ': dados_trans,
-                'cliente_master': dados_master,
-                'tipo_match': 'ID_DIRETO'
+                'cliente_master': clientes_master[master_id],
+                'tipo_match': tipo_match
             }
             
             resultado['estatisticas']['matches_diretos'] += 1
@@ -236,8 +260,9 @@ def fazer_cruzamento_master(clientes_trans, clientes_master):
             resultado['estatisticas']['trans_orphaos'] += 1
     
     # 2. Identificar clientes master sem transações financeiras
+    masters_vinculados = set(vinculos['id_direita'])
     for master_id, dados_master in clientes_master.items():
-        if master_id not in clientes_trans:
+        if master_id not in masters_vinculados:
             resultado['clientes_master_sem_transacao'][master_id] = dados_master
             resultado['estatisticas']['master_sem_trans'] += 1
     
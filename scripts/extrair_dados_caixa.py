@@ -5,24 +5,30 @@ Sistema Carne Fácil - Extração de dados normalizados
 """
 
 import pandas as pd
-import openpyxl
 from pathlib import Path
 import json
 from datetime import datetime
 import os
 import warnings
-import re
 warnings.filterwarnings('ignore')
 
-def extrair_valor_celula(worksheet, celula):
+from leitor_caixa import (
+    abrir_caixa, abas_diarias, ler_aba, formatar_valor, localizar_estruturas, LINHAS_LEITURA, COLUNAS_BUSCA
+)
+from manifesto_caixa import ManifestoCaixa
+
+# Manifesto da extração incremental (planilhas já extraídas e seus registros)
+DIRETORIO_MANIFESTO = 'data/originais/cxs/manifesto_extracao_caixa'
+# Aumentar quando as regras de extração mudarem (invalida o manifesto)
+# 2: estruturas localizadas pelos rótulos (LocalizadorEstruturas)
+# 3: última estrutura para na linha vazia ou de TOTAL e passa da linha 80
+# 4: linha vazia isolada não encerra a estrutura (só TOTAL ou duas vazias)
+VERSAO_EXTRACAO = 4
+
+def extrair_valor_celula(folha, celula):
     """Extrai valor de uma célula específica"""
     try:
-        valor = worksheet[celula].value
-        if valor is None:
-            return ""
-        if isinstance(valor, datetime):
-            return valor.strftime('%Y-%m-%d')
-        return str(valor).strip()
+        return formatar_valor(folha.celula(celula))
     except Exception:
         return ""
 
@@ -52,29 +58,23 @@ def normalizar_loja(nome_loja):
     
     return nome_limpo
 
-def extrair_dados_estrutura(worksheet, config_estrutura, data_movimento, loja_normalizada, arquivo_origem, aba):
+def extrair_dados_estrutura(folha, config_estrutura, data_movimento, loja_normalizada, arquivo_origem, aba):
     """
     Extrai dados de uma estrutura específica (VENDAS, RECEBIMENTO_CARNE, etc.)
     """
     registros = []
     
     try:
-        celula_inicio = config_estrutura['celula_inicio']
-        linha_inicio = int(re.findall(r'\d+', celula_inicio)[0])
-        coluna_inicio_letra = re.findall(r'[A-Z]+', celula_inicio)[0]
-        
         # Verificar se a estrutura existe
-        valor_cabecalho = extrair_valor_celula(worksheet, celula_inicio)
+        valor_cabecalho = formatar_valor(folha.cabecalho(config_estrutura))
         if not valor_cabecalho or config_estrutura['titulo_esperado'].lower() not in valor_cabecalho.lower():
             return registros
         
-        # Extrair dados linha por linha
-        for linha_offset in range(1, 21):  # Máximo 20 linhas
-            linha_atual = linha_inicio + linha_offset
-            primeira_coluna = f"{coluna_inicio_letra}{linha_atual}"
-            valor_primeira = extrair_valor_celula(worksheet, primeira_coluna)
+        # Extrair dados linha por linha (até a próxima estrutura), fatiando a matriz da aba
+        for linha_atual, valores in folha.linhas_estrutura(config_estrutura):
+            valores = [formatar_valor(v) for v in valores]
             
-            if not valor_primeira or valor_primeira.strip() == "":
+            if not valores[0]:
                 continue
                 
             # Extrair dados de todas as colunas
@@ -87,17 +87,8 @@ def extrair_dados_estrutura(worksheet, config_estrutura, data_movimento, loja_no
                 'linha_arquivo': linha_atual
             }
             
-            # Mapear cada coluna
-            for i, nome_coluna in enumerate(config_estrutura['colunas']):
-                col_letra = chr(ord(coluna_inicio_letra) + i)
-                celula_dados = f"{col_letra}{linha_atual}"
-                valor = extrair_valor_celula(worksheet, celula_dados)
-                
-                # Normalizar nome da coluna para o banco
-                nome_normalizado = nome_coluna.lower().replace(' ', '_').replace('º', 'n').replace('ª', 'a')
-                nome_normalizado = re.sub(r'[^a-z0-9_]', '', nome_normalizado)
-                
-                registro[nome_normalizado] = valor
+            # Mapear cada coluna (nomes já normalizados para o banco)
+            registro.update(zip(config_estrutura['colunas_normalizadas'], valores))
             
             registros.append(registro)
             
@@ -123,64 +114,31 @@ def extrair_dados_arquivo_caixa(caminho_arquivo):
         'erro': None
     }
     
-    # Configurações das estruturas
-    estruturas_caixa = {
-        'VENDAS': {
-            'nome': 'VENDAS',
-            'celula_inicio': 'E5',
-            'titulo_esperado': 'Nº Venda',
-            'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-        },
-        'RESTANTE_ENTRADA': {
-            'nome': 'RESTANTE_ENTRADA', 
-            'celula_inicio': 'E25',
-            'titulo_esperado': 'Nº Venda',
-            'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-        },
-        'RECEBIMENTO_CARNE': {
-            'nome': 'RECEBIMENTO_CARNE',
-            'celula_inicio': 'E34',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Cliente', 'Forma de Pgto', 'Valor Parcela', 'Nº Parcela']
-        },
-        'OS_ENTREGUES_DIA': {
-            'nome': 'OS_ENTREGUES_DIA',
-            'celula_inicio': 'K14',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Vendedor', 'CARNÊ']
-        },
-        'ENTREGA_CARNE': {
-            'nome': 'ENTREGA_CARNE',
-            'celula_inicio': 'K34',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Parcelas', 'Valor Total']
-        }
-    }
-    
     try:
-        workbook = openpyxl.load_workbook(caminho_arquivo, data_only=True)
+        workbook = abrir_caixa(caminho_arquivo)
         
         # Analisar apenas abas numéricas (01-31)
-        abas_numericas = [nome for nome in workbook.sheetnames if nome.isdigit() and 1 <= int(nome) <= 31]
+        abas_numericas = abas_diarias(workbook)
         
         print(f"   📊 Processando {len(abas_numericas)} abas: {abas_numericas[:5]}{'...' if len(abas_numericas) > 5 else ''}")
         
         for nome_aba in abas_numericas:
             try:
-                worksheet = workbook[nome_aba]
+                # Uma única leitura da área da aba; estruturas localizadas pelos rótulos e fatiadas dela
+                folha = ler_aba(workbook, nome_aba, LINHAS_LEITURA, COLUNAS_BUSCA)
                 
                 # Extrair data e loja
-                data_movimento = extrair_valor_celula(worksheet, 'B1')
-                loja_extraida = extrair_valor_celula(worksheet, 'L1')
+                data_movimento = extrair_valor_celula(folha, 'B1')
+                loja_extraida = extrair_valor_celula(folha, 'L1')
                 loja_normalizada = normalizar_loja(loja_extraida)
                 
                 if not data_movimento:
                     continue
                 
-                # Processar cada estrutura
-                for nome_estrutura, config in estruturas_caixa.items():
+                # Processar cada estrutura (posição e extensão reais desta aba)
+                for nome_estrutura, config in localizar_estruturas(folha).items():
                     registros_estrutura = extrair_dados_estrutura(
-                        worksheet, config, data_movimento, loja_normalizada, 
+                        folha, config, data_movimento, loja_normalizada, 
                         os.path.basename(caminho_arquivo), nome_aba
                     )
                     
@@ -204,9 +162,12 @@ def extrair_dados_arquivo_caixa(caminho_arquivo):
     
     return resultado
 
-def extrair_todos_dados_caixa():
+def extrair_todos_dados_caixa(diretorio_manifesto=DIRETORIO_MANIFESTO):
     """
     Extrai dados de todos os arquivos de caixa
+    
+    Incremental: planilhas sem alteração desde a última execução (manifesto)
+    reaproveitam os registros gravados; só novas ou alteradas são extraídas.
     """
     
     # Definir lojas e seus caminhos
@@ -226,12 +187,20 @@ def extrair_todos_dados_caixa():
         'dados_por_loja': {},
         'todos_registros': [],
         'resumo_por_estrutura': {},
-        'arquivos_com_erro': []
+        'arquivos_com_erro': [],
+        'extracao_incremental': {
+            'arquivos_extraidos': 0,
+            'arquivos_reaproveitados': 0,
+            'arquivos_removidos': []
+        }
     }
     
     print("🚀 EXTRAÇÃO COMPLETA DOS DADOS DE CAIXA")
     print("=" * 60)
     
+    manifesto = ManifestoCaixa(diretorio_manifesto, VERSAO_EXTRACAO)
+    arquivos_encontrados = []
+    
     for nome_loja, caminho_loja in lojas_caminhos:
         if not os.path.exists(caminho_loja):
             print(f"⚠️  Pasta não encontrada: {caminho_loja}")
@@ -245,6 +214,7 @@ def extrair_todos_dados_caixa():
             for file in files:
                 if file.endswith('.xlsx') and not file.startswith('~$'):
                     arquivos_excel.append(os.path.join(root, file))
+        arquivos_encontrados.extend(arquivos_excel)
         
         # Processar apenas alguns arquivos para teste
         arquivos_teste = sorted(arquivos_excel)[-3:]  # Últimos 3 arquivos
@@ -259,9 +229,20 @@ def extrair_todos_dados_caixa():
         
         for caminho_arquivo in arquivos_teste:
             nome_arquivo = os.path.basename(caminho_arquivo)
-            print(f"   📄 Processando: {nome_arquivo}")
             
-            resultado_arquivo = extrair_dados_arquivo_caixa(caminho_arquivo)
+            if manifesto.situacao(caminho_arquivo) == 'inalterado':
+                resultado_arquivo = manifesto.registros(caminho_arquivo)
+                resultado_geral['extracao_incremental']['arquivos_reaproveitados'] += 1
+                print(f"   ♻️  Sem alterações: {nome_arquivo}")
+            else:
+                print(f"   📄 Processando: {nome_arquivo}")
+                resultado_arquivo = extrair_dados_arquivo_caixa(caminho_arquivo)
+                resultado_geral['extracao_incremental']['arquivos_extraidos'] += 1
+                
+                # Arquivos com erro ficam fora do manifesto e são tentados de novo
+                if not resultado_arquivo.get('erro'):
+                    manifesto.atualizar(caminho_arquivo, resultado_arquivo, resultado_arquivo['total_registros'])
+            
             resultado_geral['dados_por_loja'][nome_loja]['arquivos'][nome_arquivo] = resultado_arquivo
             
             if resultado_arquivo.get('erro'):
@@ -279,6 +260,10 @@ def extrair_todos_dados_caixa():
         
         resultado_geral['total_arquivos_processados'] += len(arquivos_teste)
     
+    # Planilhas apagadas saem do manifesto (e das saídas)
+    resultado_geral['extracao_incremental']['arquivos_removidos'] = manifesto.remover_ausentes(arquivos_encontrados)
+    manifesto.salvar()
+    
     # Compilar resumo por estrutura
     for registro in resultado_geral['todos_registros']:
         tipo_estrutura = registro.get('tipo_estrutura', 'INDEFINIDO')
@@ -315,6 +300,10 @@ def main():
     print(f"   📁 Arquivos processados: {resultado['total_arquivos_processados']}")
     print(f"   📋 Total de registros: {resultado['total_registros_extraidos']}")
     print(f"   ❌ Arquivos com erro: {len(resultado['arquivos_com_erro'])}")
+    incremental = resultado['extracao_incremental']
+    print(f"   🔄 Extraídos: {incremental['arquivos_extraidos']} | "
+          f"reaproveitados: {incremental['arquivos_reaproveitados']} | "
+          f"removidos: {len(incremental['arquivos_removidos'])}")
     
     print("\n📈 REGISTROS POR ESTRUTURA:")
     for estrutura, count in resultado['resumo_por_estrutura'].items():
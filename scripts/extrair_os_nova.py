@@ -9,6 +9,10 @@ Cada arquivo representa uma ordem de serviço com dados de cliente e venda.
 
 import pandas as pd
 import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import logging
 from datetime import datetime
@@ -22,6 +26,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rótulos procurados no formulário (indexados numa única passada)
+ROTULOS_OS = [
+    "NOME:", "CPF", "RG", "DT NASC", "TELEFONE", "CELULAR", "EMAIL", "CEP", "END:", "Nº", "N",
+    "BAIRRO", "COMP", "DATA DE COMPRA", "CONSULTOR", "OS N°", "VIXEN", "VENDA", "GARANTIA",
+    "COMO CONHECEU", "PREV DE ENTR"
+]
+
+# Modo lote: processos, arquivos por tarefa do pool e linhas por row group do Parquet
+OS_WORKERS = int(os.getenv("OS_WORKERS", os.cpu_count() or 1))
+ARQUIVOS_POR_TAREFA = 50
+LINHAS_POR_LOTE_PARQUET = 5000
+
+# Colunas dos registros extraídos (datas viram date32 no Parquet, o resto texto)
+CAMPOS_CLIENTE = [
+    'nome', 'cpf', 'rg', 'dt_nascimento', 'telefone', 'celular', 'email', 'cep',
+    'endereco', 'numero', 'bairro', 'complemento', 'loja', 'arquivo_origem'
+]
+CAMPOS_VENDA = [
+    'os_numero', 'vixen_id', 'data_compra', 'consultor', 'cliente_nome', 'cliente_cpf',
+    'venda', 'garantia', 'como_conheceu', 'prev_entrega', 'loja', 'arquivo_origem'
+]
+CAMPOS_DATA = {'dt_nascimento', 'data_compra', 'prev_entrega'}
+
+def esquema_parquet(campos):
+    """Esquema Arrow fixo para os registros (independe do primeiro lote)"""
+    import pyarrow as pa
+    return pa.schema([(campo, pa.date32() if campo in CAMPOS_DATA else pa.string()) for campo in campos])
+
 class ExtratorOSNova:
     def __init__(self):
         self.base_dir = Path("data/originais/oss/por_loja")
@@ -46,55 +78,92 @@ class ExtratorOSNova:
             logger.warning(f"Erro ao extrair {termo_busca}: {e}")
             return None
     
+    def indexar_formulario(self, df, rotulos=ROTULOS_OS, coluna_inicial=1):
+        """
+        Uma passada pelo formulário: rótulo -> (linha, coluna, valor)
+        
+        Mesma regra de extrair_valor_linha para cada rótulo (primeira linha cujo
+        texto contém o rótulo e tem, a partir de coluna_inicial, um valor diferente
+        dele). Devolve também a primeira linha com "NOME:" para extrair_nome.
+        """
+        indice = {}
+        linha_nome = None
+        pendentes = list(rotulos)
+        
+        for linha, valores in enumerate(df.itertuples(index=False, name=None)):
+            row_text = ' '.join([str(cell) for cell in valores if pd.notna(cell)]).upper()
+            if linha_nome is None and "NOME:" in row_text:
+                linha_nome = valores
+            
+            encontrados = [rotulo for rotulo in pendentes if rotulo.upper() in row_text]
+            if encontrados:
+                preenchidos = [
+                    (col, str(valores[col]).strip()) for col in range(coluna_inicial, len(valores))
+                    if pd.notna(valores[col]) and str(valores[col]).strip()
+                ]
+                for rotulo in encontrados:
+                    for col, valor in preenchidos:
+                        if valor != rotulo:
+                            indice[rotulo] = (linha, col, valor)
+                            pendentes.remove(rotulo)
+                            break
+            
+            if not pendentes and linha_nome is not None:
+                break
+        
+        return indice, linha_nome
+    
+    def extrair_nome(self, valores):
+        """Nome na linha do "NOME:": próximo valor não vazio após a célula com NOME (sem DT NASC)"""
+        for col in range(len(valores)):
+            if pd.notna(valores[col]) and "NOME" in str(valores[col]).upper():
+                # Procurar nas próximas colunas
+                for next_col in range(col + 1, len(valores)):
+                    valor = valores[next_col]
+                    if pd.notna(valor) and str(valor).strip() and "DT NASC" not in str(valor).upper():
+                        return str(valor).strip()
+                return None
+        return None
+    
     def extrair_dados_os(self, arquivo_csv, loja):
         """Extrai dados estruturados de uma OS NOVA"""
         try:
             df = pd.read_csv(arquivo_csv)
             
-            # Dados do cliente - tentar extrair nome de forma mais robusta
-            nome = None
+            # Uma única passada indexa todos os rótulos; cada campo sai do índice
+            indice, linha_nome = self.indexar_formulario(df)
             
-            # Procurar linha com "NOME:" especificamente
-            for idx, row in df.iterrows():
-                row_text = ' '.join([str(cell) for cell in row if pd.notna(cell)])
-                if "NOME:" in row_text.upper():
-                    # Encontrar a posição do termo NOME: e pegar o próximo valor não vazio
-                    for col in range(len(row)):
-                        if pd.notna(row.iloc[col]) and "NOME" in str(row.iloc[col]).upper():
-                            # Procurar nas próximas colunas
-                            for next_col in range(col + 1, len(row)):
-                                valor = row.iloc[next_col]
-                                if pd.notna(valor) and str(valor).strip() and "DT NASC" not in str(valor).upper():
-                                    nome = str(valor).strip()
-                                    break
-                            break
-                    break
+            def valor(rotulo):
+                return indice[rotulo][2] if rotulo in indice else None
             
-            # Se não encontrou o nome, usar método anterior
+            # Dados do cliente - nome pela linha com "NOME:" especificamente
+            nome = self.extrair_nome(linha_nome) if linha_nome is not None else None
+            
+            # Se não encontrou o nome, usar a regra geral
             if not nome:
-                nome = self.extrair_valor_linha(df, "NOME:")
+                nome = valor("NOME:")
             
-            cpf = self.extrair_valor_linha(df, "CPF")
-            rg = self.extrair_valor_linha(df, "RG")
-            dt_nasc = self.extrair_valor_linha(df, "DT NASC")
-            telefone = self.extrair_valor_linha(df, "TELEFONE")
-            celular = self.extrair_valor_linha(df, "CELULAR")
-            email = self.extrair_valor_linha(df, "EMAIL")
-            cep = self.extrair_valor_linha(df, "CEP")
-            endereco = self.extrair_valor_linha(df, "END:")
-            numero = self.extrair_valor_linha(df, "Nº") or self.extrair_valor_linha(df, "N")
-            bairro = self.extrair_valor_linha(df, "BAIRRO")
-            complemento = self.extrair_valor_linha(df, "COMP")
+            cpf = valor("CPF")
+            rg = valor("RG")
+            dt_nasc = valor("DT NASC")
+            telefone = valor("TELEFONE")
+            celular = valor("CELULAR")
+            email = valor("EMAIL")
+            cep = valor("CEP")
+            endereco = valor("END:")
+            numero = valor("Nº") or valor("N")
+            bairro = valor("BAIRRO")
+            complemento = valor("COMP")
             
             # Dados da venda/OS
-            data_compra = self.extrair_valor_linha(df, "DATA DE COMPRA")
-            consultor = self.extrair_valor_linha(df, "CONSULTOR")
-            os_numero = self.extrair_valor_linha(df, "OS N°")
-            vixen_id = self.extrair_valor_linha(df, "VIXEN")
-            venda = self.extrair_valor_linha(df, "VENDA")
-            garantia = self.extrair_valor_linha(df, "GARANTIA")
-            como_conheceu = self.extrair_valor_linha(df, "COMO CONHECEU")
-            prev_entrega = self.extrair_valor_linha(df, "PREV DE ENTR")
+            data_compra = valor("DATA DE COMPRA")
+            consultor = valor("CONSULTOR")
+            os_numero = valor("OS N°")
+            vixen_id = valor("VIXEN")
+            venda = valor("VENDA")
+            garantia = valor("GARANTIA")
+            como_conheceu = valor("COMO CONHECEU")
+            prev_entrega = valor("PREV DE ENTR")
             
             # Validar se temos dados mínimos
             if not nome or nome.upper() in ["DT NASC.:", "NOME:"]:
@@ -136,7 +205,7 @@ class ExtratorOSNova:
             }
             
             return cliente, venda_os
-            
+        
         except Exception as e:
             erro = {
                 'arquivo': arquivo_csv.name,
@@ -254,9 +323,143 @@ class ExtratorOSNova:
             logger.info(f"💾 Vendas/OS salvas em: {arquivo_vendas}")
         
         logger.info("\n🎉 EXTRAÇÃO CONCLUÍDA COM SUCESSO!")
+    
+    def listar_arquivos_os(self):
+        """(caminho, loja) de todos os arquivos OS NOVA, em ordem de loja e nome"""
+        tarefas = []
+        for loja_dir in sorted(self.base_dir.iterdir()):
+            if loja_dir.is_dir():
+                tarefas.extend((str(arquivo), loja_dir.name.upper()) for arquivo in sorted(loja_dir.glob("OS NOVA*.csv")))
+        return tarefas
+    
+    def processar_todas_oss_lote(self, workers=OS_WORKERS, arquivos_por_tarefa=ARQUIVOS_POR_TAREFA,
+                                 linhas_por_lote=LINHAS_POR_LOTE_PARQUET):
+        """
+        Modo lote: arquivos distribuídos num pool de processos, saída em Parquet
+        
+        Os registros vão para o Parquet em row groups de linhas_por_lote, na ordem
+        dos arquivos; só algumas tarefas ficam em andamento ao mesmo tempo, então a
+        memória não cresce com o total de arquivos. Falhas ficam registradas por
+        arquivo sem interromper a extração.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        logger.info(f"🚀 EXTRAÇÃO EM LOTE DAS OS NOVA ({workers} processos)")
+        logger.info("=" * 60)
+        inicio = time.perf_counter()
+        
+        tarefas = self.listar_arquivos_os()
+        lotes = [tarefas[i:i + arquivos_por_tarefa] for i in range(0, len(tarefas), arquivos_por_tarefa)]
+        logger.info(f"📄 {len(tarefas)} arquivo(s) em {len(lotes)} tarefa(s)")
+        
+        output_dir = Path("data/clientes/_consolidado")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        saidas = {
+            'clientes': (output_dir / "clientes_os_nova_extraidos.parquet", esquema_parquet(CAMPOS_CLIENTE)),
+            'vendas': (output_dir / "vendas_os_nova_extraidas.parquet", esquema_parquet(CAMPOS_VENDA))
+        }
+        escritores = {nome: pq.ParquetWriter(caminho, esquema) for nome, (caminho, esquema) in saidas.items()}
+        buffers = {nome: [] for nome in saidas}
+        totais = Counter()
+        clientes_por_loja = Counter()
+        
+        def gravar(nome, forcar=False):
+            if buffers[nome] and (forcar or len(buffers[nome]) >= linhas_por_lote):
+                escritores[nome].write_table(pa.Table.from_pylist(buffers[nome], schema=saidas[nome][1]))
+                buffers[nome] = []
+        
+        def consumir(futuro, lote):
+            try:
+                clientes, vendas, falhas = futuro.result()
+            except Exception as e:
+                # Processo do pool morreu: o lote inteiro fica como falha
+                clientes, vendas = [], []
+                falhas = [{'arquivo': Path(caminho).name, 'loja': loja, 'erro': str(e)} for caminho, loja in lote]
+            
+            buffers['clientes'].extend(clientes)
+            buffers['vendas'].extend(vendas)
+            self.erros.extend(falhas)
+            totais['arquivos'] += len(lote)
+            totais['clientes'] += len(clientes)
+            clientes_por_loja.update(cliente['loja'] for cliente in clientes)
+            gravar('clientes')
+            gravar('vendas')
+            
+            decorrido = time.perf_counter() - inicio
+            logger.info(f"   ✅ {totais['arquivos']}/{len(tarefas)} arquivos "
+                        f"({totais['arquivos'] / decorrido:.1f} arquivos/s), {len(self.erros)} falha(s)")
+        
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Fila FIFO limitada: ordem dos arquivos preservada e memória controlada
+                pendentes = deque()
+                for lote in lotes:
+                    pendentes.append((pool.submit(extrair_lote_os, lote), lote))
+                    if len(pendentes) >= 2 * workers:
+                        consumir(*pendentes.popleft())
+                while pendentes:
+                    consumir(*pendentes.popleft())
+            
+            gravar('clientes', forcar=True)
+            gravar('vendas', forcar=True)
+        finally:
+            for escritor in escritores.values():
+                escritor.close()
+        
+        if self.erros:
+            arquivo_erros = output_dir / "erros_os_nova_extracao.csv"
+            pd.DataFrame(self.erros).to_csv(arquivo_erros, index=False, encoding='utf-8-sig')
+            logger.info(f"⚠️ Falhas por arquivo em: {arquivo_erros}")
+        
+        tempo_total = time.perf_counter() - inicio
+        logger.info("\n" + "=" * 60)
+        logger.info("📊 RELATÓRIO DE EXTRAÇÃO EM LOTE")
+        logger.info("=" * 60)
+        logger.info(f"📄 Arquivos processados: {totais['arquivos']}")
+        logger.info(f"👥 Clientes/OS extraídos: {totais['clientes']}")
+        logger.info(f"❌ Falhas: {len(self.erros)}")
+        logger.info(f"⏱️ Tempo total: {tempo_total:.1f}s")
+        for loja, count in sorted(clientes_por_loja.items()):
+            logger.info(f"   🏪 {loja}: {count} cliente(s)")
+        for nome, (caminho, _) in saidas.items():
+            logger.info(f"💾 {nome.capitalize()} salvos em: {caminho}")
+        
+        return {
+            'arquivos': totais['arquivos'],
+            'clientes': totais['clientes'],
+            'falhas': len(self.erros),
+            'tempo_s': round(tempo_total, 2)
+        }
+
+def extrair_lote_os(tarefas):
+    """Extrai um lote de arquivos OS NOVA (roda no pool); falhas voltam por arquivo"""
+    extrator = ExtratorOSNova()
+    clientes, vendas, falhas = [], [], []
+    
+    for caminho, loja in tarefas:
+        caminho = Path(caminho)
+        erros_antes = len(extrator.erros)
+        cliente, venda = extrator.extrair_dados_os(caminho, loja)
+        
+        if cliente and venda:
+            clientes.append(cliente)
+            vendas.append(venda)
+        elif len(extrator.erros) > erros_antes:
+            falhas.append(extrator.erros[-1])
+        else:
+            falhas.append({'arquivo': caminho.name, 'loja': loja, 'erro': 'Nome não encontrado ou inválido'})
+    
+    return clientes, vendas, falhas
 
 def main():
+    """Uso: extrair_os_nova.py [--lote [workers]]"""
     extrator = ExtratorOSNova()
+    if '--lote' in sys.argv:
+        posicao = sys.argv.index('--lote')
+        workers = int(sys.argv[posicao + 1]) if len(sys.argv) > posicao + 1 else OS_WORKERS
+        extrator.processar_todas_oss_lote(workers)
+        return
     extrator.processar_todas_oss()
 
 if __name__ == "__main__":
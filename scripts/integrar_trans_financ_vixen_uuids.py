@@ -9,6 +9,13 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from vinculo_clientes import TabelaVinculos, preparar_chaves, vincular_relacao
+
+# Trans Financ (ID.2) e VIXEN compartilham o ID do cliente
+ETAPAS_CRUZAMENTO = [
+    ('id', 'ID_DIRETO', 'HIGH'),
+]
+
 def integrar_trans_financ_vixen_uuids():
     """Integra dados financeiros com UUIDs de clientes e lojas do VIXEN"""
     
@@ -273,16 +280,28 @@ def fazer_cruzamento_uuids(clientes_trans, uuids_vixen):
     print(f"🔗 Fazendo cruzamento de {len(clientes_trans)} clientes Trans Financ")
     print(f"   com {len(uuids_vixen['clientes'])} UUIDs VIXEN")
     
-    # Fazer match direto por ID
-    for cliente_id, dados_trans in clientes_trans.items():
-        if cliente_id in uuids_vixen['clientes']:
+    # Fazer match direto por ID: tabela de vínculos 'trans_financ_vixen_uuid'
+    trans = pd.DataFrame({'ID.2': list(clientes_trans.keys())})
+    vixen = pd.DataFrame({'id_cliente': list(uuids_vixen['clientes'].keys())})
+    vinculos = vincular_relacao(
+        TabelaVinculos(), 'trans_financ_vixen_uuid',
+        trans.join(preparar_chaves(trans, {'id': 'ID.2'})),
+        vixen.join(preparar_chaves(vixen, {'id': 'id_cliente'})),
+        ETAPAS_CRUZAMENTO, id_esquerda='ID.2', id_direita='id_cliente',
+        origens=('trans_financ_*.csv', ';'.join(uuids_vixen['arquivos_processados']))
+    )
+    vinculo_por_trans = dict(zip(vinculos['pos_esquerda'], zip(vinculos['id_direita'], vinculos['match_method'])))
+    
+    for pos, (cliente_id, dados_trans) in enumerate(clientes_trans.items()):
+        if pos in vinculo_por_trans:
             # Match encontrado!
-            uuid_info = uuids_vixen['clientes'][cliente_id]
+            id_vixen, tipo_match = vinculo_por_trans[pos]
+            uuid_info = uuids_vixen['clientes'][id_vixen]
             
             cruzamento['matches_encontrados'][cliente_id] = {
                 'trans_financ': dados_trans,
                 'vixen_uuid': uuid_info,
-                'tipo_match': 'ID_DIRETO'
+                'tipo_match': tipo_match
             }
             
             cruzamento['estatisticas']['matches_diretos'] += 1
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Leitor compartilhado das planilhas de caixa
+Sistema Carne Fácil - Leitura read-only das abas diárias
+
+Abre o workbook em modo read-only e carrega, em uma única passada de
+iter_rows, o retângulo da aba que contém as cinco estruturas (VENDAS,
+RESTANTE_ENTRADA, RECEBIMENTO_CARNE, OS_ENTREGUES_DIA, ENTREGA_CARNE) e os
+metadados (B1 = data, L1 = loja). As estruturas são fatiadas dessa matriz,
+sem acessar célula por célula com endereços em texto.
+
+Como o layout muda entre meses, LocalizadorEstruturas acha a posição real de
+cada estrutura pelos rótulos do cabeçalho ("Nº Venda", "OS", "Vendedor",
+"Parcelas"...) nas primeiras LINHAS_BUSCA linhas da aba, com cache por layout:
+abas com o mesmo layout não são varridas de novo. A aba é lida até
+LINHAS_LEITURA, para a última estrutura poder passar da área de busca.
+
+Uso nos scripts (rodando de scripts/):
+    from leitor_caixa import abrir_caixa, abas_diarias, ler_aba, ESTRUTURAS_CAIXA
+    folha = ler_aba(workbook, nome_aba, LINHAS_LEITURA, COLUNAS_BUSCA)
+    estruturas = localizar_estruturas(folha)
+"""
+
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from functools import lru_cache
+import re
+import unicodedata
+
+import openpyxl
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string, get_column_letter
+
+# Linhas de dados lidas abaixo do cabeçalho de cada estrutura
+LINHAS_POR_ESTRUTURA = 20
+
+def normalizar_nome_coluna(nome_coluna: str) -> str:
+    """'Nº Venda' -> 'nn_venda' (nome da coluna para o banco)"""
+    nome_normalizado = nome_coluna.lower().replace(' ', '_').replace('º', 'n').replace('ª', 'a')
+    return re.sub(r'[^a-z0-9_]', '', nome_normalizado)
+
+@lru_cache(maxsize=None)
+def posicao_celula(celula: str) -> Tuple[int, int]:
+    """'E25' -> (25, 5), linha e coluna 1-based"""
+    coluna_letra, linha = coordinate_from_string(celula)
+    return linha, column_index_from_string(coluna_letra)
+
+def _estrutura(nome: str, celula_inicio: str, titulo_esperado: str, colunas: List[str]) -> Dict:
+    linha_inicio, coluna_inicio = posicao_celula(celula_inicio)
+    return {
+        'nome': nome,
+        'celula_inicio': celula_inicio,
+        'titulo_esperado': titulo_esperado,
+        'colunas': colunas,
+        # Pré-calculados uma vez, em vez de a cada aba/linha
+        'linha_inicio': linha_inicio,
+        'coluna_inicio': coluna_inicio,
+        'colunas_normalizadas': [normalizar_nome_coluna(c) for c in colunas]
+    }
+
+# Configurações das estruturas
+ESTRUTURAS_CAIXA = {
+    'VENDAS': _estrutura('VENDAS', 'E5', 'Nº Venda', ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']),
+    'RESTANTE_ENTRADA': _estrutura('RESTANTE_ENTRADA', 'E25', 'Nº Venda', ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']),
+    'RECEBIMENTO_CARNE': _estrutura('RECEBIMENTO_CARNE', 'E34', 'OS', ['OS', 'Cliente', 'Forma de Pgto', 'Valor Parcela', 'Nº Parcela']),
+    'OS_ENTREGUES_DIA': _estrutura('OS_ENTREGUES_DIA', 'K14', 'OS', ['OS', 'Vendedor', 'CARNÊ']),
+    'ENTREGA_CARNE': _estrutura('ENTREGA_CARNE', 'K34', 'OS', ['OS', 'Parcelas', 'Valor Total'])
+}
+
+CELULA_DATA = 'B1'
+CELULA_LOJA = 'L1'
+
+def _retangulo(estruturas: Dict[str, Dict], linhas_por_estrutura: int) -> Tuple[int, int]:
+    """Última linha e última coluna necessárias para metadados + estruturas"""
+    max_linha, max_coluna = 1, max(posicao_celula(CELULA_DATA)[1], posicao_celula(CELULA_LOJA)[1])
+    for config in estruturas.values():
+        max_linha = max(max_linha, config['linha_inicio'] + linhas_por_estrutura)
+        max_coluna = max(max_coluna, config['coluna_inicio'] + len(config['colunas']) - 1)
+    return max_linha, max_coluna
+
+MAX_LINHA_CAIXA, MAX_COLUNA_CAIXA = _retangulo(ESTRUTURAS_CAIXA, LINHAS_POR_ESTRUTURA)
+
+# Área onde os cabeçalhos são procurados quando as estruturas são localizadas (A1:T80)
+LINHAS_BUSCA = 80
+COLUNAS_BUSCA = 20
+
+# Linhas lidas da aba nesse caso: a última estrutura pode continuar abaixo da busca
+LINHAS_LEITURA = 500
+
+# Linhas vazias seguidas que encerram uma estrutura sem outra abaixo
+LINHAS_VAZIAS_FIM = 2
+
+def formatar_valor(valor) -> str:
+    """Valor da célula como texto (datas em YYYY-MM-DD, vazio como '')"""
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d')
+    return str(valor).strip()
+
+def normalizar_rotulo(valor) -> str:
+    """' Nº  Venda' -> 'no venda' (sem acento, minúsculo, espaços simples); não-texto -> ''"""
+    if not isinstance(valor, str):
+        return ""
+    texto = unicodedata.normalize('NFKD', valor)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+def linha_vazia(valores) -> bool:
+    """Nenhum valor preenchido (None ou texto vazio)"""
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in valores)
+
+def linha_total(valores) -> bool:
+    """Linha de totais/rodapé: algum rótulo começa com 'total' ('TOTAL', 'Total do dia')"""
+    return any(normalizar_rotulo(v).startswith('total') for v in valores)
+
+class FolhaCaixa:
+    """Retângulo de uma aba de caixa em memória (matriz de valores, 1-based)"""
+    
+    def __init__(self, nome: str, linhas: List[tuple], max_linha: Optional[int] = None):
+        self.nome = nome
+        self.linhas = linhas
+        # Limite de linhas da leitura (None: a aba inteira)
+        self.max_linha = max_linha
+    
+    @classmethod
+    def ler(cls, worksheet, max_linha: int = MAX_LINHA_CAIXA, max_coluna: int = MAX_COLUNA_CAIXA) -> 'FolhaCaixa':
+        """Carrega A1:(max_coluna, max_linha) em uma única passada de iter_rows"""
+        linhas = list(worksheet.iter_rows(
+            min_row=1, max_row=max_linha, min_col=1, max_col=max_coluna, values_only=True
+        ))
+        return cls(worksheet.title, linhas, max_linha)
+    
+    def valor(self, linha: int, coluna: int):
+        """Valor bruto da célula (None fora do retângulo lido)"""
+        if linha > len(self.linhas):
+            return None
+        valores = self.linhas[linha - 1]
+        return valores[coluna - 1] if coluna <= len(valores) else None
+    
+    def celula(self, celula: str):
+        """Valor bruto pelo endereço ('B1')"""
+        return self.valor(*posicao_celula(celula))
+    
+    def linha(self, linha: int, coluna_inicio: int, total_colunas: int) -> List:
+        """Fatia de uma linha: total_colunas valores a partir de coluna_inicio"""
+        if linha > len(self.linhas):
+            return [None] * total_colunas
+        valores = self.linhas[linha - 1][coluna_inicio - 1:coluna_inicio - 1 + total_colunas]
+        return list(valores) + [None] * (total_colunas - len(valores))
+    
+    def indice_rotulos(self, rotulos, max_linha: int = LINHAS_BUSCA) -> Dict[str, List[Tuple[int, int]]]:
+        """Posições (linha, coluna) de cada rótulo procurado nas primeiras max_linha linhas"""
+        indice = defaultdict(list)
+        for linha, valores in enumerate(self.linhas[:max_linha], 1):
+            for coluna, valor in enumerate(valores, 1):
+                if isinstance(valor, str):
+                    rotulo = normalizar_rotulo(valor)
+                    if rotulo in rotulos:
+                        indice[rotulo].append((linha, coluna))
+        return indice
+    
+    def cabecalho(self, config: Dict):
+        """Valor bruto da célula de início (título) de uma estrutura"""
+        return self.valor(config['linha_inicio'], config['coluna_inicio'])
+    
+    def ultima_linha_dados(self, config: Dict) -> int:
+        """Última linha de dados de uma estrutura sem outra abaixo
+        
+        Para numa linha de TOTAL ou em LINHAS_VAZIAS_FIM linhas vazias seguidas;
+        uma linha vazia isolada no meio dos dados não encerra a estrutura. Avisa
+        quando os dados chegam ao fim da área lida (podem continuar abaixo).
+        """
+        total_colunas = len(config['colunas'])
+        ultima = config['linha_inicio']
+        vazias = 0
+        for linha in range(config['linha_inicio'] + 1, len(self.linhas) + 1):
+            valores = self.linha(linha, config['coluna_inicio'], total_colunas)
+            if linha_total(valores):
+                return ultima
+            if linha_vazia(valores):
+                vazias += 1
+                if vazias >= LINHAS_VAZIAS_FIM:
+                    return ultima
+                continue
+            vazias = 0
+            ultima = linha
+        
+        if self.max_linha is not None and ultima >= self.max_linha:
+            print(f"   ⚠️  Aba {self.nome}: {config['nome']} chega à linha {ultima}, "
+                  f"fim da área lida; linhas abaixo ficam de fora")
+        return ultima
+    
+    def linhas_estrutura(self, config: Dict, total_linhas: Optional[int] = None) -> List[Tuple[int, List]]:
+        """(número da linha, valores brutos) das linhas abaixo do cabeçalho da estrutura
+        
+        Sem total_linhas vale o da config (estruturas localizadas) ou
+        LINHAS_POR_ESTRUTURA; total_linhas None na config significa "até a linha de
+        TOTAL ou a LINHAS_VAZIAS_FIM linhas vazias" (nenhuma outra estrutura abaixo).
+        """
+        if total_linhas is None:
+            total_linhas = config.get('total_linhas', LINHAS_POR_ESTRUTURA)
+        if total_linhas is None:
+            total_linhas = self.ultima_linha_dados(config) - config['linha_inicio']
+        total_colunas = len(config['colunas'])
+        return [
+            (linha, self.linha(linha, config['coluna_inicio'], total_colunas))
+            for linha in range(config['linha_inicio'] + 1, config['linha_inicio'] + total_linhas + 1)
+        ]
+
+def abrir_caixa(caminho_arquivo):
+    """Abre o workbook de caixa em modo read-only (valores calculados)"""
+    return openpyxl.load_workbook(caminho_arquivo, read_only=True, data_only=True)
+
+def abas_diarias(workbook) -> List[str]:
+    """Abas numéricas (01-31) do workbook"""
+    return [nome for nome in workbook.sheetnames if nome.isdigit() and 1 <= int(nome) <= 31]
+
+def ler_aba(workbook, nome_aba: str, max_linha: int = MAX_LINHA_CAIXA,
+            max_coluna: int = MAX_COLUNA_CAIXA) -> FolhaCaixa:
+    """Lê o retângulo relevante de uma aba"""
+    return FolhaCaixa.ler(workbook[nome_aba], max_linha, max_coluna)
+
+def ler_abas(caminho_arquivo, abas: Optional[List[str]] = None, max_linha: int = MAX_LINHA_CAIXA,
+             max_coluna: int = MAX_COLUNA_CAIXA) -> Dict[str, FolhaCaixa]:
+    """Abre o arquivo, lê as abas pedidas (padrão: as diárias) e fecha"""
+    workbook = abrir_caixa(caminho_arquivo)
+    try:
+        nomes = abas_diarias(workbook) if abas is None else [a for a in abas if a in workbook.sheetnames]
+        return {nome: ler_aba(workbook, nome, max_linha, max_coluna) for nome in nomes}
+    finally:
+        workbook.close()
+
+class LocalizadorEstruturas:
+    """Posição real e extensão das estruturas pelos rótulos do cabeçalho
+    
+    Cada estrutura é procurada onde o título aparece com pelo menos metade das
+    colunas esperadas na mesma linha; entre candidatos, vence o de mais colunas
+    e, no empate, o mais próximo da célula fixa (VENDAS e RESTANTE_ENTRADA têm
+    o mesmo cabeçalho). A estrutura vai até a linha antes do próximo cabeçalho
+    abaixo nas mesmas colunas; sem cabeçalho abaixo, até a linha de TOTAL ou
+    duas linhas vazias seguidas. Estrutura não encontrada fica na célula fixa.
+    
+    Layouts completos (todas encontradas) ficam em cache pela assinatura
+    (posições e extensões); a próxima aba só confere os cabeçalhos deles.
+    """
+    
+    def __init__(self, estruturas: Dict[str, Dict] = ESTRUTURAS_CAIXA, tamanho_cache: int = 32):
+        self.estruturas = estruturas
+        self.tamanho_cache = tamanho_cache
+        self.titulos = {normalizar_rotulo(c['titulo_esperado']) for c in estruturas.values()}
+        self.colunas_esperadas = {
+            nome: [normalizar_rotulo(c) for c in config['colunas']] for nome, config in estruturas.items()
+        }
+        self.layouts: 'OrderedDict[tuple, Dict[str, Dict]]' = OrderedDict()
+        self.varreduras = 0
+        self.reaproveitados = 0
+    
+    def _pontuar(self, folha: FolhaCaixa, nome: str, linha: int, coluna: int) -> int:
+        """Quantas colunas esperadas aparecem a partir de (linha, coluna)"""
+        esperadas = self.colunas_esperadas[nome]
+        encontradas = folha.linha(linha, coluna, len(esperadas))
+        return sum(1 for esperada, valor in zip(esperadas, encontradas) if esperada and esperada in normalizar_rotulo(valor))
+    
+    def _conferir(self, folha: FolhaCaixa, layout: Dict[str, Dict]) -> bool:
+        """O layout em cache vale para esta aba (mesmos cabeçalhos nas mesmas células)?"""
+        return all(
+            normalizar_rotulo(folha.cabecalho(config)) == normalizar_rotulo(config['titulo_esperado'])
+            and self._pontuar(folha, nome, config['linha_inicio'], config['coluna_inicio']) == config['colunas_encontradas']
+            for nome, config in layout.items()
+        )
+    
+    def _varrer(self, folha: FolhaCaixa) -> Dict[str, Dict]:
+        """Indexa os rótulos da aba e resolve posição e extensão de cada estrutura"""
+        indice = folha.indice_rotulos(self.titulos)
+        
+        candidatos = []
+        for nome, config in self.estruturas.items():
+            minimo = (len(config['colunas']) + 1) // 2
+            for linha, coluna in indice.get(normalizar_rotulo(config['titulo_esperado']), []):
+                colunas_encontradas = self._pontuar(folha, nome, linha, coluna)
+                if colunas_encontradas >= minimo:
+                    distancia = abs(linha - config['linha_inicio']) + abs(coluna - config['coluna_inicio'])
+                    candidatos.append((-colunas_encontradas, distancia, nome, linha, coluna))
+        
+        # Cada estrutura e cada célula usadas uma vez só
+        posicoes = {}
+        ocupadas = set()
+        for negativo, _, nome, linha, coluna in sorted(candidatos):
+            if nome in posicoes or (linha, coluna) in ocupadas:
+                continue
+            posicoes[nome] = (linha, coluna, -negativo)
+            ocupadas.add((linha, coluna))
+        
+        layout = {}
+        for nome, config in self.estruturas.items():
+            if nome not in posicoes:
+                layout[nome] = dict(config, localizada=False)
+                continue
+            
+            linha, coluna, colunas_encontradas = posicoes[nome]
+            ultima_coluna = coluna + len(config['colunas']) - 1
+            # Próximo cabeçalho abaixo que ocupa alguma das mesmas colunas
+            abaixo = [
+                outra_linha for outro, (outra_linha, outra_coluna, _) in posicoes.items()
+                if outro != nome and outra_linha > linha
+                and outra_coluna <= ultima_coluna
+                and outra_coluna + len(self.estruturas[outro]['colunas']) - 1 >= coluna
+            ]
+            layout[nome] = dict(
+                config,
+                celula_inicio=f"{get_column_letter(coluna)}{linha}",
+                linha_inicio=linha,
+                coluna_inicio=coluna,
+                total_linhas=min(abaixo) - linha - 1 if abaixo else None,
+                colunas_encontradas=colunas_encontradas,
+                localizada=True
+            )
+        return layout
+    
+    def localizar(self, folha: FolhaCaixa) -> Dict[str, Dict]:
+        """Configs das estruturas (mesmas chaves de ESTRUTURAS_CAIXA) para esta aba"""
+        for assinatura in reversed(self.layouts):
+            layout = self.layouts[assinatura]
+            if self._conferir(folha, layout):
+                self.layouts.move_to_end(assinatura)
+                self.reaproveitados += 1
+                return layout
+        
+        self.varreduras += 1
+        layout = self._varrer(folha)
+        
+        if all(config['localizada'] for config in layout.values()):
+            assinatura = tuple(
+                (nome, config['linha_inicio'], config['coluna_inicio'], config['total_linhas'])
+                for nome, config in layout.items()
+            )
+            self.layouts[assinatura] = layout
+            while len(self.layouts) > self.tamanho_cache:
+                self.layouts.popitem(last=False)
+        return layout
+
+# Um localizador por processo (o cache de layouts vale para todos os arquivos)
+localizador_estruturas = LocalizadorEstruturas()
+
+def localizar_estruturas(folha: FolhaCaixa) -> Dict[str, Dict]:
+    """Estruturas da aba localizadas pelos rótulos (aba lida com LINHAS_LEITURA x COLUNAS_BUSCA)"""
+    return localizador_estruturas.localizar(folha)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Manifesto da extração incremental das planilhas de caixa
+Sistema Carne Fácil - Reprocessar só o que mudou
+
+Para cada planilha de origem o manifesto guarda caminho, tamanho, mtime,
+hash SHA-256 e quantos registros ela gerou; os registros ficam em um pickle
+por planilha. Numa nova execução só planilhas novas ou alteradas são
+extraídas, as demais reaproveitam os registros gravados, e planilhas que
+sumiram da pasta saem do manifesto (e, portanto, das saídas).
+
+Uso nos scripts (rodando de scripts/):
+    manifesto = ManifestoCaixa(diretorio)
+    if manifesto.situacao(caminho) == 'inalterado':
+        registros = manifesto.registros(caminho)
+    else:
+        registros = extrair(caminho)
+        manifesto.atualizar(caminho, registros, len(registros))
+    manifesto.remover_ausentes(caminhos_atuais)
+    manifesto.salvar()
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+import pickle
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+def hash_arquivo(caminho_arquivo) -> str:
+    """SHA-256 do conteúdo do arquivo (lido em blocos)"""
+    sha256 = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+class ManifestoCaixa:
+    """Manifesto em disco das planilhas de caixa já extraídas"""
+    
+    ARQUIVO_MANIFESTO = "manifesto.json"
+    DIRETORIO_REGISTROS = "registros"
+    
+    def __init__(self, diretorio, versao: int = 1):
+        """versao: versão das regras de extração; mudou, tudo é extraído de novo"""
+        self.diretorio = Path(diretorio)
+        self.versao = versao
+        self.arquivos: Dict[str, Dict] = {}
+        self.data_atualizacao: Optional[str] = None
+        self.carregar()
+    
+    def carregar(self):
+        """Carrega o manifesto do disco, se existir"""
+        caminho = self.diretorio / self.ARQUIVO_MANIFESTO
+        if not caminho.exists():
+            return
+        
+        with open(caminho, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        
+        if manifesto.get('versao') != self.versao:
+            return
+        
+        self.arquivos = manifesto.get('arquivos', {})
+        self.data_atualizacao = manifesto.get('data_atualizacao')
+    
+    def salvar(self):
+        """Grava o manifesto (escrita atômica via arquivo temporário)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.data_atualizacao = datetime.now().isoformat()
+        
+        temp = self.diretorio / f"{self.ARQUIVO_MANIFESTO}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'versao': self.versao,
+                'total_arquivos': len(self.arquivos),
+                'total_registros': sum(a['registros'] for a in self.arquivos.values()),
+                'data_atualizacao': self.data_atualizacao,
+                'arquivos': self.arquivos
+            }, f, ensure_ascii=False, indent=2)
+        temp.replace(self.diretorio / self.ARQUIVO_MANIFESTO)
+    
+    def _caminho_registros(self, entrada: Dict) -> Path:
+        return self.diretorio / self.DIRETORIO_REGISTROS / entrada['arquivo_registros']
+    
+    def situacao(self, caminho_arquivo) -> str:
+        """'novo', 'alterado' ou 'inalterado'
+        
+        Tamanho e mtime iguais bastam; se só o mtime mudou (cópia, sync do
+        OneDrive), o hash decide e a entrada é atualizada sem reextrair.
+        """
+        chave = str(caminho_arquivo)
+        entrada = self.arquivos.get(chave)
+        if entrada is None or not self._caminho_registros(entrada).exists():
+            return 'novo'
+        
+        stat = os.stat(caminho_arquivo)
+        if stat.st_size == entrada['tamanho'] and stat.st_mtime_ns == entrada['mtime_ns']:
+            return 'inalterado'
+        if stat.st_size == entrada['tamanho'] and hash_arquivo(caminho_arquivo) == entrada['sha256']:
+            entrada['mtime_ns'] = stat.st_mtime_ns
+            return 'inalterado'
+        return 'alterado'
+    
+    def registros(self, caminho_arquivo):
+        """Registros gravados da última extração da planilha"""
+        with open(self._caminho_registros(self.arquivos[str(caminho_arquivo)]), 'rb') as f:
+            return pickle.load(f)
+    
+    def atualizar(self, caminho_arquivo, registros, total_registros: int):
+        """Registra a extração de uma planilha (versão atual do arquivo + registros)"""
+        chave = str(caminho_arquivo)
+        stat = os.stat(caminho_arquivo)
+        entrada = {
+            'tamanho': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': hash_arquivo(caminho_arquivo),
+            'registros': total_registros,
+            # Nome estável por caminho, para sobrescrever a extração anterior
+            'arquivo_registros': f"{hashlib.sha1(chave.encode('utf-8')).hexdigest()}.pkl",
+            'data_extracao': datetime.now().isoformat()
+        }
+        
+        destino = self._caminho_registros(entrada)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temp = destino.with_name(f"{destino.name}.tmp")
+        with open(temp, 'wb') as f:
+            pickle.dump(registros, f, protocol=pickle.HIGHEST_PROTOCOL)
+        temp.replace(destino)
+        
+        self.arquivos[chave] = entrada
+    
+    def remover_ausentes(self, caminhos_atuais) -> List[str]:
+        """Tira do manifesto as planilhas que não estão mais na pasta"""
+        atuais = {str(c) for c in caminhos_atuais}
+        removidos = [chave for chave in self.arquivos if chave not in atuais]
+        for chave in removidos:
+            self._caminho_registros(self.arquivos.pop(chave)).unlink(missing_ok=True)
+        return removidos
@@ -5,24 +5,38 @@ Sistema Carne Fácil - Análise loja por loja
 """
 
 import pandas as pd
-import openpyxl
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import json
 from datetime import datetime
 import os
+import sys
+import time
 import warnings
-import re
 warnings.filterwarnings('ignore')
 
-def extrair_valor_celula(worksheet, celula):
+from leitor_caixa import (
+    abrir_caixa, abas_diarias, ler_aba, formatar_valor, localizar_estruturas, LINHAS_LEITURA, COLUNAS_BUSCA
+)
+
+# Lojas e pastas de caixa
+LOJAS_CAMINHOS = [
+    ("MAUA", "D:/OneDrive - Óticas Taty Mello/LOJAS/MAUA/CAIXA"),
+    ("PERUS", "D:/OneDrive - Óticas Taty Mello/LOJAS/PERUS/CAIXA"),
+    ("RIO_PEQUENO", "D:/OneDrive - Óticas Taty Mello/LOJAS/RIO_PEQUENO/CAIXA"),
+    ("SAO_MATEUS", "D:/OneDrive - Óticas Taty Mello/LOJAS/SAO_MATEUS/CAIXA"),
+    ("SUZANO", "D:/OneDrive - Óticas Taty Mello/LOJAS/SUZANO/CAIXA"),
+    ("SUZANO2", "D:/OneDrive - Óticas Taty Mello/LOJAS/SUZANO2/CAIXA")
+]
+
+# Modo produção: processos paralelos e pasta de saída
+CAIXA_WORKERS = int(os.getenv("CAIXA_WORKERS", os.cpu_count() or 1))
+DIRETORIO_PRODUCAO = 'data/originais/cxs/producao'
+
+def extrair_valor_celula(folha, celula):
     """Extrai valor de uma célula específica"""
     try:
-        valor = worksheet[celula].value
-        if valor is None:
-            return ""
-        if isinstance(valor, datetime):
-            return valor.strftime('%Y-%m-%d')
-        return str(valor).strip()
+        return formatar_valor(folha.celula(celula))
     except Exception:
         return ""
 
@@ -75,29 +89,23 @@ def is_linha_dados_valida(registro):
     
     return False
 
-def extrair_dados_estrutura_por_loja(worksheet, config_estrutura, data_movimento, loja_normalizada, arquivo_origem, aba):
+def extrair_dados_estrutura_por_loja(folha, config_estrutura, data_movimento, loja_normalizada, arquivo_origem, aba):
     """Extrai dados de uma estrutura específica"""
     registros = []
     
     try:
-        celula_inicio = config_estrutura['celula_inicio']
-        linha_inicio = int(re.findall(r'\d+', celula_inicio)[0])
-        coluna_inicio_letra = re.findall(r'[A-Z]+', celula_inicio)[0]
-        
         # Verificar se a estrutura existe
-        valor_cabecalho = extrair_valor_celula(worksheet, celula_inicio)
+        valor_cabecalho = formatar_valor(folha.cabecalho(config_estrutura))
         if not valor_cabecalho or config_estrutura['titulo_esperado'].lower() not in valor_cabecalho.lower():
             return registros
         
-        # Extrair dados linha por linha
-        for linha_offset in range(1, 21):  # Máximo 20 linhas
-            linha_atual = linha_inicio + linha_offset
-            primeira_coluna = f"{coluna_inicio_letra}{linha_atual}"
-            valor_primeira = extrair_valor_celula(worksheet, primeira_coluna)
+        # Extrair dados linha por linha (até a próxima estrutura), fatiando a matriz da aba
+        for linha_atual, valores in folha.linhas_estrutura(config_estrutura):
+            valores = [formatar_valor(v) for v in valores]
             
-            if not valor_primeira or valor_primeira.strip() == "":
+            if not valores[0]:
                 continue
-                
+            
             # Extrair dados de todas as colunas
             registro = {
                 'data_movimento': data_movimento,
@@ -108,17 +116,8 @@ def extrair_dados_estrutura_por_loja(worksheet, config_estrutura, data_movimento
                 'linha_arquivo': linha_atual
             }
             
-            # Mapear cada coluna
-            for i, nome_coluna in enumerate(config_estrutura['colunas']):
-                col_letra = chr(ord(coluna_inicio_letra) + i)
-                celula_dados = f"{col_letra}{linha_atual}"
-                valor = extrair_valor_celula(worksheet, celula_dados)
-                
-                # Normalizar nome da coluna
-                nome_normalizado = nome_coluna.lower().replace(' ', '_').replace('º', 'n').replace('ª', 'a')
-                nome_normalizado = re.sub(r'[^a-z0-9_]', '', nome_normalizado)
-                
-                registro[nome_normalizado] = valor
+            # Mapear cada coluna (nomes já normalizados)
+            registro.update(zip(config_estrutura['colunas_normalizadas'], valores))
             
             # Validar se é uma linha de dados válida
             if is_linha_dados_valida(registro):
@@ -129,6 +128,63 @@ def extrair_dados_estrutura_por_loja(worksheet, config_estrutura, data_movimento
     
     return registros
 
+def listar_arquivos_caixa(caminho_loja):
+    """Arquivos Excel de caixa de uma loja (ignora temporários ~$ do Office)"""
+    arquivos_excel = []
+    for root, dirs, files in os.walk(caminho_loja):
+        for file in files:
+            if file.endswith('.xlsx') and not file.startswith('~$'):
+                arquivos_excel.append(os.path.join(root, file))
+    return sorted(arquivos_excel)
+
+def extrair_registros_arquivo(caminho_arquivo, limite_abas=None):
+    """
+    Extrai os registros das abas diárias de um arquivo (na ordem aba/estrutura)
+    
+    Retorna (registros, total_abas, erros_abas)
+    """
+    nome_arquivo = os.path.basename(caminho_arquivo)
+    registros = []
+    erros_abas = []
+    
+    workbook = abrir_caixa(caminho_arquivo)
+    try:
+        # Analisar apenas abas numéricas (01-31)
+        abas_numericas = abas_diarias(workbook)
+        
+        for nome_aba in abas_numericas[:limite_abas]:
+            try:
+                # Uma única leitura da área da aba; estruturas localizadas pelos rótulos e fatiadas dela
+                folha = ler_aba(workbook, nome_aba, LINHAS_LEITURA, COLUNAS_BUSCA)
+                
+                # Extrair data e loja
+                data_movimento = extrair_valor_celula(folha, 'B1')
+                loja_extraida = extrair_valor_celula(folha, 'L1')
+                loja_normalizada = normalizar_loja(loja_extraida)
+                
+                if not data_movimento:
+                    continue
+                
+                # Processar cada estrutura (posição e extensão reais desta aba)
+                for config in localizar_estruturas(folha).values():
+                    registros.extend(extrair_dados_estrutura_por_loja(
+                        folha, config, data_movimento, loja_normalizada, 
+                        nome_arquivo, nome_aba
+                    ))
+            
+            except Exception as e:
+                erros_abas.append({'aba': nome_aba, 'erro': str(e)})
+    finally:
+        workbook.close()
+    
+    return registros, len(abas_numericas), erros_abas
+
+def agrupar_por_estrutura(registros, registros_por_estrutura):
+    """Acrescenta os registros às listas de cada estrutura (tipo_estrutura)"""
+    for registro in registros:
+        registros_por_estrutura.setdefault(registro['tipo_estrutura'], []).append(registro)
+    return registros_por_estrutura
+
 def processar_loja_completa(nome_loja, caminho_loja):
     """
     Processa todos os arquivos de uma loja específica
@@ -140,40 +196,6 @@ def processar_loja_completa(nome_loja, caminho_loja):
         print(f"❌ Pasta não encontrada: {caminho_loja}")
         return None
     
-    # Configurações das estruturas
-    estruturas_caixa = {
-        'VENDAS': {
-            'nome': 'VENDAS',
-            'celula_inicio': 'E5',
-            'titulo_esperado': 'Nº Venda',
-            'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-        },
-        'RESTANTE_ENTRADA': {
-            'nome': 'RESTANTE_ENTRADA', 
-            'celula_inicio': 'E25',
-            'titulo_esperado': 'Nº Venda',
-            'colunas': ['Nº Venda', 'Cliente', 'Forma de Pgto', 'Valor Venda', 'Entrada']
-        },
-        'RECEBIMENTO_CARNE': {
-            'nome': 'RECEBIMENTO_CARNE',
-            'celula_inicio': 'E34',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Cliente', 'Forma de Pgto', 'Valor Parcela', 'Nº Parcela']
-        },
-        'OS_ENTREGUES_DIA': {
-            'nome': 'OS_ENTREGUES_DIA',
-            'celula_inicio': 'K14',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Vendedor', 'CARNÊ']
-        },
-        'ENTREGA_CARNE': {
-            'nome': 'ENTREGA_CARNE',
-            'celula_inicio': 'K34',
-            'titulo_esperado': 'OS',
-            'colunas': ['OS', 'Parcelas', 'Valor Total']
-        }
-    }
-    
     resultado_loja = {
         'loja': nome_loja,
         'caminho': caminho_loja,
@@ -186,13 +208,9 @@ def processar_loja_completa(nome_loja, caminho_loja):
     }
     
     # Buscar arquivos Excel
-    arquivos_excel = []
-    for root, dirs, files in os.walk(caminho_loja):
-        for file in files:
-            if file.endswith('.xlsx') and not file.startswith('~$'):
-                arquivos_excel.append(os.path.join(root, file))
+    arquivos_excel = listar_arquivos_caixa(caminho_loja)
     
-    arquivos_teste = sorted(arquivos_excel)[-2:]  # Últimos 2 arquivos para teste
+    arquivos_teste = arquivos_excel[-2:]  # Últimos 2 arquivos para teste
     print(f"📊 Encontrados {len(arquivos_excel)} arquivos Excel")
     print(f"📋 Processando {len(arquivos_teste)} arquivos de teste: {[os.path.basename(f) for f in arquivos_teste]}")
     
@@ -201,48 +219,18 @@ def processar_loja_completa(nome_loja, caminho_loja):
         print(f"\n📄 Processando: {nome_arquivo}")
         
         try:
-            workbook = openpyxl.load_workbook(caminho_arquivo, data_only=True)
-            
-            # Analisar apenas abas numéricas (01-31)
-            abas_numericas = [nome for nome in workbook.sheetnames if nome.isdigit() and 1 <= int(nome) <= 31]
-            print(f"   📅 Abas encontradas: {len(abas_numericas)}")
+            # Primeiras 5 abas para teste
+            registros_arquivo, total_abas, erros_abas = extrair_registros_arquivo(caminho_arquivo, limite_abas=5)
+            print(f"   📅 Abas encontradas: {total_abas}")
+            for erro_aba in erros_abas:
+                print(f"   ❌ Erro na aba {erro_aba['aba']}: {erro_aba['erro']}")
             
-            registros_arquivo = 0
+            agrupar_por_estrutura(registros_arquivo, resultado_loja['registros_por_estrutura'])
+            resultado_loja['todos_registros'].extend(registros_arquivo)
             
-            for nome_aba in abas_numericas[:5]:  # Primeiras 5 abas para teste
-                try:
-                    worksheet = workbook[nome_aba]
-                    
-                    # Extrair data e loja
-                    data_movimento = extrair_valor_celula(worksheet, 'B1')
-                    loja_extraida = extrair_valor_celula(worksheet, 'L1')
-                    loja_normalizada = normalizar_loja(loja_extraida)
-                    
-                    if not data_movimento:
-                        continue
-                    
-                    # Processar cada estrutura
-                    for nome_estrutura, config in estruturas_caixa.items():
-                        registros_estrutura = extrair_dados_estrutura_por_loja(
-                            worksheet, config, data_movimento, loja_normalizada, 
-                            nome_arquivo, nome_aba
-                        )
-                        
-                        if registros_estrutura:
-                            if nome_estrutura not in resultado_loja['registros_por_estrutura']:
-                                resultado_loja['registros_por_estrutura'][nome_estrutura] = []
-                            
-                            resultado_loja['registros_por_estrutura'][nome_estrutura].extend(registros_estrutura)
-                            resultado_loja['todos_registros'].extend(registros_estrutura)
-                            registros_arquivo += len(registros_estrutura)
-                
-                except Exception as e:
-                    print(f"   ❌ Erro na aba {nome_aba}: {str(e)}")
-            
-            workbook.close()
-            print(f"   ✅ {registros_arquivo} registros extraídos")
+            print(f"   ✅ {len(registros_arquivo)} registros extraídos")
             resultado_loja['arquivos_processados'] += 1
-            
+        
         except Exception as e:
             print(f"   ❌ Erro no arquivo {nome_arquivo}: {str(e)}")
             resultado_loja['arquivos_com_erro'].append({
@@ -280,20 +268,163 @@ def processar_loja_completa(nome_loja, caminho_loja):
     
     return resultado_loja
 
+def processar_arquivo_producao(nome_loja, caminho_arquivo):
+    """
+    Extrai um arquivo completo (todas as abas) dentro do pool de processos
+    
+    Erros voltam no resultado, para um arquivo ruim não derrubar a execução.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        'loja': nome_loja,
+        'arquivo': os.path.basename(caminho_arquivo),
+        'caminho': caminho_arquivo,
+        'registros': [],
+        'abas': 0,
+        'erros_abas': [],
+        'erro': None
+    }
+    
+    try:
+        resultado['registros'], resultado['abas'], resultado['erros_abas'] = extrair_registros_arquivo(caminho_arquivo)
+    except Exception as e:
+        resultado['erro'] = str(e)
+    
+    resultado['tempo_s'] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def processar_lojas_producao(lojas_caminhos=LOJAS_CAMINHOS, workers=CAIXA_WORKERS, diretorio_saida=DIRETORIO_PRODUCAO):
+    """
+    Modo produção: todos os arquivos de todas as lojas em um pool de processos
+    
+    Grava um CSV por estrutura/loja e um resumo JSON com tempo por arquivo e falhas.
+    """
+    print(f"🏭 MODO PRODUÇÃO - {workers} processos")
+    print("=" * 60)
+    
+    inicio = time.perf_counter()
+    
+    # Todos os arquivos de todas as lojas numa única fila
+    tarefas = []
+    for nome_loja, caminho_loja in lojas_caminhos:
+        if not os.path.exists(caminho_loja):
+            print(f"❌ Pasta não encontrada: {caminho_loja}")
+            continue
+        arquivos_loja = listar_arquivos_caixa(caminho_loja)
+        print(f"🏪 {nome_loja}: {len(arquivos_loja)} arquivos Excel")
+        tarefas.extend((nome_loja, caminho_arquivo) for caminho_arquivo in arquivos_loja)
+    
+    # Maiores primeiro, para os últimos arquivos não segurarem o pool
+    tarefas.sort(key=lambda tarefa: os.path.getsize(tarefa[1]), reverse=True)
+    total_arquivos = len(tarefas)
+    print(f"📊 Total: {total_arquivos} arquivos\n")
+    
+    resultados_arquivos = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {
+            pool.submit(processar_arquivo_producao, nome_loja, caminho_arquivo): (nome_loja, caminho_arquivo)
+            for nome_loja, caminho_arquivo in tarefas
+        }
+        
+        for concluidos, futuro in enumerate(as_completed(futuros), 1):
+            nome_loja, caminho_arquivo = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Processo do pool morreu (memória, arquivo corrompido etc.)
+                resultado = {
+                    'loja': nome_loja, 'arquivo': os.path.basename(caminho_arquivo), 'caminho': caminho_arquivo,
+                    'registros': [], 'abas': 0, 'erros_abas': [], 'erro': str(e), 'tempo_s': 0.0
+                }
+            resultados_arquivos[caminho_arquivo] = resultado
+            
+            if resultado['erro']:
+                print(f"   ❌ [{concluidos}/{total_arquivos}] {nome_loja}/{resultado['arquivo']}: {resultado['erro']}")
+            else:
+                abas_por_s = resultado['abas'] / resultado['tempo_s'] if resultado['tempo_s'] else 0
+                print(f"   ✅ [{concluidos}/{total_arquivos}] {nome_loja}/{resultado['arquivo']}: "
+                      f"{len(resultado['registros'])} registros, {resultado['abas']} abas em {resultado['tempo_s']:.2f}s "
+                      f"({abas_por_s:.1f} abas/s)")
+    
+    # Juntar por loja/estrutura na ordem dos arquivos (resultado independe da ordem de conclusão)
+    registros_por_loja = {}
+    desempenho_arquivos = []
+    falhas = []
+    for nome_loja, caminho_arquivo in sorted(futuros.values()):
+        resultado = resultados_arquivos[caminho_arquivo]
+        agrupar_por_estrutura(resultado['registros'], registros_por_loja.setdefault(nome_loja, {}))
+        
+        desempenho_arquivos.append({
+            'loja': nome_loja,
+            'arquivo': resultado['arquivo'],
+            'abas': resultado['abas'],
+            'registros': len(resultado['registros']),
+            'tempo_s': resultado['tempo_s'],
+            'erro': resultado['erro']
+        })
+        if resultado['erro'] or resultado['erros_abas']:
+            falhas.append({
+                'loja': nome_loja,
+                'caminho': caminho_arquivo,
+                'erro': resultado['erro'],
+                'erros_abas': resultado['erros_abas']
+            })
+    
+    # Um CSV por estrutura/loja
+    os.makedirs(diretorio_saida, exist_ok=True)
+    saidas = {}
+    for nome_loja, registros_por_estrutura in registros_por_loja.items():
+        for nome_estrutura, registros in registros_por_estrutura.items():
+            caminho_csv = os.path.join(diretorio_saida, f'{nome_estrutura.lower()}_{nome_loja.lower()}.csv')
+            pd.DataFrame(registros).to_csv(caminho_csv, index=False, encoding='utf-8')
+            saidas.setdefault(nome_loja, {})[nome_estrutura] = {'arquivo': caminho_csv, 'registros': len(registros)}
+    
+    tempo_total = time.perf_counter() - inicio
+    total_registros = sum(d['registros'] for d in desempenho_arquivos)
+    resumo = {
+        'data_processamento': datetime.now().isoformat(),
+        'workers': workers,
+        'tempo_total_s': round(tempo_total, 2),
+        'total_arquivos': total_arquivos,
+        'arquivos_com_erro': sum(1 for d in desempenho_arquivos if d['erro']),
+        'total_registros': total_registros,
+        'arquivos_por_s': round(total_arquivos / tempo_total, 2) if tempo_total else 0,
+        'saidas': saidas,
+        'falhas': falhas,
+        'desempenho_arquivos': desempenho_arquivos
+    }
+    
+    caminho_resumo = os.path.join(diretorio_saida, 'resumo_extracao_producao.json')
+    with open(caminho_resumo, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n🎯 RESUMO PRODUÇÃO:")
+    print(f"   📁 Arquivos: {total_arquivos} ({resumo['arquivos_por_s']} arquivos/s)")
+    print(f"   📋 Registros: {total_registros}")
+    print(f"   ❌ Arquivos com erro: {resumo['arquivos_com_erro']}")
+    print(f"   ⚠️  Arquivos com falha em abas: {sum(1 for f in falhas if not f['erro'])}")
+    print(f"   ⏱️  Tempo total: {tempo_total:.1f}s")
+    for nome_loja, saidas_loja in saidas.items():
+        print(f"   🏪 {nome_loja}: " + ", ".join(f"{e} {d['registros']}" for e, d in saidas_loja.items()))
+    print(f"💾 Resumo salvo em: {caminho_resumo}")
+    
+    return resumo
+
 def main():
-    """Função principal - processar loja por loja"""
+    """Função principal - processar loja por loja
+    
+    Uso: processar_lojas_sequencial.py [--producao [workers]]
+    """
+    if '--producao' in sys.argv:
+        posicao = sys.argv.index('--producao')
+        workers = int(sys.argv[posicao + 1]) if len(sys.argv) > posicao + 1 else CAIXA_WORKERS
+        processar_lojas_producao(LOJAS_CAMINHOS, workers)
+        return
+    
     print("🚀 EXTRAÇÃO SEQUENCIAL POR LOJA")
     print("=" * 60)
     
-    # Definir lojas
-    lojas_caminhos = [
-        ("MAUA", "D:/OneDrive - Óticas Taty Mello/LOJAS/MAUA/CAIXA"),
-        ("PERUS", "D:/OneDrive - Óticas Taty Mello/LOJAS/PERUS/CAIXA"),
-        ("RIO_PEQUENO", "D:/OneDrive - Óticas Taty Mello/LOJAS/RIO_PEQUENO/CAIXA"),
-        ("SAO_MATEUS", "D:/OneDrive - Óticas Taty Mello/LOJAS/SAO_MATEUS/CAIXA"),
-        ("SUZANO", "D:/OneDrive - Óticas Taty Mello/LOJAS/SUZANO/CAIXA"),
-        ("SUZANO2", "D:/OneDrive - Óticas Taty Mello/LOJAS/SUZANO2/CAIXA")
-    ]
+    lojas_caminhos = LOJAS_CAMINHOS
     
     resultados_todas_lojas = {
         'data_processamento': datetime.now().isoformat(),
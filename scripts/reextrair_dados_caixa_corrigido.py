@@ -9,9 +9,15 @@ import pandas as pd
 import openpyxl
 import os
 import json
+import shutil
 from datetime import datetime
 import re
 
+from manifesto_caixa import ManifestoCaixa
+
+# Aumentar quando as regras de extração mudarem (invalida o manifesto)
+VERSAO_EXTRACAO = 1
+
 # Estruturas corrigidas com validação de headers
 ESTRUTURAS_TABELAS_CORRIGIDAS = {
     'VENDAS': {
@@ -242,6 +248,12 @@ def reextrair_dados_caixa():
     for tipo in ESTRUTURAS_TABELAS_CORRIGIDAS.keys():
         os.makedirs(os.path.join(pasta_extraidos, tipo.lower()), exist_ok=True)
     
+    # Manifesto: só planilhas novas ou alteradas são extraídas de novo
+    manifesto = ManifestoCaixa(os.path.join(pasta_cxs, "manifesto_reextracao"), VERSAO_EXTRACAO)
+    arquivos_encontrados = []
+    arquivos_extraidos = 0
+    arquivos_reaproveitados = 0
+    
     # Processar cada loja
     lojas = ['maua', 'perus', 'rio_pequeno', 'sao_mateus', 'suzano', 'suzano2']
     dados_consolidados = {}
@@ -262,7 +274,17 @@ def reextrair_dados_caixa():
         
         for arquivo in sorted(arquivos):
             caminho_arquivo = os.path.join(pasta_loja, arquivo)
-            dados_arquivo = processar_arquivo_corrigido(caminho_arquivo, loja)
+            arquivos_encontrados.append(caminho_arquivo)
+            
+            if manifesto.situacao(caminho_arquivo) == 'inalterado':
+                dados_arquivo = manifesto.registros(caminho_arquivo)
+                arquivos_reaproveitados += 1
+            else:
+                dados_arquivo = processar_arquivo_corrigido(caminho_arquivo, loja)
+                arquivos_extraidos += 1
+                if dados_arquivo:
+                    total_arquivo = sum(len(dados) for dados in dados_arquivo['tabelas_extraidas'].values())
+                    manifesto.atualizar(caminho_arquivo, dados_arquivo, total_arquivo)
             
             if dados_arquivo:
                 for tipo, dados in dados_arquivo['tabelas_extraidas'].items():
@@ -283,6 +305,12 @@ def reextrair_dados_caixa():
         dados_consolidados[loja] = dados_loja
         print(f"✅ {loja.upper()}: {total_registros:,} registros totais")
     
+    # Planilhas apagadas saem do manifesto (e das saídas)
+    arquivos_removidos = manifesto.remover_ausentes(arquivos_encontrados)
+    manifesto.salvar()
+    print(f"\n🔄 Extraídos: {arquivos_extraidos} | reaproveitados: {arquivos_reaproveitados} | "
+          f"removidos: {len(arquivos_removidos)}")
+    
     # Criar arquivos consolidados
     print(f"\n📋 CRIANDO ARQUIVOS CONSOLIDADOS")
     print("-" * 40)
@@ -302,6 +330,9 @@ def reextrair_dados_caixa():
     # Renomear pasta final
     pasta_final = os.path.join(pasta_cxs, "extraidos_por_tipo")
     if os.path.exists(pasta_extraidos):
+        # Em re-execuções a pasta final é da execução anterior (o backup original já existe)
+        if os.path.exists(pasta_final):
+            shutil.rmtree(pasta_final)
         os.rename(pasta_extraidos, pasta_final)
     
     print(f"\n🎉 RE-EXTRAÇÃO CONCLUÍDA!")
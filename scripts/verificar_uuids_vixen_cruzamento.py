@@ -9,6 +9,8 @@ Verifica se os UUIDs de lojas foram aplicados corretamente nos arquivos VIXEN do
 import pandas as pd
 from pathlib import Path
 
+from vinculo_clientes import TabelaVinculos
+
 def main():
     base_dir = Path("d:/projetos/carne_facil/carne_facil")
     cruzamento_dir = base_dir / "data" / "originais" / "cruzamento_vixen_oss"
@@ -16,6 +18,9 @@ def main():
     print("✅ VERIFICAÇÃO UUIDs APLICADOS - VIXEN CRUZAMENTO")
     print("=" * 60)
     
+    # Vínculos já calculados pelos scripts de cruzamento (consulta, sem refazer)
+    tabela_vinculos = TabelaVinculos(cruzamento_dir / "vinculos")
+    
     # Arquivos para verificar
     arquivos_vixen = [
         'clientes_vixen_maua_original.csv',
@@ -75,6 +80,22 @@ def main():
                         valores_unicos = df[col].nunique()
                         print(f"      🔹 {col}: {valores_unicos:,} valores únicos")
                 
+                # Vínculos VIXEN x OSS registrados para a loja
+                relacao = f"vixen_oss_{loja.lower()}"
+                if relacao in tabela_vinculos:
+                    vinculos = tabela_vinculos.vinculos(relacao)
+                    print(f"   🔗 Vínculos OSS: {len(vinculos):,} ({vinculos['id_esquerda'].nunique():,} clientes com OS)")
+                    
+                    for etapa in tabela_vinculos.estatisticas(relacao):
+                        print(f"      • {etapa['match_method']}: {etapa['vinculados']:,} vínculos ({etapa['juncao']}, {etapa['segundos']}s)")
+                    
+                    if 'ID' in df.columns:
+                        sem_cliente = (~vinculos['id_esquerda'].isin(df['ID'])).sum()
+                        if sem_cliente:
+                            print(f"   ⚠️  {sem_cliente:,} vínculos apontam para IDs fora do arquivo")
+                else:
+                    print(f"   ⚠️  Vínculos OSS: relação {relacao} não registrada")
+                
             except Exception as e:
                 print(f"   ❌ Erro ao processar: {e}")
         else:
@@ -84,6 +105,13 @@ def main():
     print(f"   📁 Arquivos verificados: {len(arquivos_vixen)}")
     print(f"   📊 Total de registros: {total_registros:,}")
     
+    print(f"\n🔗 TABELA DE VÍNCULOS:")
+    if tabela_vinculos.relacoes:
+        for relacao, meta in tabela_vinculos.relacoes.items():
+            print(f"   🔹 {relacao}: {meta['total_vinculos']:,} vínculos ({meta['data_vinculo'][:19]})")
+    else:
+        print(f"   ⚠️  Nenhuma relação registrada em {tabela_vinculos.diretorio}")
+    
     print(f"\n🔗 UUIDs DE LOJAS CONFIRMADOS:")
     print(f"   🏪 MAUA: 7f9d4c6e-8b3a-4d2c-9f1e-6a5b8c7d9e0f")
     print(f"   🏪 SUZANO: 52f92716-d2ba-441a-ac3c-94bdfabd9722")
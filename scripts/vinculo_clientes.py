@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Vínculo de clientes entre sistemas
+Sistema Carne Fácil - VIXEN, OSS, Trans Financ (ID.2) e caixa
+
+Um só motor para os cruzamentos que cada script fazia do seu jeito:
+- chaves declaradas em CHAVES_VINCULO, cada uma com um normalizador
+  vetorizado (email, telefone, nome, id);
+- etapas (chave, match_method, confidence) em ordem de prioridade, executadas
+  por cruzamento_cascata (hash join; sort-merge para IDs inteiros);
+- estatísticas por etapa (candidatos, vínculos, tempo);
+- tabela de vínculos persistida por relação ('vixen_oss_maua',
+  'trans_financ_master', ...), que os outros scripts consultam em vez de
+  refazer o cruzamento. Se as chaves e IDs de entrada não mudaram (mesma
+  assinatura), os vínculos gravados são reaproveitados.
+
+Uso nos scripts (rodando de scripts/):
+    from vinculo_clientes import TabelaVinculos, preparar_chaves, vincular_relacao
+    vixen_prep = vixen.join(preparar_chaves(vixen, {'email': 'E-mail', 'nome': 'Nome Completo'}))
+    oss_prep = oss.join(preparar_chaves(oss, {'email': 'EMAIL:', 'nome': 'NOME:'}))
+    vinculos = vincular_relacao(TabelaVinculos(), 'vixen_oss_maua', vixen_prep, oss_prep,
+                                [('email', 'EMAIL', 'HIGH'), ('nome', 'NAME', 'LOW')],
+                                id_esquerda='ID')
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from cruzamento_cascata import cruzar_em_cascata
+
+DIRETORIO_VINCULOS = Path("data/originais/cruzamento_vixen_oss/vinculos")
+
+COLUNAS_VINCULOS = [
+    'pos_esquerda', 'pos_direita', 'id_esquerda', 'id_direita', 'match_method', 'confidence'
+]
+
+def _vazios(serie: pd.Series) -> pd.Series:
+    """Máscara de nulos e texto vazio (as regras de entrada dos normalizadores)"""
+    return serie.isna() | (serie.astype(object) == '')
+
+def normalizar_email_serie(serie: pd.Series) -> pd.Series:
+    """Email em minúsculas e sem espaços nas pontas"""
+    normalizado = serie.astype(str).str.lower().str.strip().astype(object)
+    normalizado[_vazios(serie)] = None
+    return normalizado
+
+def normalizar_telefone_serie(serie: pd.Series) -> pd.Series:
+    """Últimos 9 dígitos (11+ dígitos) ou 8 dígitos (8 a 10); menos que 8 fica nulo"""
+    numeros = serie.astype(str).str.replace(r'[^0-9]', '', regex=True)
+    tamanho = numeros.str.len()
+    normalizado = pd.Series(
+        np.where(tamanho >= 11, numeros.str[-9:], np.where(tamanho >= 8, numeros.str[-8:], None)),
+        index=serie.index, dtype=object
+    )
+    normalizado[_vazios(serie)] = None
+    return normalizado
+
+def normalizar_nome_serie(serie: pd.Series) -> pd.Series:
+    """Nome em maiúsculas, só letras A-Z e espaços simples
+    
+    str.upper do Python (e não .str.upper) para 'ß' virar 'SS' como no script original.
+    """
+    normalizado = (
+        serie.astype(str).map(str.upper, na_action='ignore').str.strip()
+        .str.replace(r'[^A-Z\s]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .astype(object)
+    )
+    normalizado[_vazios(serie)] = None
+    return normalizado
+
+def normalizar_id_serie(serie: pd.Series) -> pd.Series:
+    """ID inteiro (Int64); nulos, não inteiros e 0 (registro de sistema) ficam nulos"""
+    ids = pd.to_numeric(serie, errors='coerce')
+    ids = ids.where((ids != 0) & (ids % 1 == 0))
+    return ids.astype('Int64')
+
+# Chaves de vínculo disponíveis: nome -> normalizador vetorizado
+CHAVES_VINCULO: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    'email': normalizar_email_serie,
+    'telefone': normalizar_telefone_serie,
+    'nome': normalizar_nome_serie,
+    'id': normalizar_id_serie,
+}
+
+def coluna_chave(chave: str) -> str:
+    """Nome da coluna normalizada de uma chave ('email' -> 'email_norm')"""
+    return f'{chave}_norm'
+
+def preparar_chaves(df: pd.DataFrame, colunas: Dict[str, str]) -> pd.DataFrame:
+    """
+    Colunas normalizadas das chaves declaradas
+    
+    colunas: chave -> coluna de origem ({'email': 'E-mail', 'telefone': 'Fone'}).
+    Devolve um DataFrame com o mesmo índice de df, pronto para df.join(...).
+    """
+    return pd.DataFrame({
+        coluna_chave(chave): CHAVES_VINCULO[chave](df[coluna])
+        for chave, coluna in colunas.items()
+    }, index=df.index)
+
+def vincular(esquerda: pd.DataFrame, direita: pd.DataFrame,
+             etapas: List[Tuple[str, str, str]]) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Pares posicionais em cascata e as estatísticas de cada etapa
+    
+    etapas: (chave, match_method, confidence) na ordem de prioridade; as duas
+    bases precisam das colunas {chave}_norm (preparar_chaves).
+    """
+    estatisticas: List[Dict] = []
+    pares = cruzar_em_cascata(
+        esquerda, direita,
+        [(coluna_chave(chave), metodo, confianca) for chave, metodo, confianca in etapas],
+        estatisticas=estatisticas
+    )
+    return pares, estatisticas
+
+def assinatura_entrada(esquerda: pd.DataFrame, direita: pd.DataFrame,
+                       etapas: List[Tuple[str, str, str]], colunas_id: Tuple) -> str:
+    """SHA-256 das etapas e das colunas que decidem o vínculo (chaves e IDs, na ordem)"""
+    sha256 = hashlib.sha256(repr(list(etapas)).encode('utf-8'))
+    chaves = [coluna_chave(chave) for chave, _, _ in etapas]
+    for base, coluna_id in zip((esquerda, direita), colunas_id):
+        colunas = list(dict.fromkeys(chaves + ([coluna_id] if coluna_id else [])))
+        sha256.update(str(len(base)).encode('utf-8'))
+        sha256.update(pd.util.hash_pandas_object(base[colunas], index=coluna_id is None).to_numpy().tobytes())
+    return sha256.hexdigest()
+
+class TabelaVinculos:
+    """Tabela em disco dos vínculos entre bases, uma relação por arquivo"""
+    
+    ARQUIVO_META = "meta.json"
+    
+    def __init__(self, diretorio: Path = DIRETORIO_VINCULOS):
+        self.diretorio = Path(diretorio)
+        self.relacoes: Dict[str, Dict] = {}
+        self.data_atualizacao: Optional[str] = None
+        self.carregar()
+    
+    def __contains__(self, relacao: str) -> bool:
+        return relacao in self.relacoes and self._arquivo_relacao(relacao).exists()
+    
+    def _arquivo_relacao(self, relacao: str) -> Path:
+        return self.diretorio / f"{relacao}.pkl"
+    
+    def carregar(self):
+        """Carrega o índice de relações, se existir"""
+        arquivo_meta = self.diretorio / self.ARQUIVO_META
+        if not arquivo_meta.exists():
+            return
+        
+        with open(arquivo_meta, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        self.relacoes = meta.get('relacoes', {})
+        self.data_atualizacao = meta.get('data_atualizacao')
+    
+    def salvar(self):
+        """Grava o índice de relações (escrita atômica via arquivo temporário)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.data_atualizacao = datetime.now().isoformat()
+        
+        temp_meta = self.diretorio / f"{self.ARQUIVO_META}.tmp"
+        with open(temp_meta, 'w', encoding='utf-8') as f:
+            json.dump({
+                'total_relacoes': len(self.relacoes),
+                'data_atualizacao': self.data_atualizacao,
+                'relacoes': self.relacoes
+            }, f, ensure_ascii=False, indent=2, default=str)
+        temp_meta.replace(self.diretorio / self.ARQUIVO_META)
+    
+    def vigente(self, relacao: str, assinatura: str) -> bool:
+        """A relação gravada foi calculada com estas mesmas entradas"""
+        return relacao in self and self.relacoes[relacao].get('assinatura') == assinatura
+    
+    def registrar(self, relacao: str, vinculos: pd.DataFrame, estatisticas: List[Dict],
+                  assinatura: Optional[str] = None, origens: Tuple[str, str] = ('', '')):
+        """Grava os vínculos de uma relação (substitui os anteriores) e atualiza o índice"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        destino = self._arquivo_relacao(relacao)
+        temp = destino.with_name(f"{destino.name}.tmp")
+        vinculos.to_pickle(temp)
+        temp.replace(destino)
+        
+        self.relacoes[relacao] = {
+            'origem_esquerda': origens[0],
+            'origem_direita': origens[1],
+            'total_vinculos': len(vinculos),
+            'por_metodo': {str(k): int(v) for k, v in vinculos['match_method'].value_counts().items()},
+            'estatisticas_etapas': estatisticas,
+            'assinatura': assinatura,
+            'data_vinculo': datetime.now().isoformat()
+        }
+        self.salvar()
+    
+    def vinculos(self, relacao: str) -> pd.DataFrame:
+        """Vínculos gravados de uma relação (vazio se não existir)"""
+        if relacao not in self:
+            return pd.DataFrame(columns=COLUNAS_VINCULOS)
+        return pd.read_pickle(self._arquivo_relacao(relacao))
+    
+    def mapa(self, relacao: str) -> Dict:
+        """id_direita -> id_esquerda da relação"""
+        vinculos = self.vinculos(relacao)
+        return dict(zip(vinculos['id_direita'], vinculos['id_esquerda']))
+    
+    def estatisticas(self, relacao: str) -> List[Dict]:
+        """Estatísticas por etapa do último vínculo da relação"""
+        return self.relacoes.get(relacao, {}).get('estatisticas_etapas', [])
+
+def vincular_relacao(tabela: TabelaVinculos, relacao: str,
+                     esquerda: pd.DataFrame, direita: pd.DataFrame,
+                     etapas: List[Tuple[str, str, str]],
+                     id_esquerda: Optional[str] = None, id_direita: Optional[str] = None,
+                     origens: Tuple[str, str] = ('', '')) -> pd.DataFrame:
+    """
+    Vínculos da relação: consulta a tabela e só cruza de novo se a entrada mudou
+    
+    id_esquerda/id_direita: colunas com o ID de cada base; None usa o índice.
+    Devolve COLUNAS_VINCULOS (posições iloc, IDs, match_method, confidence).
+    """
+    assinatura = assinatura_entrada(esquerda, direita, etapas, (id_esquerda, id_direita))
+    if tabela.vigente(relacao, assinatura):
+        return tabela.vinculos(relacao)
+    
+    pares, estatisticas = vincular(esquerda, direita, etapas)
+    pos_esquerda = pares['pos_esquerda'].to_numpy(dtype=np.int64)
+    pos_direita = pares['pos_direita'].to_numpy(dtype=np.int64)
+    
+    def ids(base, coluna, posicoes):
+        valores = base.index if coluna is None else base[coluna]
+        return valores.to_numpy()[posicoes]
+    
+    vinculos = pd.DataFrame({
+        'pos_esquerda': pos_esquerda,
+        'pos_direita': pos_direita,
+        'id_esquerda': ids(esquerda, id_esquerda, pos_esquerda),
+        'id_direita': ids(direita, id_direita, pos_direita),
+        'match_method': pares['match_method'].to_numpy(),
+        'confidence': pares['confidence'].to_numpy()
+    }, columns=COLUNAS_VINCULOS)
+    
+    tabela.registrar(relacao, vinculos, estatisticas, assinatura, origens)
+    return vinculos
@@ -0,0 +1,20 @@
+"""
+Testes da comparação de ETag do /api/dados
+"""
+
+from app.dashboard_consolidacao import etag_corresponde
+
+ETAG = 'W/"abc123"'
+
+def test_lista_de_etags_e_asterisco():
+    assert etag_corresponde(ETAG, 'W/"abc123"')
+    assert etag_corresponde(ETAG, '"outro", W/"abc123"')
+    assert etag_corresponde(ETAG, '"abc123"')
+    assert etag_corresponde(ETAG, '*')
+
+def test_prefixo_ou_etag_parecida_nao_casam():
+    assert not etag_corresponde(ETAG, '')
+    assert not etag_corresponde(ETAG, 'W/"abc"')
+    assert not etag_corresponde(ETAG, 'W/"abc1234"')
+    assert not etag_corresponde(ETAG, 'W/"xabc123"')
+    assert not etag_corresponde(ETAG, 'abc123')
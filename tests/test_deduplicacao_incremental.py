@@ -0,0 +1,85 @@
+"""
+Testes da deduplicação incremental contra o índice persistido
+"""
+
+import pandas as pd
+import pytest
+
+from app.services.deduplicacao import DeduplicadorClientes
+from app.services.indice_clientes import IndiceClientes
+from app.services.tarefas_deduplicacao import carregar_clientes
+
+LOTE_1 = pd.DataFrame({
+    'nome': ['MARIA DA SILVA', 'JOSE SANTOS'],
+    'cpf': ['12345678901', '98765432100'],
+    'telefone': ['11987654321', '11912345678'],
+})
+
+LOTE_2 = pd.DataFrame({
+    'nome': ['MARIA DA SILVA', 'ANA PAULA LIMA'],
+    'cpf': ['12345678901', '11122233344'],
+    'telefone': ['11987654321', '11955554444'],
+})
+
+def com_ids(df, origem):
+    return df.assign(id=[f"{origem}:{linha}" for linha in range(len(df))])
+
+def test_lotes_sem_id_sao_rejeitados(tmp_path):
+    indice = IndiceClientes(tmp_path)
+    deduplicador = DeduplicadorClientes(workers=1)
+    
+    for lote in (LOTE_1, LOTE_2):
+        with pytest.raises(ValueError, match="'id'"):
+            deduplicador.deduplicar_incremental(lote, indice)
+    
+    assert len(indice) == 0
+
+def test_segundo_lote_nao_e_descartado(tmp_path):
+    indice = IndiceClientes(tmp_path)
+    deduplicador = DeduplicadorClientes(workers=1)
+    
+    assert deduplicador.deduplicar_incremental(com_ids(LOTE_1, 'lote1.xlsx'), indice) == []
+    duplicatas = deduplicador.deduplicar_incremental(com_ids(LOTE_2, 'lote2.xlsx'), indice)
+    
+    # Os dois registros do segundo lote entram no índice, e a MARIA repetida é detectada
+    assert len(indice) == 4
+    assert any(
+        {d.cliente_id_1, d.cliente_id_2} == {'lote1.xlsx:0', 'lote2.xlsx:0'} and d.recomendacao == 'merge'
+        for d in duplicatas
+    )
+    
+    # Reenviar o mesmo lote não reprocessa nada
+    assert deduplicador.deduplicar_incremental(com_ids(LOTE_2, 'lote2.xlsx'), indice) == []
+    assert len(IndiceClientes(tmp_path)) == 4
+
+def test_arquivo_reenviado_com_linhas_editadas(tmp_path):
+    pasta = tmp_path / 'raw'
+    pasta.mkdir()
+    indice = IndiceClientes(tmp_path / 'indice')
+    deduplicador = DeduplicadorClientes(workers=1)
+    
+    original = pd.DataFrame({
+        'nome': ['MARIA DA SILVA', 'JOSE SANTOS', 'ANA PAULA LIMA'],
+        'cpf': ['12345678901', '98765432100', '11122233344'],
+        'telefone': ['11987654321', '11912345678', '11955554444'],
+    })
+    original.to_excel(pasta / 'clientes.xlsx', index=False)
+    deduplicador.deduplicar_incremental(carregar_clientes(pasta), indice)
+    id_ana = indice.registros.loc[indice.registros['nome'] == 'ANA PAULA LIMA', 'id'].item()
+    
+    # Mesmo nome de arquivo: JOSE corrigido e uma linha nova no topo
+    corrigido = pd.concat([
+        pd.DataFrame({'nome': ['CARLOS PEREIRA'], 'cpf': ['55566677788'], 'telefone': ['11933332222']}),
+        original.replace({'JOSE SANTOS': 'JOSE DOS SANTOS', '11912345678': '11912340000'})
+    ], ignore_index=True)
+    corrigido.to_excel(pasta / 'clientes.xlsx', index=False)
+    deduplicador.deduplicar_incremental(carregar_clientes(pasta), indice)
+    
+    indice = IndiceClientes(tmp_path / 'indice')
+    assert sorted(indice.registros['nome']) == ['ANA PAULA LIMA', 'CARLOS PEREIRA', 'JOSE DOS SANTOS', 'MARIA DA SILVA']
+    # Linha inalterada, deslocada pela inserção, mantém o ID
+    assert indice.registros.loc[indice.registros['nome'] == 'ANA PAULA LIMA', 'id'].item() == id_ana
+    
+    # Reenviar sem mudanças não altera o índice
+    assert deduplicador.deduplicar_incremental(carregar_clientes(pasta), indice) == []
+    assert len(IndiceClientes(tmp_path / 'indice')) == 4
@@ -0,0 +1,21 @@
+"""
+Testes do progresso reportado pela deduplicação (callback_progresso)
+"""
+
+import pandas as pd
+
+from app.services.deduplicacao import DeduplicadorClientes
+
+def test_total_lotes_do_modo_exaustivo():
+    eventos = []
+    deduplicador = DeduplicadorClientes(workers=1, callback_progresso=eventos.append)
+    # 347 registros: 60.031 pares em 3 lotes de linhas inteiras, não ceil(60.031 / TAMANHO_LOTE_PARES) = 4
+    total = 347
+    df = pd.DataFrame({'nome': [f'CLIENTE {i} SILVA' for i in range(total)]})
+    
+    deduplicador.encontrar_duplicatas(df, modo='exaustivo')
+    
+    assert len(eventos) == 3
+    assert all(evento['total_lotes'] == len(eventos) for evento in eventos)
+    assert eventos[-1]['lotes_concluidos'] == eventos[-1]['total_lotes']
+    assert eventos[-1]['pares_processados'] == eventos[-1]['total_pares'] == total * (total - 1) // 2
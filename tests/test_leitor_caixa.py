@@ -0,0 +1,102 @@
+"""
+Testes da extensão das estruturas localizadas no leitor de caixa
+"""
+
+import sys
+from pathlib import Path
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from leitor_caixa import (
+    ESTRUTURAS_CAIXA, LINHAS_BUSCA, LINHAS_LEITURA, COLUNAS_BUSCA,
+    LocalizadorEstruturas, ler_abas
+)
+
+def gravar_caixa(caminho, linhas_carne: int, rodape: bool, vazias=()):
+    """Aba '01' no layout padrão com RECEBIMENTO_CARNE e ENTREGA_CARNE no fim
+    
+    vazias: posições (0-based) do bloco de RECEBIMENTO_CARNE deixadas em branco.
+    """
+    workbook = openpyxl.Workbook()
+    aba = workbook.active
+    aba.title = '01'
+    for config in ESTRUTURAS_CAIXA.values():
+        for deslocamento, coluna in enumerate(config['colunas']):
+            aba.cell(config['linha_inicio'], config['coluna_inicio'] + deslocamento, coluna)
+    
+    carne = ESTRUTURAS_CAIXA['RECEBIMENTO_CARNE']
+    for i in range(linhas_carne):
+        if i in vazias:
+            continue
+        linha = carne['linha_inicio'] + 1 + i
+        aba.cell(linha, carne['coluna_inicio'], 1000 + i)
+        aba.cell(linha, carne['coluna_inicio'] + 1, f'CLIENTE {i}')
+        aba.cell(linha, carne['coluna_inicio'] + 3, 50.0)
+    
+    if rodape:
+        linha = carne['linha_inicio'] + linhas_carne + 1
+        aba.cell(linha, carne['coluna_inicio'], 'TOTAL')
+        aba.cell(linha, carne['coluna_inicio'] + 3, 50.0 * linhas_carne)
+        aba.cell(linha + 2, carne['coluna_inicio'], 'Conferido por:')
+    
+    workbook.save(caminho)
+
+def linhas_carne(caminho, max_linha: int = LINHAS_LEITURA):
+    folha = ler_abas(caminho, ['01'], max_linha, COLUNAS_BUSCA)['01']
+    config = LocalizadorEstruturas().localizar(folha)['RECEBIMENTO_CARNE']
+    assert config['localizada'] and config['total_linhas'] is None
+    return folha.linhas_estrutura(config)
+
+def test_linha_de_total_e_rodape_ficam_fora(tmp_path):
+    caminho = tmp_path / 'caixa.xlsx'
+    gravar_caixa(caminho, linhas_carne=5, rodape=True)
+    
+    linhas = linhas_carne(caminho)
+    
+    assert [valores[0] for _, valores in linhas] == [1000, 1001, 1002, 1003, 1004]
+
+def test_estrutura_passa_da_area_de_busca(tmp_path):
+    caminho = tmp_path / 'caixa.xlsx'
+    total = LINHAS_BUSCA + 20
+    gravar_caixa(caminho, linhas_carne=total, rodape=True)
+    
+    linhas = linhas_carne(caminho)
+    
+    assert len(linhas) == total
+    assert linhas[-1][0] > LINHAS_BUSCA
+    assert not any(isinstance(valores[0], str) for _, valores in linhas)
+
+def test_linha_vazia_no_meio_do_bloco_nao_encerra(tmp_path):
+    caminho = tmp_path / 'caixa.xlsx'
+    gravar_caixa(caminho, linhas_carne=6, rodape=True, vazias={2})
+    
+    linhas = linhas_carne(caminho)
+    
+    assert [valores[0] for _, valores in linhas if valores[0] is not None] == [1000, 1001, 1003, 1004, 1005]
+
+def test_duas_linhas_vazias_encerram_sem_rodape(tmp_path):
+    caminho = tmp_path / 'caixa.xlsx'
+    gravar_caixa(caminho, linhas_carne=8, rodape=False, vazias={3, 4})
+    
+    linhas = linhas_carne(caminho)
+    
+    assert [valores[0] for _, valores in linhas] == [1000, 1001, 1002]
+
+def test_aviso_ao_chegar_no_limite_de_leitura(tmp_path, capsys):
+    caminho = tmp_path / 'caixa.xlsx'
+    gravar_caixa(caminho, linhas_carne=40, rodape=True)
+    limite = ESTRUTURAS_CAIXA['RECEBIMENTO_CARNE']['linha_inicio'] + 30
+    
+    linhas = linhas_carne(caminho, max_linha=limite)
+    
+    assert linhas[-1][0] == limite
+    assert 'RECEBIMENTO_CARNE' in capsys.readouterr().out
+
+def test_sem_aviso_quando_a_aba_termina_antes_do_limite(tmp_path, capsys):
+    caminho = tmp_path / 'caixa.xlsx'
+    gravar_caixa(caminho, linhas_carne=10, rodape=False)
+    
+    assert len(linhas_carne(caminho)) == 10
+    assert capsys.readouterr().out == ''